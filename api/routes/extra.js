@@ -2,6 +2,7 @@ const { getCollection } = require("../utils/database");
 const axios = require("axios");
 const ccxt = require("ccxt");
 const { ManageSubscriptions } = require("../utils/subscriptionManagement");
+const { normalizeCoin } = require("../utils/positions");
 
 // Initialize Binance futures exchange
 const exchange = new ccxt.binance({
@@ -31,6 +32,7 @@ async function fetchPriceFor(symbol) {
 // Add extra USD to an open position
 let addExtra = async (coinName, collectionName, extraUsd = 100) => {
   const collection = getCollection(collectionName);
+  coinName = normalizeCoin(coinName);
 
   // Ensure extraUsd is numeric
   extraUsd = Number(extraUsd);
@@ -39,10 +41,7 @@ let addExtra = async (coinName, collectionName, extraUsd = 100) => {
   }
 
   // Find any open position for this coin (Long or Short)
-  const position = await collection.findOne({
-    coinName: { $regex: `^${coinName}$`, $options: "i" },
-    status: "open",
-  });
+  const position = await collection.findOne({ coinName, status: "open" });
 
   if (!position) {
     throw new Error("No open position found for " + coinName);
@@ -78,6 +77,7 @@ let addExtra = async (coinName, collectionName, extraUsd = 100) => {
     { _id: position._id },
     {
       $set: {
+        updatedAt: Date.now(),
         positionSize: newPositionSize,
         entryPrice: newEntryPrice,
       },
@@ -1,5 +1,6 @@
 const router = require('express').Router();
 const { getCollection } = require('../utils/database');
+const { normalizeCoin } = require('../utils/positions');
 
 // GET /tables - returns all collections in the MongoDB database
 router.get('/tables', async (req, res) => {
@@ -33,7 +34,7 @@ async function handleGetTrades(req, res) {
     let filter = {};
 
     if (coinName) {
-      filter.coinName = { $regex: `^${coinName}$`, $options: 'i' };
+      filter.coinName = normalizeCoin(coinName);
     }
 
     if (status && status !== 'all') {
@@ -4,6 +4,7 @@ const ccxt = require("ccxt");
 const axios = require("axios");
 const { ManageSubscriptions } = require("../utils/subscriptionManagement");
 const { safePost } = require("../utils/safePost");
+const { normalizeCoin } = require("../utils/positions");
 const addExtra = require("./extra");
 
 // Initialize Binance exchange (use Binance for price fetching)
@@ -228,6 +229,7 @@ async function closeOpenPositions(collection, coinName, side, collectionName) {
         { _id: position._id },
         {
           $set: {
+            updatedAt: Date.now(),
             exitTime,
             exitPrice,
             status: "close",
@@ -270,7 +272,7 @@ async function closeOpenPositions(collection, coinName, side, collectionName) {
 router.post("/manage/:coinName", async (req, res) => {
   try {
     let { Action } = req.body;
-    let { coinName } = req.params;
+    let coinName = normalizeCoin(req.params.coinName);
     let multiplier = Number(req.query.mult) || 1;
     let percSize = Number(req.query.percSize) || 50
     let appendable = req.query.appendable || true
@@ -315,6 +317,7 @@ router.post("/manage/:coinName", async (req, res) => {
 
       // Insert open Long position
       const result = await collection.insertOne({
+        updatedAt: Date.now(),
         entryTime,
         exitTime: 0,
         coinName,
@@ -361,6 +364,7 @@ router.post("/manage/:coinName", async (req, res) => {
 
       // Insert open Short position
       const result = await collection.insertOne({
+        updatedAt: Date.now(),
         entryTime,
         exitTime: 0,
         coinName,
@@ -477,6 +481,7 @@ router.post("/manage/:coinName", async (req, res) => {
           { _id: position._id },
           {
             $set: {
+              updatedAt: Date.now(),
               exitTime,
               exitPrice,
               status: "close",
@@ -600,6 +605,7 @@ router.post("/manage/:coinName", async (req, res) => {
           { _id: position._id },
           {
             $set: {
+              updatedAt: Date.now(),
               exitTime,
               exitPrice,
               status: "close",
@@ -717,6 +723,7 @@ router.post("/manage/:coinName", async (req, res) => {
           { _id: positionId },
           {
             $set: {
+              updatedAt: Date.now(),
               exitTime,
               exitPrice,
               status: "close",
@@ -789,7 +796,7 @@ router.post("/manage/:coinName", async (req, res) => {
           if (updated) {
             await collection.updateOne(
               { _id: position._id },
-              { $set: { maxProfit, minProfit, maxProfitTime, minProfitTime } }
+              { $set: { updatedAt: Date.now(), maxProfit, minProfit, maxProfitTime, minProfitTime } }
             );
             updatedCount++;
           }
@@ -858,7 +865,7 @@ router.post("/manage/:coinName", async (req, res) => {
 
           await collection.updateOne(
             { _id: position._id },
-            { $set: { maxProfit, minProfit, maxProfitTime, minProfitTime } }
+            { $set: { updatedAt: Date.now(), maxProfit, minProfit, maxProfitTime, minProfitTime } }
           );
 
           updatedCount++;
@@ -1032,7 +1039,8 @@ router.get("/getbest", async (req, res) => {
 router.get("/partialclose", async (req, res) => {
   try {
     
-    const { coinName, percSize, tableName } = req.query;
+    const { percSize, tableName } = req.query;
+    const coinName = normalizeCoin(req.query.coinName);
     const collectionName = tableName || "positions";
 
     // Validate input
@@ -1054,10 +1062,7 @@ router.get("/partialclose", async (req, res) => {
     ManageSubscriptions(collectionName,coinName,"PartialClose");
 
     // 1) Fetch open position for the coin
-    const openPosition = await collection.findOne({
-      coinName: { $regex: `^${coinName}$`, $options: "i" },
-      status: "open",
-    });
+    const openPosition = await collection.findOne({ coinName, status: "open" });
 
     if (!openPosition) {
       return res.status(404).json({ message: "No open position found for " + coinName });
@@ -1138,6 +1143,7 @@ router.get("/partialclose", async (req, res) => {
 
     // 6) Create closed position record for partial close
     const closedResult = await collection.insertOne({
+      updatedAt: Date.now(),
       entryTime: openPosition.entryTime,
       exitTime,
       coinName: openPosition.coinName,
@@ -1161,6 +1167,7 @@ router.get("/partialclose", async (req, res) => {
       { _id: openPosition._id },
       {
         $set: {
+          updatedAt: Date.now(),
           positionSize: remainingPositionSize,
         },
       }
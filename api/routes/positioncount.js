@@ -1,5 +1,6 @@
 const router = require('express').Router();
 const { getCollection } = require('../utils/database');
+const { normalizeCoin } = require('../utils/positions');
 router.get("/version",(req,res)=>res.send("Version 1.0"))
 // GET /getPositionCount/:coinName/:tableName?side=Long|Short
 // Returns the total count of positions for a specific coin with status 'open'
@@ -16,7 +17,7 @@ router.get('/getPositionCount/:coinName/:tableName', async (req, res) => {
 
     // Build query filter
     let filter = {
-      coinName: { $regex: `^${coinName}$`, $options: 'i' },
+      coinName: normalizeCoin(coinName),
       status: 'open'
     };
 
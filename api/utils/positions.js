@@ -0,0 +1,12 @@
+// Same conventions as shard2/api/utils/positions.js, which serves the same
+// TradeServer database: coin names are stored upper-case and every position
+// write stamps updatedAt (ms) for incremental /gettrades?since= syncs
+
+// Coin names are stored upper-case so lookups are exact matches on the index
+function normalizeCoin(coinName) {
+  return String(coinName || "").trim().toUpperCase();
+}
+
+module.exports = {
+  normalizeCoin,
+};
@@ -1,15 +1,18 @@
 import requests
 import datetime
-import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
 from tqdm import tqdm
 
+# Vendored copies of shard2/runner/scheduler.py and events.py, so bots/ runs on its own
+from scheduler import Scheduler, ServerClock, http_server_time
+from events import EventLog, DEBUG, INFO
+
 BASE_URL = "https://fapi.binance.com"
 prodMode = False
 
-def serial(data):
-    if prodMode == False:
-        print(data)
+log = EventLog(Path(__file__).stem, level=INFO if prodMode else DEBUG)
+
 def get_active_futures_symbols():
     url = f"{BASE_URL}/fapi/v1/exchangeInfo"
     try:
@@ -95,7 +98,7 @@ def get_top_losers(futures_data, top_n=1):
 
 
 def run():
-    serial("\nChecking top gainers and losers...")
+    log.debug("Checking top gainers and losers...")
 
     symbols = get_active_futures_symbols()
     if not symbols:
@@ -134,10 +137,10 @@ def CloseTrade(coin):
     }    
     try:
         response = requests.post(url, json=payload)
-        serial(f"? Closing trade for {coin}: {response.text}")
+        log.debug("Closing trade for {coin}: {body}", coin=coin, body=response.text)
         return response.status_code == 200
     except Exception as e:
-        serial(f"? Failed to close trade for {coin}: {e}")
+        log.debug("Failed to close trade for {coin}: {error}", coin=coin, error=e)
         return False
 
 
@@ -157,10 +160,10 @@ def OpenTrade(coin):
     try:
         response = requests.post(url, json=payload)
         response2 = requests.post(url2,json=payload2)
-        serial(f"? Opening trade for {coin}: {response.text}")
+        log.debug("Opening trade for {coin}: {body}", coin=coin, body=response.text)
         return response.status_code == 200
     except Exception as e:
-        serial(f"? Failed to open trade for {coin}: {e}")
+        log.debug("Failed to open trade for {coin}: {error}", coin=coin, error=e)
         return False
 
 
@@ -174,10 +177,10 @@ def CloseShortTrade(coin):
     }    
     try:
         response = requests.post(url, json=payload)
-        serial(f"? Closing short trade for {coin}: {response.text}")
+        log.debug("Closing short trade for {coin}: {body}", coin=coin, body=response.text)
         return response.status_code == 200
     except Exception as e:
-        serial(f"? Failed to close short trade for {coin}: {e}")
+        log.debug("Failed to close short trade for {coin}: {error}", coin=coin, error=e)
         return False
 
 
@@ -197,10 +200,10 @@ def OpenShortTrade(coin):
     try:
         response = requests.post(url, json=payload)
         response2 = requests.post(url2,json=payload2)
-        serial(f"? Opening short trade for {coin}: {response.text}")
+        log.debug("Opening short trade for {coin}: {body}", coin=coin, body=response.text)
         return response.status_code == 200
     except Exception as e:
-        serial(f"? Failed to open short trade for {coin}: {e}")
+        log.debug("Failed to open short trade for {coin}: {error}", coin=coin, error=e)
         return False
 
 
@@ -219,7 +222,7 @@ def SetCoins(new_coins):
 
     coins = new_coins.copy()
 
-    serial(f"Current Active Coins: {coins} (Total: {len(coins)})")
+    log.debug("Current Active Coins: {coins} (Total: {})", len(coins), coins=coins)
 
 
 def SetLoserCoins(new_loser_coins):
@@ -237,17 +240,22 @@ def SetLoserCoins(new_loser_coins):
 
     loser_coins = new_loser_coins.copy()
 
-    serial(f"Current Active Loser Coins (Short): {loser_coins} (Total: {len(loser_coins)})")
+    log.debug("Current Active Loser Coins (Short): {loser_coins} (Total: {})", len(loser_coins), loser_coins=loser_coins)
+
+
+def scan():
+    new_coins, new_loser_coins = run()
+    if new_coins:
+        SetCoins(new_coins)
+    if new_loser_coins:
+        SetLoserCoins(new_loser_coins)
+
+    requests.get("http://f1.itsarex.com:5007/ping")
 
 
 if __name__ == "__main__":
-    while True:
-        new_coins, new_loser_coins = run()
-        if new_coins:
-            SetCoins(new_coins)
-        if new_loser_coins:
-            SetLoserCoins(new_loser_coins)
-
-        serial("\nSleeping for 10 minutes...\n")
-        requests.get("http://f1.itsarex.com:5007/ping")
-        time.sleep(600)
+    # Every 10 minutes on the clock (:00, :10, ...) in exchange time; a slow
+    # scan no longer pushes the next one later.
+    scheduler = Scheduler(ServerClock(http_server_time(f"{BASE_URL}/fapi/v1/time")))
+    scheduler.add("scan", "10m", scan, run_now=True)
+    scheduler.run_forever()
@@ -1,15 +1,18 @@
 import requests
 import datetime
-import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
 from tqdm import tqdm
 
+# Vendored copies of shard2/runner/scheduler.py and events.py, so bots/ runs on its own
+from scheduler import Scheduler, ServerClock, http_server_time
+from events import EventLog, DEBUG, INFO
+
 BASE_URL = "https://fapi.binance.com"
 prodMode = True
 
-def serial(data):
-    if prodMode == False:
-        print(data)
+log = EventLog(Path(__file__).stem, level=INFO if prodMode else DEBUG)
+
 def get_active_futures_symbols():
     url = f"{BASE_URL}/fapi/v1/exchangeInfo"
     try:
@@ -86,7 +89,7 @@ def get_top_gainers(futures_data, top_n=5):
 
 
 def run():
-    serial("\nChecking top gainers...")
+    log.debug("Checking top gainers...")
 
     symbols = get_active_futures_symbols()
     if not symbols:
@@ -128,10 +131,10 @@ def CloseTrade(coin):
     try:
         response = requests.post(url, json=payload)
         response2 = requests.post(url2,json=payload2)
-        serial(f"❌ Closing trade for {coin}: {response.text}")
+        log.debug("Closing trade for {coin}: {body}", coin=coin, body=response.text)
         return response.status_code == 200
     except Exception as e:
-        serial(f"❌ Failed to close trade for {coin}: {e}")
+        log.debug("Failed to close trade for {coin}: {error}", coin=coin, error=e)
         return False
 
 
@@ -150,10 +153,10 @@ def OpenTrade(coin):
     try:
         response = requests.post(url, json=payload)
         response2 = requests.post(url2,json=payload2)
-        serial(f"✅ Opening trade for {coin}: {response.text}")
+        log.debug("Opening trade for {coin}: {body}", coin=coin, body=response.text)
         return response.status_code == 200
     except Exception as e:
-        serial(f"❌ Failed to open trade for {coin}: {e}")
+        log.debug("Failed to open trade for {coin}: {error}", coin=coin, error=e)
         return False
 
 
@@ -172,15 +175,20 @@ def SetCoins(new_coins):
 
     coins = new_coins.copy()
 
-    serial(f"Current Active Coins: {coins} (Total: {len(coins)})")
+    log.debug("Current Active Coins: {coins} (Total: {})", len(coins), coins=coins)
+
+
+def scan():
+    new_coins = run()
+    if new_coins:
+        SetCoins(new_coins)
+
+    requests.get("http://localhost:5007/ping")
 
 
 if __name__ == "__main__":
-    while True:
-        new_coins = run()
-        if new_coins:
-            SetCoins(new_coins)
-
-        serial("\nSleeping for 10 minutes...\n")
-        requests.get("http://localhost:5007/ping")
-        time.sleep(600)
+    # Every 10 minutes on the clock (:00, :10, ...) in exchange time; a slow
+    # scan no longer pushes the next one later.
+    scheduler = Scheduler(ServerClock(http_server_time(f"{BASE_URL}/fapi/v1/time")))
+    scheduler.add("scan", "10m", scan, run_now=True)
+    scheduler.run_forever()
@@ -0,0 +1,130 @@
+# Vendored copy of shard2/runner/events.py; keep the two in sync.
+# =====================
+# IMPORTS
+# =====================
+import json
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+# =====================
+# PARAMETERS
+# =====================
+DEBUG, INFO, WARNING, ERROR = 10, 20, 30, 40
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING", ERROR: "ERROR"}
+RING_SIZE = 2000  # recent events kept in memory for dump()
+
+
+def _format(msg: str, args: tuple, fields: dict) -> str:
+    if not args and not fields:
+        return msg
+    try:
+        return msg.format(*args, **fields)
+    except (IndexError, KeyError, ValueError, TypeError) as e:
+        return f"{msg} {args} {fields} (format error: {e})"
+
+
+class EventLog:
+    """Structured event logger for the runners.
+
+    Messages are str.format templates; the template, its args and named
+    fields are stored as given and only formatted for a sink that takes the
+    event. Events below `ring_level` cost a comparison; events below `level`
+    but at or above `ring_level` cost a tuple in the ring buffer.
+
+        log.info("{coin}: Opening short position with cup {cup_id}...", coin=coin, cup_id=cup_id)
+
+    stdout keeps the runners' "[<local time>] message" lines; `sink` (a path)
+    additionally gets one JSON object per event with the named fields as keys.
+    """
+
+    def __init__(self, name: str, level: int = INFO, ring_level: int = DEBUG, ring_size: int = RING_SIZE,
+                 stream=sys.stdout, sink=None, dump_path=None, clock=time.time):
+        self.name = name
+        self.level = level
+        self.ring_level = ring_level
+        self.ring = deque(maxlen=ring_size)
+        self.stream = stream
+        self.sink = None
+        self.dump_path = Path(dump_path) if dump_path else None
+        self.clock = clock
+        self.lock = threading.Lock()
+        if sink:
+            self.open_sink(sink)
+
+    def open_sink(self, path):
+        """Append every event at or above `level` to `path` as JSON lines."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self.lock:
+            if self.sink:
+                self.sink.close()
+            self.sink = open(path, "a", buffering=1)
+
+    def enabled(self, level: int) -> bool:
+        return level >= self.level
+
+    def log(self, level: int, msg: str, *args, **fields):
+        if level < self.ring_level and level < self.level:
+            return
+        event = (self.clock(), level, msg, args, fields)
+        self.ring.append(event)
+        if level >= self.level:
+            self.emit(event)
+
+    def debug(self, msg: str, *args, **fields):
+        if DEBUG >= self.ring_level or DEBUG >= self.level:
+            self.log(DEBUG, msg, *args, **fields)
+
+    def info(self, msg: str, *args, **fields):
+        self.log(INFO, msg, *args, **fields)
+
+    def warning(self, msg: str, *args, **fields):
+        self.log(WARNING, msg, *args, **fields)
+
+    def error(self, msg: str, *args, **fields):
+        self.log(ERROR, msg, *args, **fields)
+
+    def exception(self, msg: str, *args, **fields):
+        """Log an error with the current traceback, then dump the ring buffer to dump_path."""
+        self.log(ERROR, msg + "\n{}", *args, traceback.format_exc().rstrip(), **fields)
+        if self.dump_path:
+            try:
+                self.dump(self.dump_path)
+            except OSError:
+                pass
+
+    # =====================
+    # SINKS
+    # =====================
+    def emit(self, event: tuple):
+        ts, level, msg, args, fields = event
+        text = _format(msg, args, fields)
+        with self.lock:
+            if self.stream is not None:
+                prefix = "" if level < WARNING else f"{LEVEL_NAMES[level]} "
+                self.stream.write(f"[{datetime.fromtimestamp(ts)}] {prefix}{text}\n")
+            if self.sink is not None:
+                record = {"ts": round(ts, 6), "level": LEVEL_NAMES[level], "logger": self.name, "msg": text}
+                record.update(fields)
+                self.sink.write(json.dumps(record, default=str) + "\n")
+
+    def lines(self) -> list:
+        """The ring buffer, oldest first, formatted like stdout."""
+        return [
+            f"[{datetime.fromtimestamp(ts)}] {LEVEL_NAMES[level]} {_format(msg, args, fields)}"
+            for ts, level, msg, args, fields in list(self.ring)
+        ]
+
+    def dump(self, path=None) -> list:
+        """Write the ring buffer to `path` (overwritten) or return it as lines."""
+        lines = self.lines()
+        if path is not None:
+            path = Path(path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text("\n".join(lines) + "\n")
+        return lines
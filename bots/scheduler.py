@@ -0,0 +1,201 @@
+# Vendored copy of shard2/runner/scheduler.py; keep the two in sync.
+# =====================
+# IMPORTS
+# =====================
+import time
+import traceback
+from datetime import datetime, timezone
+
+import requests
+
+# =====================
+# PARAMETERS
+# =====================
+OFFSET_REFRESH = 900         # seconds between exchange server time syncs
+OFFSET_SAMPLES = 3           # time requests per sync; the lowest round trip wins
+MAX_SLEEP = 60               # re-read the clock at least this often while waiting
+UNIT_MS = {"s": 1000, "m": 60_000, "h": 3_600_000, "d": 86_400_000, "w": 604_800_000}
+
+
+def parse_every(every) -> int:
+    """Cadence in ms from a candle timeframe ("15m", "1h") or a number of seconds."""
+    if isinstance(every, str):
+        return int(every[:-1]) * UNIT_MS[every[-1]]
+    return int(every * 1000)
+
+
+def http_server_time(url: str, timeout: float = 5):
+    """fetch_time() for a Binance REST time endpoint (/api/v3/time, /fapi/v1/time)."""
+    def fetch_time() -> int:
+        resp = requests.get(url, timeout=timeout)
+        resp.raise_for_status()
+        return int(resp.json()["serverTime"])
+
+    return fetch_time
+
+
+class ServerClock:
+    """Exchange server time from the local clock plus a measured offset.
+
+    The offset is the server time minus the midpoint of the request, taken
+    from the sample with the shortest round trip. Without fetch_time this is
+    just the local clock.
+    """
+
+    def __init__(self, fetch_time=None, local_time=time.time, refresh: float = OFFSET_REFRESH):
+        self.fetch_time = fetch_time
+        self.local_time = local_time
+        self.refresh = refresh
+        self.offset_ms = 0.0
+        self.rtt_ms = None
+        self.synced = None
+
+    def sync(self):
+        best = None
+        for _ in range(OFFSET_SAMPLES):
+            t0 = self.local_time()
+            server_ms = self.fetch_time()
+            t1 = self.local_time()
+            rtt = (t1 - t0) * 1000
+            if best is None or rtt < best[0]:
+                best = (rtt, server_ms - (t0 + t1) / 2 * 1000)
+        self.rtt_ms, self.offset_ms = best
+        self.synced = self.local_time()
+
+    def now_ms(self) -> int:
+        if self.fetch_time is not None and (self.synced is None or self.local_time() - self.synced > self.refresh):
+            try:
+                self.sync()
+            except Exception as e:
+                print(f"[{datetime.now()}] Server time sync failed, keeping offset {self.offset_ms:.0f}ms: {e}")
+                self.synced = self.local_time()
+        return int(self.local_time() * 1000 + self.offset_ms)
+
+
+class Job:
+    """One scheduled callable and its timing metrics (all times in server ms)."""
+
+    def __init__(self, name: str, every_ms: int, fn, offset_ms: int = 0, gate=None):
+        self.name = name
+        self.every_ms = every_ms
+        self.offset_ms = offset_ms
+        self.fn = fn
+        self.gate = gate
+        self.next_run_ms = None
+        self.runs = 0
+        self.missed = 0            # slots skipped because the previous run or a stall overran them
+        self.errors = 0
+        self.last_lateness_ms = None
+        self.max_lateness_ms = 0
+        self.last_gate_ms = None
+        self.last_duration_ms = None
+
+    def slot_after(self, now_ms: int) -> int:
+        """First slot strictly after now_ms: a boundary of every_ms plus offset_ms."""
+        return ((now_ms - self.offset_ms) // self.every_ms + 1) * self.every_ms + self.offset_ms
+
+    def metrics(self) -> dict:
+        return {
+            "every_ms": self.every_ms,
+            "next_run_ms": self.next_run_ms,
+            "runs": self.runs,
+            "missed": self.missed,
+            "errors": self.errors,
+            "last_lateness_ms": self.last_lateness_ms,
+            "max_lateness_ms": self.max_lateness_ms,
+            "last_gate_ms": self.last_gate_ms,
+            "last_duration_ms": self.last_duration_ms,
+        }
+
+
+class Scheduler:
+    """Run jobs on candle boundaries of their own cadence.
+
+    Slots are absolute (k * every + offset in exchange time), so a job's
+    runtime never pushes the next run later and ServerClock removes local
+    clock skew. After a stall a job that missed several slots runs once and
+    resumes at the next slot; the skipped ones are counted in `missed`.
+    An optional gate(boundary_ms) runs before the job on aligned slots,
+    e.g. CandleCloseWaiter.wait to hold the job until the candle is final.
+    """
+
+    def __init__(self, clock: ServerClock = None, sleep=time.sleep, max_sleep: float = MAX_SLEEP):
+        self.clock = clock or ServerClock()
+        self.sleep = sleep
+        self.max_sleep = max_sleep
+        self.jobs = []
+
+    def add(self, name: str, every, fn, offset: float = 0, gate=None, run_now: bool = False) -> Job:
+        job = Job(name, parse_every(every), fn, int(offset * 1000), gate)
+        now = self.clock.now_ms()
+        job.next_run_ms = now if run_now else job.slot_after(now)
+        self.jobs.append(job)
+        return job
+
+    def next_run_ms(self):
+        return min((job.next_run_ms for job in self.jobs), default=None)
+
+    def run_job(self, job: Job):
+        slot = job.next_run_ms
+        gate_started = self.clock.now_ms()
+        if job.gate is not None and (slot - job.offset_ms) % job.every_ms == 0:
+            try:
+                job.gate(slot - job.offset_ms)
+            except Exception as e:
+                # A broken gate skips this slot only; the job and the others keep their schedule
+                job.errors += 1
+                job.next_run_ms = job.slot_after(self.clock.now_ms())
+                print(f"[{datetime.now()}] Job {job.name} gate failed, skipping its slot: {e}")
+                traceback.print_exc()
+                return
+        started = self.clock.now_ms()
+        job.last_gate_ms = started - gate_started
+        job.last_lateness_ms = started - slot
+        job.max_lateness_ms = max(job.max_lateness_ms, job.last_lateness_ms)
+        try:
+            job.fn()
+        except Exception as e:
+            job.errors += 1
+            print(f"[{datetime.now()}] Job {job.name} failed: {e}")
+            traceback.print_exc()
+        finished = self.clock.now_ms()
+        job.last_duration_ms = finished - started
+        job.runs += 1
+        job.next_run_ms = job.slot_after(finished)
+        skipped = (job.next_run_ms - slot) // job.every_ms - 1
+        if skipped > 0:
+            job.missed += skipped
+            print(f"[{datetime.now()}] Job {job.name}: {skipped} slots skipped, running once for them")
+
+        next_dt = datetime.fromtimestamp(job.next_run_ms / 1000, tz=timezone.utc)
+        print(
+            f"[{datetime.now()}] Job {job.name} done in {job.last_duration_ms / 1000:.1f}s "
+            f"({job.last_lateness_ms / 1000:.2f}s after its slot, {job.last_gate_ms / 1000:.2f}s gated), "
+            f"next at {next_dt.isoformat()}"
+        )
+
+    def run_pending(self) -> int:
+        """Run every job whose slot has come, oldest slot first; returns how many ran."""
+        now = self.clock.now_ms()
+        due = sorted((job for job in self.jobs if job.next_run_ms <= now), key=lambda job: job.next_run_ms)
+        for job in due:
+            self.run_job(job)
+        return len(due)
+
+    def run_forever(self, until=None):
+        """Loop run_pending and sleep until the next slot; stop once until() is true."""
+        while until is None or not until():
+            if self.run_pending():
+                continue
+            wait_ms = self.next_run_ms() - self.clock.now_ms()
+            if wait_ms > 0:
+                # Short naps re-read the clock, so suspends and offset changes are caught
+                self.sleep(min(wait_ms / 1000, self.max_sleep))
+
+    def metrics(self) -> dict:
+        now = self.clock.now_ms()
+        return {
+            "now_ms": now,
+            "clock_offset_ms": self.clock.offset_ms,
+            "jobs": {job.name: job.metrics() for job in self.jobs},
+        }
@@ -2,6 +2,7 @@ const express = require('express');
 const path = require('path');
 const cors = require('cors');
 const { connectDB } = require('./utils/database');
+const { ensurePositionIndexes } = require('./utils/positions');
 const root = require('./routes/hello');
 const managePosition = require('./routes/managePosition');
 const getTrades = require('./routes/getTrades');
@@ -45,8 +46,8 @@ app.get("/brick", (req, res) => res.sendFile(path.join(__dirname, 'public', 'bri
 app.get("/admin", (req, res) => res.sendFile(path.join(__dirname, 'public', 'sub.html')))
 app.get("/allcharts", (req, res) => res.sendFile(path.join(__dirname, 'public', 'AllCharts.html')))
 app.get("/candle", (req, res) => res.sendFile(path.join(__dirname, 'public', 'CandleChart.html')))
-// Connect to MongoDB and start server
-connectDB().then(() => {
+// Connect to MongoDB, index the strategy tables and start server
+connectDB().then(() => ensurePositionIndexes()).then(() => {
     app.listen(PORT, () => {
         console.log(`Trade server is running on port ${PORT}`);
     });
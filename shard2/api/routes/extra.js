@@ -1,7 +1,7 @@
-const { getCollection } = require("../utils/database");
 const axios = require("axios");
 const ccxt = require("ccxt");
 const { ManageSubscriptions } = require("../utils/subscriptionManagement");
+const { normalizeCoin, positionsCollection } = require("../utils/positions");
 
 // Initialize Binance futures exchange
 const exchange = new ccxt.binance({
@@ -29,8 +29,9 @@ async function fetchPriceFor(symbol) {
 }
 
 // Add extra USD to an open position
-let addExtra = async (coinName, collectionName, extraUsd = 100) => {
-  const collection = getCollection(collectionName);
+let addExtra = async (coinName, collectionName, extraUsd = 100, traceId = null) => {
+  const collection = positionsCollection(collectionName, { prepare: true });
+  coinName = normalizeCoin(coinName);
 
   // Ensure extraUsd is numeric
   extraUsd = Number(extraUsd);
@@ -39,10 +40,7 @@ let addExtra = async (coinName, collectionName, extraUsd = 100) => {
   }
 
   // Find any open position for this coin (Long or Short)
-  const position = await collection.findOne({
-    coinName: { $regex: `^${coinName}$`, $options: "i" },
-    status: "open",
-  });
+  const position = await collection.findOne({ coinName, status: "open" });
 
   if (!position) {
     throw new Error("No open position found for " + coinName);
@@ -56,9 +54,9 @@ let addExtra = async (coinName, collectionName, extraUsd = 100) => {
   const oldEntryPrice = Number(position.entryPrice);
   try{
     if(position.positionSide == "Long"){
-      ManageSubscriptions(collectionName,coinName,"Extra Long")
+      ManageSubscriptions(collectionName,coinName,"Extra Long",1,false,traceId)
     }else if(position.positionSide == "Short"){
-      ManageSubscriptions(collectionName,coinName,"Extra Short")
+      ManageSubscriptions(collectionName,coinName,"Extra Short",1,false,traceId)
     }
   }catch(e){
     
@@ -78,6 +76,7 @@ let addExtra = async (coinName, collectionName, extraUsd = 100) => {
     { _id: position._id },
     {
       $set: {
+        updatedAt: Date.now(),
         positionSize: newPositionSize,
         entryPrice: newEntryPrice,
       },
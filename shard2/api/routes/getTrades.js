@@ -1,5 +1,8 @@
 const router = require('express').Router();
-const { getCollection } = require('../utils/database');
+const { ObjectId } = require('mongodb');
+const { normalizeCoin, positionsCollection } = require('../utils/positions');
+
+const MAX_PAGE = 5000;
 
 // GET /tables - returns all collections in the MongoDB database
 router.get('/tables', async (req, res) => {
@@ -14,14 +17,38 @@ router.get('/tables', async (req, res) => {
   }
 });
 
+// "<number>,<ObjectId hex>" -> [number, ObjectId]; throws on anything else
+function parseCursor(cursor) {
+  const [key, id] = String(cursor).split(',');
+  if (key === undefined || id === undefined || Number.isNaN(Number(key)) || !ObjectId.isValid(id)) {
+    throw new Error('Invalid cursor, expected "<number>,<id>"');
+  }
+  return [Number(key), new ObjectId(id)];
+}
+
+// ?fields=a,b,c -> projection; the cursor fields are always included
+function parseFields(fields, cursorField) {
+  if (!fields) return null;
+  const projection = { _id: 1, [cursorField]: 1 };
+  String(fields).split(',').map(f => f.trim()).filter(f => /^[A-Za-z0-9_]+$/.test(f)).forEach(f => { projection[f] = 1; });
+  return projection;
+}
+
 // GET /gettrades?tableName&coinName&status
 // Also accepts /gettrade as an alias. If no query params are provided, returns the whole table.
+// Paging (any of these switches to pages of at most `limit` trades):
+//   limit=N                 page size (default and max MAX_PAGE)
+//   after=<entryTime>,<_id> next page of the newest-first listing (`next` of the previous page)
+//   since=<ms>              trades inserted or changed after this updatedAt, oldest change first;
+//                           page on with after=<updatedAt>,<_id> and keep `until` for the next call
+//   fields=a,b,c            only these fields (plus _id and the cursor field)
 async function handleGetTrades(req, res) {
   try {
     // Accept either `coinName` or `coinname` from query
     let collectionName = req.query.tableName || 'positions';
     let coinName = req.query.coinName || req.query.coinname;
     let status = req.query.status || 'all';
+    const { limit, after, since, fields } = req.query;
 
     // Normalize status values: allow 'closed' -> 'close'
     if (typeof status === 'string') {
@@ -33,21 +60,65 @@ async function handleGetTrades(req, res) {
     let filter = {};
 
     if (coinName) {
-      filter.coinName = { $regex: `^${coinName}$`, $options: 'i' };
+      filter.coinName = normalizeCoin(coinName);
     }
 
     if (status && status !== 'all') {
       filter.status = status;
     }
 
-    const collection = getCollection(collectionName);
-    const trades = await collection.find(filter).sort({ entryTime: -1 }).toArray();
+    const collection = positionsCollection(collectionName);
+
+    if (limit === undefined && after === undefined && since === undefined && fields === undefined) {
+      const trades = await collection.find(filter).sort({ entryTime: -1 }).toArray();
+      return res.json({
+        message: 'Trades retrieved successfully',
+        count: trades.length,
+        trades
+      });
+    }
+
+    const incremental = since !== undefined;
+    const cursorField = incremental ? 'updatedAt' : 'entryTime';
+    const pageSize = Math.min(Math.max(Number(limit) || MAX_PAGE, 1), MAX_PAGE);
+    let sort = { entryTime: -1, _id: -1 };
 
-    res.json({
+    if (incremental) {
+      if (Number.isNaN(Number(since))) {
+        return res.status(400).json({ error: 'since must be a number (ms)' });
+      }
+      filter.updatedAt = { $gt: Number(since) };
+      sort = { updatedAt: 1, _id: 1 };
+    }
+    if (after !== undefined) {
+      let key, id;
+      try {
+        [key, id] = parseCursor(after);
+      } catch (err) {
+        return res.status(400).json({ error: err.message });
+      }
+      // Strictly past the cursor in sort order
+      const op = incremental ? '$gt' : '$lt';
+      const rangeFilter = { $or: [{ [cursorField]: { [op]: key } }, { [cursorField]: key, _id: { [op]: id } }] };
+      filter = { $and: [filter, rangeFilter] };
+    }
+
+    let query = collection.find(filter).sort(sort).limit(pageSize);
+    const projection = parseFields(fields, cursorField);
+    if (projection) query = query.project(projection);
+    const trades = await query.toArray();
+
+    const last = trades[trades.length - 1];
+    const response = {
       message: 'Trades retrieved successfully',
       count: trades.length,
-      trades
-    });
+      trades,
+      next: trades.length === pageSize ? `${last[cursorField]},${last._id}` : null
+    };
+    if (incremental) {
+      response.until = last ? last.updatedAt : Number(since);
+    }
+    res.json(response);
   } catch (err) {
     console.error('Error fetching trades:', err);
     return res.status(500).json({ error: 'Error fetching trades' });
@@ -4,6 +4,8 @@ const ccxt = require("ccxt");
 const axios = require("axios");
 const { ManageSubscriptions } = require("../utils/subscriptionManagement");
 const { safePost } = require("../utils/safePost");
+const { traceHop } = require("../utils/trace");
+const { normalizeCoin, positionsCollection } = require("../utils/positions");
 const addExtra = require("./extra");
 
 // Initialize Binance exchange (use Binance for price fetching)
@@ -153,7 +155,7 @@ function calculateMinMaxProfitFromCandles(position, candles) {
 }
 
 // Helper to close open positions for the given side (used internally to avoid remote calls)
-async function closeOpenPositions(collection, coinName, side, collectionName) {
+async function closeOpenPositions(collection, coinName, side, collectionName, traceId = null) {
   try {
     const exitPrice = await fetchPriceFor(coinName);
     const exitTime = Math.floor(Date.now() / 1000);
@@ -228,6 +230,7 @@ async function closeOpenPositions(collection, coinName, side, collectionName) {
         { _id: position._id },
         {
           $set: {
+            updatedAt: Date.now(),
             exitTime,
             exitPrice,
             status: "close",
@@ -257,7 +260,7 @@ async function closeOpenPositions(collection, coinName, side, collectionName) {
     // Notify subscription manager about the close
     if (positions.length > 0 && collectionName) {
       const action = side === "Long" ? "CloseLong" : "CloseShort";
-      await ManageSubscriptions(collectionName, coinName, action);
+      await ManageSubscriptions(collectionName, coinName, action, 1, false, traceId);
     }
 
     return { positionsClosed: positions.length, closedPositions };
@@ -270,7 +273,7 @@ async function closeOpenPositions(collection, coinName, side, collectionName) {
 router.post("/manage/:coinName", async (req, res) => {
   try {
     let { Action } = req.body;
-    let { coinName } = req.params;
+    let coinName = normalizeCoin(req.params.coinName);
     let multiplier = Number(req.query.mult) || 1;
     let appendable = req.query.appendable || true
     let hedgeMode = req.query.hedge === "true"  
@@ -286,10 +289,21 @@ router.post("/manage/:coinName", async (req, res) => {
     // Validate collectionName (allow only letters, numbers, underscore)
     if (!/^[A-Za-z0-9_]+$/.test(collectionName)) collectionName = "positions";
 
-    const collection = getCollection(collectionName);
+    // Bots send a trace id per decision; log each hop so latency can be followed end to end
+    const traceId = req.get("X-Trace-Id");
+    traceHop(traceId, "received", {
+      table: collectionName,
+      coin: coinName,
+      action: Action,
+      candleClose: Number(req.get("X-Candle-Close")) || null,
+    });
+    res.on("finish", () => traceHop(traceId, "acked", { status: res.statusCode }));
+    res.on("finish", () => bestCache.delete(collectionName));
+
+    const collection = positionsCollection(collectionName, { prepare: true });
     const entryTime = Math.floor(Date.now() / 1000); // UNIX epoch time
     if(Action == "Extra"){
-        let _res = await addExtra(coinName,collectionName,100)
+        let _res = await addExtra(coinName,collectionName,100,traceId)
         return res.send(_res)
     }
 
@@ -304,9 +318,9 @@ router.post("/manage/:coinName", async (req, res) => {
         return res.status(400).json({ message: "Long position already open for this coin" });
       }
       // if there is short opened close it first (local call to avoid remote race / older deployments)
-      ManageSubscriptions(collectionName,coinName,"Long",multiplier,appendable);
+      ManageSubscriptions(collectionName,coinName,"Long",multiplier,appendable,traceId);
       if(!hedgeMode)
-        await closeOpenPositions(collection, coinName, "Short", collectionName);
+        await closeOpenPositions(collection, coinName, "Short", collectionName, traceId);
       
 
       // Get current price from Binance (ccxt first, then REST fallback)
@@ -314,6 +328,7 @@ router.post("/manage/:coinName", async (req, res) => {
 
       // Insert open Long position
       const result = await collection.insertOne({
+        updatedAt: Date.now(),
         entryTime,
         exitTime: 0,
         coinName,
@@ -352,14 +367,15 @@ router.post("/manage/:coinName", async (req, res) => {
         return res.status(400).json({ message: "Short position already open for this coin" });
       }
       // if there is long opened close it first (local call to avoid remote race / older deployments)
-      ManageSubscriptions(collectionName,coinName,"Short",multiplier,appendable);
+      ManageSubscriptions(collectionName,coinName,"Short",multiplier,appendable,traceId);
       if(!hedgeMode)
-        await closeOpenPositions(collection, coinName, "Long", collectionName);
+        await closeOpenPositions(collection, coinName, "Long", collectionName, traceId);
       // Get current price from Binance (ccxt first, then REST fallback)
       const entryPrice = await fetchPriceFor(coinName);
 
       // Insert open Short position
       const result = await collection.insertOne({
+        updatedAt: Date.now(),
         entryTime,
         exitTime: 0,
         coinName,
@@ -387,7 +403,7 @@ router.post("/manage/:coinName", async (req, res) => {
       });
       //await ManageSubscriptions(collectionName,coinName,"Short");
     } else if (Action == "CloseLong") {
-      ManageSubscriptions(collectionName,coinName,"CloseLong");
+      ManageSubscriptions(collectionName,coinName,"CloseLong",1,false,traceId);
       // Get current price from Binance (ccxt first, then REST fallback)
       const exitPrice = await fetchPriceFor(coinName);
       const exitTime = Math.floor(Date.now() / 1000); // UNIX epoch time
@@ -476,6 +492,7 @@ router.post("/manage/:coinName", async (req, res) => {
           { _id: position._id },
           {
             $set: {
+              updatedAt: Date.now(),
               exitTime,
               exitPrice,
               status: "close",
@@ -510,7 +527,7 @@ router.post("/manage/:coinName", async (req, res) => {
       });
       // await ManageSubscriptions(collectionName,coinName,"CloseLong");
     } else if (Action == "CloseShort") {
-      ManageSubscriptions(collectionName,coinName,"CloseShort");
+      ManageSubscriptions(collectionName,coinName,"CloseShort",1,false,traceId);
       // Get current price from Binance (ccxt first, then REST fallback)
       const exitPrice = await fetchPriceFor(coinName);
       const exitTime = Math.floor(Date.now() / 1000); // UNIX epoch time
@@ -599,6 +616,7 @@ router.post("/manage/:coinName", async (req, res) => {
           { _id: position._id },
           {
             $set: {
+              updatedAt: Date.now(),
               exitTime,
               exitPrice,
               status: "close",
@@ -716,6 +734,7 @@ router.post("/manage/:coinName", async (req, res) => {
           { _id: positionId },
           {
             $set: {
+              updatedAt: Date.now(),
               exitTime,
               exitPrice,
               status: "close",
@@ -788,7 +807,7 @@ router.post("/manage/:coinName", async (req, res) => {
           if (updated) {
             await collection.updateOne(
               { _id: position._id },
-              { $set: { maxProfit, minProfit, maxProfitTime, minProfitTime } }
+              { $set: { updatedAt: Date.now(), maxProfit, minProfit, maxProfitTime, minProfitTime } }
             );
             updatedCount++;
           }
@@ -857,7 +876,7 @@ router.post("/manage/:coinName", async (req, res) => {
 
           await collection.updateOne(
             { _id: position._id },
-            { $set: { maxProfit, minProfit, maxProfitTime, minProfitTime } }
+            { $set: { updatedAt: Date.now(), maxProfit, minProfit, maxProfitTime, minProfitTime } }
           );
 
           updatedCount++;
@@ -947,6 +966,31 @@ router.post("/manage/:coinName", async (req, res) => {
   }
 });
 
+// Per-coin totals of closed trades, grouped inside MongoDB (a covering scan of
+// the status_coin_pnl index) and cached per table for BEST_TTL_MS or until the
+// next /manage or /partialclose on that table
+const BEST_TTL_MS = 30000;
+const bestCache = new Map(); // tableName -> { at, coins: Promise of the grouped rows }
+
+async function bestCoins(collection) {
+  return collection
+    .aggregate([
+      { $match: { status: "close" } },
+      { $project: { _id: 0, coinName: 1, pnl: { $ifNull: ["$pnl", 0] } } },
+      {
+        $group: {
+          _id: "$coinName",
+          totalPnl: { $sum: "$pnl" },
+          tradeCount: { $sum: 1 },
+          winCount: { $sum: { $cond: [{ $gt: ["$pnl", 0] }, 1, 0] } },
+          lossCount: { $sum: { $cond: [{ $lt: ["$pnl", 0] }, 1, 0] } },
+        },
+      },
+      { $sort: { totalPnl: -1 } },
+    ])
+    .toArray();
+}
+
 // New route to get best performing coins
 router.get("/getbest", async (req, res) => {
   try {
@@ -954,59 +998,39 @@ router.get("/getbest", async (req, res) => {
     // Validate collectionName (allow only letters, numbers, underscore)
     if (!/^[A-Za-z0-9_]+$/.test(collectionName)) collectionName = "positions";
 
-    const collection = getCollection(collectionName);
-
-    // Get all closed trades
-    const closedTrades = await collection.find({ status: "close" }).toArray();
+    // Concurrent requests on a cold table share one aggregation
+    let cached = bestCache.get(collectionName);
+    if (!cached || Date.now() - cached.at > BEST_TTL_MS) {
+      cached = { at: Date.now(), coins: bestCoins(positionsCollection(collectionName)) };
+      bestCache.set(collectionName, cached);
+    }
+    let coins;
+    try {
+      coins = await cached.coins;
+    } catch (err) {
+      if (bestCache.get(collectionName) === cached) bestCache.delete(collectionName);
+      throw err;
+    }
 
-    if (closedTrades.length === 0) {
+    if (coins.length === 0) {
       return res.json({
         message: "No closed trades found",
         coins: [],
       });
     }
 
-    // Group trades by coin and calculate total PnL for each coin
-    const coinPerformance = {};
-
-    closedTrades.forEach((trade) => {
-      const coinName = trade.coinName;
-      const pnl = trade.pnl || 0;
-
-      if (!coinPerformance[coinName]) {
-        coinPerformance[coinName] = {
-          coinName: coinName,
-          totalPnl: 0,
-          tradeCount: 0,
-          winCount: 0,
-          lossCount: 0,
-        };
-      }
-
-      coinPerformance[coinName].totalPnl += pnl;
-      coinPerformance[coinName].tradeCount += 1;
-
-      if (pnl > 0) {
-        coinPerformance[coinName].winCount += 1;
-      } else if (pnl < 0) {
-        coinPerformance[coinName].lossCount += 1;
-      }
-    });
-
-    // Convert to array and sort by total PnL (best performing first)
-    const sortedCoins = Object.values(coinPerformance)
-      .sort((a, b) => b.totalPnl - a.totalPnl)
-      .map((coin) => ({
-        coinName: coin.coinName,
-        totalPnl: Number(coin.totalPnl.toFixed(2)),
-        tradeCount: coin.tradeCount,
-        winCount: coin.winCount,
-        lossCount: coin.lossCount,
-        winRate:
-          coin.tradeCount > 0
-            ? Number(((coin.winCount / coin.tradeCount) * 100).toFixed(2))
-            : 0,
-      }));
+    // Best performing first
+    const sortedCoins = coins.map((coin) => ({
+      coinName: coin._id,
+      totalPnl: Number(coin.totalPnl.toFixed(2)),
+      tradeCount: coin.tradeCount,
+      winCount: coin.winCount,
+      lossCount: coin.lossCount,
+      winRate:
+        coin.tradeCount > 0
+          ? Number(((coin.winCount / coin.tradeCount) * 100).toFixed(2))
+          : 0,
+    }));
 
     res.json({
       message: "Best performing coins retrieved successfully",
@@ -1025,7 +1049,8 @@ router.get("/getbest", async (req, res) => {
 // Partial close route: closes a percentage of an open position
 router.get("/partialclose", async (req, res) => {
   try {
-    const { coinName, percSize, tableName } = req.query;
+    const { percSize, tableName } = req.query;
+    const coinName = normalizeCoin(req.query.coinName);
     const collectionName = tableName || "positions";
 
     // Validate input
@@ -1043,13 +1068,11 @@ router.get("/partialclose", async (req, res) => {
       return res.status(400).json({ error: "Invalid table name" });
     }
 
-    const collection = getCollection(collectionName);
+    const collection = positionsCollection(collectionName, { prepare: true });
+    res.on("finish", () => bestCache.delete(collectionName));
 
     // 1) Fetch open position for the coin
-    const openPosition = await collection.findOne({
-      coinName: { $regex: `^${coinName}$`, $options: "i" },
-      status: "open",
-    });
+    const openPosition = await collection.findOne({ coinName, status: "open" });
 
     if (!openPosition) {
       return res.status(404).json({ message: "No open position found for " + coinName });
@@ -1130,6 +1153,7 @@ router.get("/partialclose", async (req, res) => {
 
     // 6) Create closed position record for partial close
     const closedResult = await collection.insertOne({
+      updatedAt: Date.now(),
       entryTime: openPosition.entryTime,
       exitTime,
       coinName: openPosition.coinName,
@@ -1153,6 +1177,7 @@ router.get("/partialclose", async (req, res) => {
       { _id: openPosition._id },
       {
         $set: {
+          updatedAt: Date.now(),
           positionSize: remainingPositionSize,
         },
       }
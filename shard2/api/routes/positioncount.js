@@ -1,37 +1,36 @@
 const router = require('express').Router();
-const { getCollection } = require('../utils/database');
+const { normalizeCoin, positionsCollection } = require('../utils/positions');
 router.get("/version",(req,res)=>res.send("Version 1.0"))
-// GET /getPositionCount/:coinName/:tableName?side=Long|Short
-// Returns the total count of positions for a specific coin with status 'open'
-// Optional: ?side=Long or ?side=Short to filter by position side
-router.get('/getPositionCount/:coinName/:tableName', async (req, res) => {
-  try {
-    const { coinName, tableName } = req.params;
-    const { side } = req.query;
 
+// Exact-match count on the (coinName, status, positionSide) index prefix
+async function countPositions(req, res, { coinName, tableName, side, status }) {
+  try {
     // Validate side parameter if provided
     if (side && !['Long', 'Short'].includes(side)) {
       return res.status(400).json({ error: 'Invalid side. Must be "Long" or "Short"' });
     }
+    if (!/^[A-Za-z0-9_]+$/.test(tableName)) {
+      return res.status(400).json({ error: 'Invalid table name' });
+    }
 
     // Build query filter
     let filter = {
-      coinName: { $regex: `^${coinName}$`, $options: 'i' },
-      status: 'open'
+      coinName: normalizeCoin(coinName),
+      status: status || 'open'
     };
 
     if (side) {
       filter.positionSide = side;
     }
 
-    const collection = getCollection(tableName);
+    const collection = positionsCollection(tableName);
     const count = await collection.countDocuments(filter);
 
     res.json({
       message: 'Position count retrieved successfully',
       coinName,
       tableName,
-      status: 'open',
+      status: filter.status,
       side: side || 'all',
       count
     });
@@ -39,6 +38,21 @@ router.get('/getPositionCount/:coinName/:tableName', async (req, res) => {
     console.error('Error fetching position count:', err);
     return res.status(500).json({ error: 'Error fetching position count' });
   }
+}
+
+// GET /getPositionCount/:coinName/:tableName?side=Long|Short
+// Returns the total count of positions for a specific coin with status 'open'
+// Optional: ?side=Long or ?side=Short to filter by position side
+router.get('/getPositionCount/:coinName/:tableName', (req, res) => {
+  const { coinName, tableName } = req.params;
+  return countPositions(req, res, { coinName, tableName, side: req.query.side });
+});
+
+// GET /positioncount?coinName&positionSide&status&tableName
+// The runners' polling form (shard2/runner check_*_position_exists)
+router.get('/positioncount', (req, res) => {
+  const { coinName, positionSide, status, tableName } = req.query;
+  return countPositions(req, res, { coinName, tableName: tableName || 'positions', side: positionSide, status });
 });
 
 module.exports = router;
@@ -0,0 +1,95 @@
+const { getDB, getCollection } = require("./database");
+
+// Collections in the same database that are not strategy position tables
+// (subscriptions, routes/bias.js of the root api)
+const NON_POSITION_COLLECTIONS = ["Strategies", "userBias"];
+
+// Every position query filters on coinName + status (bot polling adds
+// positionSide); trade lists page by (entryTime, _id), incremental syncs by
+// (updatedAt, _id); /getbest groups closed trades' pnl by coin
+const POSITION_INDEXES = [
+  { key: { coinName: 1, status: 1, positionSide: 1, entryTime: -1 }, name: "coin_status_side_entry" },
+  { key: { entryTime: -1, _id: -1 }, name: "entry_id" },
+  { key: { updatedAt: 1, _id: 1 }, name: "updated_id" },
+  { key: { status: 1, coinName: 1, pnl: 1 }, name: "status_coin_pnl" },
+];
+
+// Coin names are stored upper-case so lookups are exact matches on the index
+function normalizeCoin(coinName) {
+  return String(coinName || "").trim().toUpperCase();
+}
+
+// A table holds positions when it is not a known other collection and has at
+// least one position document in it
+async function isPositionCollection(name) {
+  if (name.startsWith("system.") || NON_POSITION_COLLECTIONS.includes(name)) return false;
+  const position = await getCollection(name).findOne(
+    { coinName: { $type: "string" }, positionSide: { $exists: true }, entryTime: { $exists: true } },
+    { projection: { _id: 1 } }
+  );
+  return position !== null;
+}
+
+// Upper-case any coinName written before normalization (one scan per table
+// per process start), stamp updatedAt (ms) on positions written before it was
+// kept, then make sure the indexes exist. All are no-ops once done.
+async function preparePositionCollection(name) {
+  const collection = getCollection(name);
+  const renamed = await collection.updateMany(
+    { coinName: { $type: "string" }, $expr: { $ne: ["$coinName", { $toUpper: "$coinName" }] } },
+    [{ $set: { coinName: { $toUpper: "$coinName" }, updatedAt: { $toLong: "$$NOW" } } }]
+  );
+  await collection.updateMany(
+    { updatedAt: { $exists: false }, entryTime: { $exists: true } },
+    [{ $set: { updatedAt: { $multiply: [{ $max: [{ $ifNull: ["$entryTime", 0] }, { $ifNull: ["$exitTime", 0] }] }, 1000] } } }]
+  );
+  await collection.createIndexes(POSITION_INDEXES);
+  return renamed.modifiedCount;
+}
+
+// Tables are created by the first /manage call for a new tableName; write
+// routes pass { prepare: true } so a new table is prepared on its first write.
+// Reads never migrate or create anything: a GET with an unknown tableName
+// must not leave an empty, indexed collection behind.
+const prepared = new Map();
+
+function positionsCollection(name, { prepare = false } = {}) {
+  if (prepare && !prepared.has(name)) {
+    prepared.set(
+      name,
+      preparePositionCollection(name).catch((err) => {
+        console.warn(`Index setup failed for ${name}:`, err.message);
+        prepared.delete(name);
+      })
+    );
+  }
+  return getCollection(name);
+}
+
+// Run at startup, before the server takes requests
+async function ensurePositionIndexes() {
+  const collections = await getDB().listCollections({}, { nameOnly: true }).toArray();
+  const names = [];
+  for (const { name } of collections) {
+    if (await isPositionCollection(name)) names.push(name);
+  }
+  for (const name of names) {
+    try {
+      const renamed = await preparePositionCollection(name);
+      prepared.set(name, Promise.resolve(renamed));
+      if (renamed > 0) console.log(`${name}: normalized coinName on ${renamed} positions`);
+    } catch (err) {
+      console.warn(`Index setup failed for ${name}, retrying on first use:`, err.message);
+    }
+  }
+  console.log(`Position indexes ensured on ${names.length} collections`);
+  return names;
+}
+
+module.exports = {
+  normalizeCoin,
+  positionsCollection,
+  ensurePositionIndexes,
+  POSITION_INDEXES,
+  NON_POSITION_COLLECTIONS,
+};
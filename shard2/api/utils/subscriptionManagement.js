@@ -2,6 +2,7 @@ const { default: axios } = require("axios");
 const { safePost, safeGet } = require("./safePost");
 const subscriptions = require("./subscription.json");
 const { getCollection } = require("./database");
+const { traceHop } = require("./trace");
 function checkIfCoinExistsInSide(coinName, data,side) {
   if (!data?.positions?.openPositions) return false;
 
@@ -86,7 +87,8 @@ let getSubscription = async (strategy, id = null)=>{
     return null
   }    
 }
-async function ManageSubscriptions(stregetyKey, coinName,Action,multiplier=1,appendable = false){
+async function ManageSubscriptions(stregetyKey, coinName,Action,multiplier=1,appendable = false,traceId = null){
+    traceHop(traceId, "fanout_start", { action: Action })
     let response = await getSubscription(stregetyKey)
     if(Action.includes("Extra")){
         appendable = true
@@ -95,7 +97,10 @@ async function ManageSubscriptions(stregetyKey, coinName,Action,multiplier=1,app
     let subs = response
     console.log(subs)
     let a = []
-    if(subs.length == 0) return;
+    if(subs.length == 0){
+        traceHop(traceId, "fanout_done", { action: Action, sent: 0 })
+        return;
+    }
     subs = subs[0]
     console.log(subs)
     let {entries} = subs 
@@ -105,29 +110,31 @@ async function ManageSubscriptions(stregetyKey, coinName,Action,multiplier=1,app
             if(Action == "Long" || Action == "Extra Long"){
                 console.log("Opening Long for ", id);
                 console.log("Amount: ",amount)
-                OpenLong(id, coinName,amount*multiplier,appendable);
+                a.push(OpenLong(id, coinName,amount*multiplier,appendable));
             }else if(Action == "Short" || Action == "Extra Short"){
                 console.log("Opening Short for ", id);
                 console.log("Amount: ",amount)
-                OpenShort(id, coinName,amount*multiplier,appendable);
+                a.push(OpenShort(id, coinName,amount*multiplier,appendable));
             }else if(Action == "CloseLong"){
                 console.log("Closing Long for ", id);
                 console.log("Amount: ",amount)
-                CloseLong(id, coinName);
+                a.push(CloseLong(id, coinName));
             }else if(Action == "CloseShort"){
                 console.log("Closing Short for ", id);
                 console.log("Amount: ",amount)
-                CloseShort(id, coinName);
+                a.push(CloseShort(id, coinName));
             }else if(Action == "Close"){
                 console.log("Closing All for ", id);
                 console.log("Amount: ",amount)
-                CloseLong(id, coinName);
-                CloseShort(id, coinName);
+                a.push(CloseLong(id, coinName));
+                a.push(CloseShort(id, coinName));
             }
         }else{
             console.log(`ignoring ${Action} on ${id}`)
         }
     })
+    // Subscriber calls still run in the background; only the trace waits for them
+    Promise.allSettled(a).then(() => traceHop(traceId, "fanout_done", { action: Action, sent: a.length }))
 }
 
 
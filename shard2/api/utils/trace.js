@@ -0,0 +1,15 @@
+const fs = require("fs");
+const path = require("path");
+
+// Hops of bot-traced requests (X-Trace-Id header), one JSON object per line
+const TRACE_LOG = process.env.TRACE_LOG || path.join(__dirname, "..", "trace.jsonl");
+
+function traceHop(traceId, hop, extra = {}) {
+  if (!traceId) return;
+  const line = JSON.stringify({ trace: traceId, hop, ts: Date.now(), ...extra }) + "\n";
+  fs.appendFile(TRACE_LOG, line, (err) => {
+    if (err) console.warn("Trace log write failed:", err.message);
+  });
+}
+
+module.exports = { traceHop, TRACE_LOG };
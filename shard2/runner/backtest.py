@@ -0,0 +1,212 @@
+# =====================
+# IMPORTS
+# =====================
+import numpy as np
+import argparse
+import time
+from datetime import datetime
+
+from cups import build_cups, CUP_SIZE_PCT
+from candle_store import load_candles, load_csv, TIMEFRAME
+
+# =====================
+# PARAMETERS
+# =====================
+# Same fee model as api/routes/managePosition.js: FEE_RATE per side on the USD
+# position size, entry fee only while a position is open.
+FEE_RATE = 0.0002
+POSITION_SIZE = 100
+EXTRA_SIZE = 100  # /manage "Extra" always adds $100 (addExtra(coinName, collectionName, 100))
+
+# Rule sets of the live runners, keyed by their trade-server table.
+#   MAZE  -> bot_prod.py: cup open handoff, "Extra" on a same-colour cup,
+#            opens whenever flat or on the other side, even on a used cup
+#   MAZE2 -> bot_cross.py: candle-open cups, incomplete-cup close rule,
+#            each cup opens at most once
+STRATEGIES = {
+    "MAZE": {"handoff": True, "extra": True, "incomplete_close": False, "open_once": False},
+    "MAZE2": {"handoff": False, "extra": False, "incomplete_close": True, "open_once": True},
+}
+
+
+def _close_trade(position: dict, exit_price: float, exit_time: int) -> dict:
+    size = position["positionSize"]
+    entry = position["entryPrice"]
+    quantity = size / entry
+    if position["positionSide"] == "Long":
+        gross_pnl = (exit_price - entry) * quantity
+    else:
+        gross_pnl = (entry - exit_price) * quantity
+    fee = size * FEE_RATE * 2
+    trade = dict(position)
+    trade.update({
+        "exitTime": exit_time,
+        "exitPrice": exit_price,
+        "status": "close",
+        "grossPnl": gross_pnl,
+        "fee": fee,
+        "pnl": gross_pnl - fee,
+    })
+    return trade
+
+
+def backtest(candles: dict, strategy: str = "MAZE2", cup_size_pct: float = CUP_SIZE_PCT, coin: str = "") -> dict:
+    """Replay closed candles through a runner's cup rules.
+
+    A decision is taken after every closed candle, like the live 15m cycle, and
+    filled at the next candle's open (the price /manage would fetch right
+    after the boundary). Returns the trade list in the trade-server document
+    shape, the per-candle equity curve (realized + open PnL at each close,
+    USD) and a summary.
+    """
+    rules = STRATEGIES[strategy]
+    ts = np.asarray(candles["timestamp"], dtype=np.int64)
+    opens = np.asarray(candles["open"], dtype=np.float64)
+    closes = np.asarray(candles["close"], dtype=np.float64)
+    n = len(ts)
+    if n < 2:
+        return {"trades": [], "timestamp": ts, "equity": np.zeros(n), "summary": summarize([], np.zeros(n))}
+
+    cups, bar_fill, bar_open = build_cups(ts, opens, closes, cup_size_pct, handoff=rules["handoff"])
+
+    # Fill price/time of a decision taken after candle i.
+    step = int(np.median(np.diff(ts)))
+    exec_price = np.append(opens[1:], closes[-1])
+    exec_time = np.append(ts[1:], ts[-1] + step) // 1000
+    fill_bar = np.minimum(np.arange(n) + 1, n - 1)
+
+    # Latest complete cup as of each candle, and as of the previous cycle
+    # (last_cup[coin] in bot_cross.py is set at the end of the prior cycle).
+    latest = np.searchsorted(cups["bar"], np.arange(n), side="right") - 1
+    previous = np.concatenate(([-1], latest[:-1]))
+
+    interesting = cups["bar"]
+    close_short = close_long = np.zeros(n, dtype=bool)
+    if rules["incomplete_close"] and len(cups):
+        has_prev = previous >= 0
+        prev_fill = np.where(has_prev, cups["fill"][previous], 0.0)
+        prev_close = np.where(has_prev, cups["close"][previous], np.nan)
+        with np.errstate(invalid="ignore"):
+            close_short = has_prev & (bar_fill > 0) & (prev_fill > 0) & (bar_open < prev_close)
+            close_long = has_prev & (bar_fill < 0) & (prev_fill < 0) & (bar_open > prev_close)
+        interesting = np.union1d(interesting, np.flatnonzero(close_short | close_long))
+
+    state = None
+    used = set()
+    position = None
+    trades = []
+    # (bar, signed quantity, signed cost basis, entry fee) from that bar on
+    marks = [(0, 0.0, 0.0, 0.0)]
+    realized = np.zeros(n, dtype=np.float64)
+
+    def close_position(i):
+        nonlocal position, state
+        trade = _close_trade(position, exec_price[i], int(exec_time[i]))
+        trades.append(trade)
+        realized[fill_bar[i]] += trade["pnl"]
+        marks.append((fill_bar[i], 0.0, 0.0, 0.0))
+        position = None
+        state = None
+
+    def mark(i):
+        size = position["positionSize"]
+        quantity = size / position["entryPrice"]
+        sign = 1.0 if position["positionSide"] == "Long" else -1.0
+        marks.append((fill_bar[i], sign * quantity, sign * size, size * FEE_RATE))
+
+    for i in interesting.tolist():
+        if state == "short" and close_short[i]:
+            close_position(i)
+        elif state == "long" and close_long[i]:
+            close_position(i)
+
+        k = latest[i]
+        if k < 0:
+            continue
+        cup_id = int(cups["id"][k])
+        want = "short" if cups["fill"][k] > 0 else "long"
+
+        if state == want:
+            if rules["extra"] and cup_id not in used:
+                price = exec_price[i]
+                size = position["positionSize"]
+                new_size = size + EXTRA_SIZE
+                position["entryPrice"] = (position["entryPrice"] * size + price * EXTRA_SIZE) / new_size
+                position["positionSize"] = new_size
+                position["extras"] += 1
+                used.add(cup_id)
+                mark(i)
+        elif not rules["open_once"] or cup_id not in used:
+            if position is not None:
+                # Non-hedge /manage closes the opposite side before opening.
+                close_position(i)
+            position = {
+                "coinName": coin,
+                "positionSide": "Long" if want == "long" else "Short",
+                "positionSize": POSITION_SIZE,
+                "entryPrice": float(exec_price[i]),
+                "entryTime": int(exec_time[i]),
+                "cupId": cup_id,
+                "extras": 0,
+            }
+            used.add(cup_id)
+            state = want
+            mark(i)
+
+    if position is not None:
+        open_trade = dict(position)
+        open_trade.update({"exitTime": 0, "exitPrice": None, "status": "open", "grossPnl": None, "fee": 0, "pnl": None})
+        trades.append(open_trade)
+
+    mark_bars = np.array([m[0] for m in marks], dtype=np.int64)
+    mark_vals = np.array([m[1:] for m in marks], dtype=np.float64)
+    active = mark_vals[np.searchsorted(mark_bars, np.arange(n), side="right") - 1]
+    unrealized = active[:, 0] * closes - active[:, 1] - active[:, 2]
+    equity = np.cumsum(realized) + unrealized
+
+    return {"trades": trades, "timestamp": ts, "equity": equity, "summary": summarize(trades, equity)}
+
+
+def summarize(trades: list, equity) -> dict:
+    closed = [t for t in trades if t["status"] == "close"]
+    pnls = np.array([t["pnl"] for t in closed], dtype=np.float64)
+    peak = np.maximum.accumulate(equity) if len(equity) else equity
+    return {
+        "tradeCount": len(closed),
+        "winCount": int((pnls > 0).sum()),
+        "lossCount": int((pnls < 0).sum()),
+        "totalPnl": float(pnls.sum()),
+        "totalFees": float(sum(t["fee"] for t in closed)),
+        "winRate": float((pnls > 0).mean() * 100) if len(pnls) else 0.0,
+        "maxDrawdown": float((peak - equity).max()) if len(equity) else 0.0,
+        "finalEquity": float(equity[-1]) if len(equity) else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest the MAZE/MAZE2 cup rules on stored candles")
+    parser.add_argument("coins", nargs="+")
+    parser.add_argument("--strategy", choices=sorted(STRATEGIES), default="MAZE2")
+    parser.add_argument("--cup-size", type=float, default=CUP_SIZE_PCT)
+    parser.add_argument("--timeframe", default=TIMEFRAME)
+    parser.add_argument("--csv", help="read candles from an exported CSV instead of the store (single coin)")
+    args = parser.parse_args()
+
+    for coin in args.coins:
+        candles = load_csv(args.csv) if args.csv else load_candles(coin, args.timeframe)
+        if not len(candles["timestamp"]):
+            print(f"[{datetime.now()}] {coin}: no stored {args.timeframe} candles, skipping.")
+            continue
+        start = time.perf_counter()
+        result = backtest(candles, args.strategy, args.cup_size, coin)
+        elapsed = time.perf_counter() - start
+        s = result["summary"]
+        print(
+            f"[{datetime.now()}] {coin} {args.strategy} cup={args.cup_size}% candles={len(candles['timestamp'])}: "
+            f"trades={s['tradeCount']} win={s['winRate']:.1f}% pnl={s['totalPnl']:.2f} "
+            f"fees={s['totalFees']:.2f} maxDD={s['maxDrawdown']:.2f} ({elapsed * 1000:.1f}ms)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+# =====================
+# IMPORTS
+# =====================
+import numpy as np
+import argparse
+import io
+import json
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+import candle_store
+import cups
+from candle_store import fetch_range, load_csv, to_arrays, timeframe_ms, BACKFILL_LIMIT, LIMIT
+from cups import CupHistory, build_cups
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import sd  # noqa: E402  (shard2/sd.py: G:R aggregation)
+
+# =====================
+# PARAMETERS
+# =====================
+CSV_PATH = Path(__file__).resolve().parent.parent / "candles.csv"  # committed fixture, 1h candles
+RESULTS_DIR = Path(__file__).resolve().parent / "data" / "bench"
+SEED = 7
+REPEAT = 5             # best of REPEAT for the micro benchmarks
+LONG_CANDLES = 100_000  # one long 15m history (~2.9 years)
+SYMBOLS = 300           # synthetic universe for G:R aggregation
+SYMBOL_CANDLES = 2_000  # 1h candles per symbol (~83 days)
+LIVE_CYCLES = 1_000     # incremental CupHistory updates, one closed candle each
+REPLAY_CANDLES = 4_000  # 15m candles per replayed coin from the runners' START_DATE
+REPLAY_DAYS = 0.5       # virtual days per runner replay (decision and chart stages)
+REPLAY_BOTS = ("bot_cross", "bot_prod")
+
+
+# =====================
+# FIXTURES
+# =====================
+def synthetic_candles(n: int, start_ms: int, tf_ms: int, seed: int, vol: float = 0.004) -> dict:
+    """Random-walk OHLCV with the store's column layout; the same seed gives the same candles."""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, vol, n)))
+    open_ = np.r_[close[0], close[:-1]]
+    wick = 1 + np.abs(rng.normal(0, vol / 2, n))
+    return {
+        "timestamp": start_ms + np.arange(n, dtype=np.int64) * tf_ms,
+        "open": open_,
+        "high": np.maximum(open_, close) * wick,
+        "low": np.minimum(open_, close) / wick,
+        "close": close,
+        "volume": rng.uniform(1e3, 1e6, n),
+    }
+
+
+def measure(fn, n: int, unit: str, repeat: int = REPEAT) -> dict:
+    """Best and median wall time of fn() over `repeat` runs; rate is n per best second."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    best = min(times)
+    return {
+        "seconds": best,
+        "median_s": float(np.median(times)),
+        "n": n,
+        "unit": unit,
+        "rate": n / best if best > 0 else None,
+    }
+
+
+# =====================
+# BENCHMARKS
+# =====================
+def bench_cups(long: dict, csv: dict, tmp: Path) -> dict:
+    results = {}
+    for name, c in (("csv", csv), ("long", long)):
+        for handoff in (False, True):
+            key = f"cups.build.{name}{'.handoff' if handoff else ''}"
+            results[key] = measure(lambda: build_cups(c["timestamp"], c["open"], c["close"], handoff=handoff), len(c["timestamp"]), "candles")
+
+    # A live runner's per-cycle cost: one new closed candle plus the open one
+    tf = timeframe_ms("15m")
+    ts = long["timestamp"]
+    warm = len(ts) - LIVE_CYCLES - 1
+
+    def live():
+        (tmp / "bench_live.cup").unlink(missing_ok=True)
+        history = CupHistory(tmp / "bench_live.cup")
+        history.update({col: long[col][:warm] for col in ("timestamp", "open", "close")}, int(ts[warm]) + tf, tf)
+        start = time.perf_counter()
+        for i in range(warm, warm + LIVE_CYCLES):
+            window = {col: long[col][i - 1:i + 2] for col in ("timestamp", "open", "close")}
+            history.update(window, int(ts[i]) + tf + 1, tf)
+        return time.perf_counter() - start
+
+    spent = [live() for _ in range(REPEAT)]
+    results["cups.live_update"] = {
+        "seconds": min(spent),
+        "median_s": float(np.median(spent)),
+        "n": LIVE_CYCLES,
+        "unit": "cycles",
+        "rate": LIVE_CYCLES / min(spent),
+    }
+    return results
+
+
+def bench_gr(universe: dict, tmp: Path) -> dict:
+    n = sum(len(c["timestamp"]) for c in universe.values())
+    results = {"gr.daily_sizes": measure(lambda: sd.daily_sizes(universe), n, "candles")}
+
+    # Incremental update after one more day of candles on top of a stored table
+    day_candles = 24
+    base = {s: {col: arr[:-day_candles] for col, arr in c.items()} for s, c in universe.items()}
+    stored = sd.update_daily(base, sd.load_daily(tmp / "none.npz"))
+    results["gr.update_daily"] = measure(lambda: sd.update_daily(universe, stored), len(universe), "symbols")
+    return results
+
+
+def bench_fetch(long: dict) -> dict:
+    """candle_store.fetch_range paging over the long history from the replay harness' fake exchange."""
+    from replay_harness import FakeExchange, VirtualClock
+
+    tf = timeframe_ms("15m")
+    now = datetime.fromtimestamp((int(long["timestamp"][-1]) + tf) / 1000, tz=timezone.utc)
+    exchange = FakeExchange(VirtualClock(now, now + timedelta(days=1)), {"SYN": long}, "15m")
+    since = int(long["timestamp"][0])
+    n = len(long["timestamp"])
+
+    results = {}
+    for limit in (LIMIT, BACKFILL_LIMIT):
+        exchange.fetch_count = 0
+        result = measure(lambda: to_arrays(fetch_range(exchange, "SYN/USDT", "15m", since, limit=limit)), n, "candles", repeat=3)
+        result["pages"] = exchange.fetch_count // 3
+        results[f"fetch.range.limit{limit}"] = result
+    return results
+
+
+def bench_replay(bots: tuple, days: float, tmp: Path) -> dict:
+    """Replay each runner on synthetic candles; decision and chart times come from its stage histogram."""
+    import replay_harness
+
+    tf = timeframe_ms("15m")
+    start_ms = int(candle_store.START_DATE.timestamp() * 1000)
+    live_store = candle_store.STORE_DIR
+    candle_store.STORE_DIR = tmp / "candles"
+    for i, coin in enumerate(("ZEC", "ICP")):
+        candle_store.save_candles(coin, synthetic_candles(REPLAY_CANDLES, start_ms, tf, SEED + i), "15m")
+
+    # Charts are rendered in full but written to memory, not over outputs/*.png
+    real_savefig = plt.savefig
+    plt.savefig = lambda fname, *args, **kwargs: real_savefig(io.BytesIO(), *args, **kwargs)
+    results = {}
+    try:
+        for name in bots:
+            replay = replay_harness.run_replay(name, ["ZEC", "ICP"], days=days, charts=True)
+            totals = {}
+            for (coin, stage), row in sys.modules[name].stage_seconds.series.items():
+                total = totals.setdefault(stage, [0.0, 0])
+                total[0] += row[-2]
+                total[1] += row[-1]
+            for stage in ("cup_build", "decision", "chart"):
+                seconds, count = totals.get(stage, (0.0, 0))
+                results[f"replay.{name}.{stage}"] = {
+                    "seconds": seconds,
+                    "n": count,
+                    "unit": "calls",
+                    "rate": count / seconds if seconds > 0 else None,
+                    "mean_ms": seconds / count * 1000 if count else None,
+                }
+            cycles = replay["stages"].get("process_coin", {})
+            results[f"replay.{name}.process_coin"] = {
+                "seconds": cycles.get("total_ms", 0) / 1000,
+                "n": cycles.get("count", 0),
+                "unit": "calls",
+                "rate": cycles["count"] / (cycles["total_ms"] / 1000) if cycles.get("total_ms") else None,
+                "mean_ms": cycles.get("mean_ms"),
+                "p95_ms": cycles.get("p95_ms"),
+                "decisions": len(replay["decisions"]),
+            }
+    finally:
+        plt.savefig = real_savefig
+        candle_store.STORE_DIR = live_store
+    return results
+
+
+# =====================
+# REPORT
+# =====================
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=Path(__file__).resolve().parent).stdout.strip()
+    except OSError:
+        return ""
+
+
+def compare(base: dict, new: dict):
+    params = ("long_candles", "symbols", "symbol_candles", "replay_days", "seed")
+    changed = [p for p in params if base.get("meta", {}).get(p) != new["meta"].get(p)]
+    if changed:
+        print(f"  note: {', '.join(changed)} differ from the earlier run; per-item rates compare, totals do not")
+    print(f"  {'benchmark':<36}{'before s':>11}{'after s':>11}{'speedup':>9}")
+    for key, r in new["results"].items():
+        b = base.get("results", {}).get(key)
+        if not b or not b.get("seconds") or not r.get("seconds"):
+            continue
+        print(f"  {key:<36}{b['seconds']:>11.4f}{r['seconds']:>11.4f}{b['seconds'] / r['seconds']:>8.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the candle, cup, G:R, fetch and runner pipeline")
+    parser.add_argument("--only", nargs="*", choices=("cups", "gr", "fetch", "replay"), help="subset of benchmark groups")
+    parser.add_argument("--long-candles", type=int, default=LONG_CANDLES)
+    parser.add_argument("--symbols", type=int, default=SYMBOLS)
+    parser.add_argument("--replay-days", type=float, default=REPLAY_DAYS)
+    parser.add_argument("--out", help=f"JSON results file (default {RESULTS_DIR}/bench_<time>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+    groups = set(args.only or ("cups", "gr", "fetch", "replay"))
+
+    tmp = Path(tempfile.mkdtemp(prefix="bench_"))
+    live_log_dir = cups.CUP_LOG_DIR
+    cups.CUP_LOG_DIR = tmp / "cups"
+    tf = timeframe_ms("15m")
+    start_ms = int(candle_store.START_DATE.timestamp() * 1000)
+    long = synthetic_candles(args.long_candles, start_ms, tf, SEED)
+    csv = load_csv(CSV_PATH)
+    universe = {
+        f"S{i:03d}USDT": synthetic_candles(SYMBOL_CANDLES, start_ms, timeframe_ms("1h"), SEED + 100 + i)
+        for i in range(args.symbols)
+    }
+
+    results = {}
+    started = time.perf_counter()
+    try:
+        if "cups" in groups:
+            results.update(bench_cups(long, csv, tmp))
+        if "gr" in groups:
+            results.update(bench_gr(universe, tmp))
+        if "fetch" in groups:
+            results.update(bench_fetch(long))
+        if "replay" in groups:
+            results.update(bench_replay(REPLAY_BOTS, args.replay_days, tmp))
+    finally:
+        cups.CUP_LOG_DIR = live_log_dir
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "seed": SEED,
+            "long_candles": args.long_candles,
+            "symbols": args.symbols,
+            "symbol_candles": SYMBOL_CANDLES,
+            "csv_candles": len(csv["timestamp"]),
+            "replay_days": args.replay_days,
+            "wall_seconds": time.perf_counter() - started,
+        },
+        "results": results,
+    }
+
+    print(f"[{datetime.now()}] Benchmarks at {report['meta']['commit'] or 'unknown commit'} in {report['meta']['wall_seconds']:.1f}s")
+    print(f"  {'benchmark':<36}{'seconds':>10}{'n':>9}  {'rate':>14}")
+    for key, r in results.items():
+        rate = "-" if not r.get("rate") else f"{r['rate']:,.0f} {r['unit']}/s" if r["rate"] >= 100 else f"{r['rate']:.2f} {r['unit']}/s"
+        print(f"  {key:<36}{r['seconds']:>10.4f}{r['n']:>9}  {rate:>14}")
+
+    out = Path(args.out) if args.out else RESULTS_DIR / f"bench_{datetime.now():%Y%m%d_%H%M%S}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+    print(f"[{datetime.now()}] Results -> {out}")
+
+    if args.compare:
+        compare(json.loads(Path(args.compare).read_text()), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,6 @@
 # IMPORTS
 # =====================
 import ccxt
-import pandas as pd
 import numpy as np
 import matplotlib
 matplotlib.use('Agg')  # Non-interactive backend, no display
@@ -12,27 +11,54 @@ import time
 import io
 import os
 from pathlib import Path
-import traceback
 import requests
 import json
 
-print(f"[STARTUP] Imports loaded successfully at {datetime.now()}")
+from candle_store import fetch_range, to_arrays, timeframe_ms, update_store, use_base_url
+from cups import CupHistory, cup_log_path
+from finalize import CandleCloseWaiter, FinalizationStats, ccxt_closed_probe, STATS_DIR
+from metrics import Registry, scheduler_gauges, serve as serve_metrics
+from scheduler import Scheduler, ServerClock
+from tracing import Tracer
+from profiler import CycleProfiler
+from events import EventLog, INFO
+
+log = EventLog(Path(__file__).stem, dump_path=STATS_DIR / f"events_{Path(__file__).stem}_dump.log")
+log.info("[STARTUP] Imports loaded successfully")
 
 # =====================
 # PARAMETERS
 # =====================
-print(f"[STARTUP] Loading parameters")
+log.info("[STARTUP] Loading parameters")
 TIMEFRAME = "15m"
 CUP_SIZE_PCT = 2.0
 START_DATE = datetime(2026, 1, 9, tzinfo=timezone.utc)  # Default: 9 Jan 2026
 COLS = 20
 LIMIT = 300
+# Complete cups past the in-memory window are kept in data/cups/<coin>_<CUP_LOG>.cup
+CUP_LOG = f"{TIMEFRAME}_{CUP_SIZE_PCT:g}_{Path(__file__).stem}"
 
 # Coins to process
 COINS = ["ZEC", "ICP", "ENA","BAT","VET","HOOK"]
 
 # Safety delay (seconds) to wait after candle close
-SAFETY_DELAY = 20
+SAFETY_DELAY = 20  # latest start after a candle boundary when its close is not confirmed sooner
+
+# Rebuild cups from stored candles at startup without trading; orders start at the next candle
+WARM_START = True
+
+# Console log level (DEBUG adds the per-cycle "skipping" lines); the most recent
+# events of every level are dumped to data/events_<runner>_dump.log on errors
+LOG_LEVEL = INFO
+
+# JSON-lines file that also receives every logged event with its fields (None: stdout only)
+EVENT_LOG = None
+
+# Stage timings in Prometheus text format on http://127.0.0.1:<port>/metrics (None to disable)
+METRICS_PORT = 9102
+
+# Binance REST host; e.g. "http://127.0.0.1:18080" to run against fake_binance.py (None: Binance)
+EXCHANGE_URL = None
 
 # API server URL for managing positions
 API_BASE_URL = "http://localhost:5007"
@@ -42,8 +68,16 @@ POSITION_SIZE = 100
 # Global tracking dictionaries
 used = {}  # used[cup_id] = bool
 state = {}  # state[coin] = "long", "short", or None
+cup_history = {}  # cup_history[coin] = CupHistory
+acted_through = {}  # acted_through[coin] = newest cup id replayed at startup (never traded on)
+
+metrics_registry = Registry()
+stage_seconds = metrics_registry.histogram("bot_stage_seconds", "Time per cycle stage and coin (decision includes its order posts)", ("coin", "stage"))
+cycle_seconds = metrics_registry.histogram("bot_cycle_seconds", "Time per cycle over all coins")
+tracer = Tracer(TABLE_NAME, clock=lambda: time.time())  # candle close -> /manage ack per order
+profiler = CycleProfiler(Path(__file__).stem, log=log)  # on request: `python profiler.py <bot>` or SIGUSR1
 
-print(f"[STARTUP] Parameters loaded")
+log.info("[STARTUP] Parameters loaded")
 
 # =====================
 # EXCHANGE SETUP
@@ -52,14 +86,16 @@ try:
     exchange = ccxt.binance({
         "enableRateLimit": True,
     })
+    if EXCHANGE_URL:
+        use_base_url(exchange, EXCHANGE_URL)
     exchange.load_markets()
-    print(f"[{datetime.now()}] Exchange initialized successfully")
+    log.info("Exchange initialized successfully")
 except Exception as e:
-    print(f"[{datetime.now()}] ERROR initializing exchange: {e}")
-    print(traceback.format_exc())
+    log.exception("ERROR initializing exchange: {error}", error=e)
     exchange = None
 
 
+@stage_seconds.timed("position_sync")
 def check_long_position_exists(coin: str) -> bool:
     """Check if a long position already exists for this coin in MAZE table."""
     try:
@@ -77,10 +113,11 @@ def check_long_position_exists(coin: str) -> bool:
             return count > 0
         return False
     except Exception as e:
-        print(f"[{datetime.now()}] Error checking long position for {coin}: {e}")
+        log.error("Error checking long position for {coin}: {error}", coin=coin, error=e)
         return False
 
 
+@stage_seconds.timed("position_sync")
 def check_short_position_exists(coin: str) -> bool:
     """Check if a short position already exists for this coin in MAZE table."""
     try:
@@ -98,10 +135,11 @@ def check_short_position_exists(coin: str) -> bool:
             return count > 0
         return False
     except Exception as e:
-        print(f"[{datetime.now()}] Error checking short position for {coin}: {e}")
+        log.error("Error checking short position for {coin}: {error}", coin=coin, error=e)
         return False
 
 
+@stage_seconds.timed("order_post")
 def open_long_position(coin: str) -> bool:
     """Open a long position via the /manage API."""
     try:
@@ -111,19 +149,22 @@ def open_long_position(coin: str) -> bool:
             "positionSize": POSITION_SIZE,
         }
         params = {"tableName": TABLE_NAME}
-        resp = requests.post(url, json=payload, params=params, timeout=5)
+        trace = tracer.start(coin, payload["Action"])
+        resp = requests.post(url, json=payload, params=params, headers=trace.headers(), timeout=5)
+        trace.done(resp.status_code)
         if resp.status_code == 200:
             gmt5_time = datetime.now(timezone.utc) + timedelta(hours=5)
-            print(f"[{datetime.now()}] ✓ Opened long position for {coin} in {TABLE_NAME} at {gmt5_time.strftime('%I:%M %p')} GMT+5")
+            log.info("Opened long position for {coin} in {table} at {} GMT+5", gmt5_time.strftime('%I:%M %p'), coin=coin, table=TABLE_NAME)
             return True
         else:
-            print(f"[{datetime.now()}] ✗ Failed to open position for {coin}: {resp.status_code} {resp.text}")
+            log.warning("Failed to open position for {coin}: {status} {body}", coin=coin, status=resp.status_code, body=resp.text)
             return False
     except Exception as e:
-        print(f"[{datetime.now()}] Error opening long position for {coin}: {e}")
+        log.error("Error opening long position for {coin}: {error}", coin=coin, error=e)
         return False
 
 
+@stage_seconds.timed("order_post")
 def open_short_position(coin: str) -> bool:
     """Open a short position via the /manage API."""
     try:
@@ -133,19 +174,22 @@ def open_short_position(coin: str) -> bool:
             "positionSize": POSITION_SIZE,
         }
         params = {"tableName": TABLE_NAME}
-        resp = requests.post(url, json=payload, params=params, timeout=5)
+        trace = tracer.start(coin, payload["Action"])
+        resp = requests.post(url, json=payload, params=params, headers=trace.headers(), timeout=5)
+        trace.done(resp.status_code)
         if resp.status_code == 200:
             gmt5_time = datetime.now(timezone.utc) + timedelta(hours=5)
-            print(f"[{datetime.now()}] ✓ Opened short position for {coin} in {TABLE_NAME} at {gmt5_time.strftime('%I:%M %p')} GMT+5")
+            log.info("Opened short position for {coin} in {table} at {} GMT+5", gmt5_time.strftime('%I:%M %p'), coin=coin, table=TABLE_NAME)
             return True
         else:
-            print(f"[{datetime.now()}] ✗ Failed to open short position for {coin}: {resp.status_code} {resp.text}")
+            log.warning("Failed to open short position for {coin}: {status} {body}", coin=coin, status=resp.status_code, body=resp.text)
             return False
     except Exception as e:
-        print(f"[{datetime.now()}] Error opening short position for {coin}: {e}")
+        log.error("Error opening short position for {coin}: {error}", coin=coin, error=e)
         return False
 
 
+@stage_seconds.timed("order_post")
 def add_extra_to_position(coin: str) -> bool:
     """Add extra USD to an existing open position via the /manage API."""
     try:
@@ -155,35 +199,51 @@ def add_extra_to_position(coin: str) -> bool:
             "positionSize": POSITION_SIZE,
         }
         params = {"tableName": TABLE_NAME}
-        resp = requests.post(url, json=payload, params=params, timeout=5)
+        trace = tracer.start(coin, payload["Action"])
+        resp = requests.post(url, json=payload, params=params, headers=trace.headers(), timeout=5)
+        trace.done(resp.status_code)
         if resp.status_code == 200:
             data = resp.json()
             side = data.get("side", "Unknown")
-            print(f"[{datetime.now()}] ✓ Added extra ${POSITION_SIZE} to {side} position for {coin} in {TABLE_NAME}")
+            log.info("Added extra ${} to {side} position for {coin} in {table}", POSITION_SIZE, side=side, coin=coin, table=TABLE_NAME)
             return True
         else:
-            print(f"[{datetime.now()}] ✗ Failed to add extra to position for {coin}: {resp.status_code} {resp.text}")
+            log.warning("Failed to add extra to position for {coin}: {status} {body}", coin=coin, status=resp.status_code, body=resp.text)
             return False
     except Exception as e:
-        print(f"[{datetime.now()}] Error adding extra to position for {coin}: {e}")
+        log.error("Error adding extra to position for {coin}: {error}", coin=coin, error=e)
         return False
 
 
-def fetch_ohlcv_all(symbol: str):
-    since = int(START_DATE.timestamp() * 1000)
-    all_ohlcv = []
+def fetch_ohlcv_all(symbol: str, since: int = None):
+    """All candles since `since` (default START_DATE); pages are planned up front and fetched in parallel."""
+    if since is None:
+        since = int(START_DATE.timestamp() * 1000)
+    return fetch_range(exchange, symbol, TIMEFRAME, since, limit=LIMIT)
+
 
-    while True:
-        ohlcv = exchange.fetch_ohlcv(symbol, timeframe=TIMEFRAME, since=since, limit=LIMIT)
-        if not ohlcv:
-            break
-        all_ohlcv.extend(ohlcv)
-        since = ohlcv[-1][0] + 1
-        if len(ohlcv) < LIMIT:
-            break
-        time.sleep(exchange.rateLimit / 1000)
+def catch_up(coin: str, symbol: str, history: CupHistory):
+    """Warm start: replay a coin's cups up to now without placing orders.
 
-    return all_ohlcv
+    Closed candles come from the candle store (topped up from the exchange),
+    falling back to a full fetch when the store does not cover START_DATE
+    without gaps. Cups completed so far are marked as acted on, so live
+    decisions only follow cups completed from the next candle on.
+    """
+    now_ms = exchange.milliseconds()
+    coin_start = time.time()
+    stored = update_store(exchange, coin, symbol, TIMEFRAME, START_DATE)
+    source = "store"
+    if not history.replay(stored, int(START_DATE.timestamp() * 1000), now_ms, timeframe_ms(TIMEFRAME)):
+        source = "exchange"
+        history.update(to_arrays(fetch_ohlcv_all(symbol)), now_ms, timeframe_ms(TIMEFRAME))
+
+    if not len(history.recent):
+        log.info("{coin}: Caught up from {source}, no complete cups yet.", coin=coin, source=source)
+        return
+    latest_cup = history.recent[-1]
+    acted_through[coin] = int(latest_cup["id"])
+    log.info("{coin}: Caught up from {source} in {seconds:.2f}s through cup {cup_id}, trading from the next new cup.", coin=coin, source=source, seconds=time.time() - coin_start, cup_id=acted_through[coin])
 
 
 def process_coin(coin: str, out_dir: Path):
@@ -199,10 +259,10 @@ def process_coin(coin: str, out_dir: Path):
         
         if long_exists:
             state[coin] = "long"
-            print(f"[{datetime.now()}] {coin}: Detected active LONG position in database, state updated.")
+            log.info("{coin}: Detected active LONG position in database, state updated.", coin=coin)
         elif short_exists:
             state[coin] = "short"
-            print(f"[{datetime.now()}] {coin}: Detected active SHORT position in database, state updated.")
+            log.info("{coin}: Detected active SHORT position in database, state updated.", coin=coin)
         
         symbol = f"{coin}/USDT"
         if symbol not in exchange.symbols:
@@ -210,88 +270,37 @@ def process_coin(coin: str, out_dir: Path):
             if alt in exchange.symbols:
                 symbol = alt
             else:
-                print(f"[{datetime.now()}] Symbol {coin} not available on OKX, skipping.")
+                log.info("Symbol {coin} not available on OKX, skipping.", coin=coin)
                 return
 
-        all_ohlcv = fetch_ohlcv_all(symbol)
+        if coin not in cup_history:
+            history = CupHistory(cup_log_path(coin, CUP_LOG), CUP_SIZE_PCT, handoff=True)
+            if WARM_START:
+                # Registered only once caught up, so a failed catch-up is retried next cycle
+                with stage_seconds.timer(coin=coin, stage="catch_up"):
+                    catch_up(coin, symbol, history)
+                cup_history[coin] = history
+                return
+            cup_history[coin] = history
+        history = cup_history[coin]
+
+        with stage_seconds.timer(coin=coin, stage="fetch"):
+            all_ohlcv = fetch_ohlcv_all(symbol, history.since())
         if not all_ohlcv:
-            print(f"[{datetime.now()}] No OHLCV for {symbol}, skipping.")
+            log.info("No OHLCV for {symbol}, skipping.", symbol=symbol)
             return
 
-        df = pd.DataFrame(all_ohlcv, columns=["timestamp", "open", "high", "low", "close", "volume"])
-        df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
-
-        cups = []
-        cup_id_counter = 0
-        current_fill = 0.0
-        cup_open_price = None
-        cup_close_price = None
-        cup_start_date = None
-        cup_end_date = None
-        handoff_price = None  # Track price when transitioning between cups
-
-        for _, row in df.iterrows():
-            o, c = row["open"], row["close"]
-            ts = row["timestamp"]
-
-            body_pct = abs(c - o) / o * 100
-            if body_pct == 0:
-                continue
-
-            remaining = body_pct if c > o else -body_pct
-
-            while abs(remaining) > 0:
-                capacity_left = CUP_SIZE_PCT - abs(current_fill)
-
-                if current_fill == 0 and cup_open_price is None:
-                    # Use handoff price from previous cup, or candle's open if first cup
-                    cup_open_price = handoff_price if handoff_price is not None else o
-                    cup_start_date = ts
-                    handoff_price = None  # Reset after using
-
-                if capacity_left <= 0:
-                    # Cup is completing - set end timestamp to current candle
-                    cups.append({
-                        "id": cup_id_counter,
-                        "fill": current_fill,
-                        "open": cup_open_price,
-                        "close": cup_close_price,
-                        "date": cup_start_date,
-                        "end_date": ts,  # Use current timestamp as end time
-                    })
-                    cup_id_counter += 1
-                    # Save the close price as handoff for next cup
-                    handoff_price = cup_close_price
-                    current_fill = 0.0
-                    cup_open_price = None
-                    cup_close_price = None
-                    cup_start_date = None
-                    cup_end_date = None
-                    continue
-
-                delta = min(abs(remaining), capacity_left)
-                delta *= np.sign(remaining)
-                current_fill += delta
-                remaining -= delta
-                cup_close_price = c
-                cup_end_date = ts
-
-                if current_fill == 0:
-                    # Cup cancelled out - save close price as handoff
-                    handoff_price = cup_close_price
-                    cup_open_price = None
-                    cup_close_price = None
-                    cup_start_date = None
-                    cup_end_date = None
-                    break
-
-        complete_cups = [cup for cup in cups if abs(cup["fill"]) >= CUP_SIZE_PCT]
+        with stage_seconds.timer(coin=coin, stage="cup_build"):
+            candles = to_arrays(all_ohlcv)
+            del all_ohlcv
+            complete_cups, forming = history.update(candles, exchange.milliseconds(), timeframe_ms(TIMEFRAME))
         
+        decision_timer = stage_seconds.timer(coin=coin, stage="decision")
         # Check position based on latest complete cup
-        if complete_cups:
+        if len(complete_cups):
             latest_cup = complete_cups[-1]
-            cup_id = latest_cup["id"]
-            cup_fill = latest_cup["fill"]
+            cup_id = int(latest_cup["id"])
+            cup_fill = float(latest_cup["fill"])
             is_green_cup = cup_fill > 0  # Green = bullish (positive fill)
             
             # Initialize tracking for this cup if not exists
@@ -299,60 +308,63 @@ def process_coin(coin: str, out_dir: Path):
                 used[cup_id] = False
             
             # Only attempt to open if we don't a2 lready have an active position of opposite or same side
-            if is_green_cup:
-                print(f"[{datetime.now()}] {coin}: Latest complete cup ID={cup_id} is GREEN (bullish), fill={cup_fill:.5f}")
+            if cup_id <= acted_through.get(coin, -1):
+                log.debug("{coin}: Latest complete cup ID={cup_id} was replayed at startup, waiting for a new cup.", coin=coin, cup_id=cup_id)
+            elif is_green_cup:
+                log.info("{coin}: Latest complete cup ID={cup_id} is GREEN (bullish), fill={cup_fill:.5f}", coin=coin, cup_id=cup_id, cup_fill=cup_fill)
                 
                 # Check if we already have an active short position
                 if state[coin] == "short":
                     # We have an active short, check if this cup is new (unused)
                     if not used[cup_id]:
-                        print(f"[{datetime.now()}] {coin}: Cup {cup_id} matches active short state, adding extra...")
+                        log.info("{coin}: Cup {cup_id} matches active short state, adding extra...", coin=coin, cup_id=cup_id)
                         if add_extra_to_position(coin):
                             used[cup_id] = True
                     else:
-                        print(f"[{datetime.now()}] {coin}: Already have active short trade from previous cycle, skipping.")
+                        log.debug("{coin}: Already have active short trade from previous cycle, skipping.", coin=coin)
                 else:
-                    print(f"[{datetime.now()}] {coin}: Opening short position with cup {cup_id}...")
+                    log.info("{coin}: Opening short position with cup {cup_id}...", coin=coin, cup_id=cup_id)
                     if open_short_position(coin):
                         used[cup_id] = True
                         state[coin] = "short"
             else:
-                print(f"[{datetime.now()}] {coin}: Latest complete cup ID={cup_id} is RED (bearish), fill={cup_fill:.5f}")
+                log.info("{coin}: Latest complete cup ID={cup_id} is RED (bearish), fill={cup_fill:.5f}", coin=coin, cup_id=cup_id, cup_fill=cup_fill)
                 
                 # Check if we already have an active long position
                 if state[coin] == "long":
                     # We have an active long, check if this cup is new (unused)
                     if not used[cup_id]:
-                        print(f"[{datetime.now()}] {coin}: Cup {cup_id} matches active long state, adding extra...")
+                        log.info("{coin}: Cup {cup_id} matches active long state, adding extra...", coin=coin, cup_id=cup_id)
                         if add_extra_to_position(coin):
                             used[cup_id] = True
                     else:
-                        print(f"[{datetime.now()}] {coin}: Already have active long trade from previous cycle, skipping.")
+                        log.debug("{coin}: Already have active long trade from previous cycle, skipping.", coin=coin)
                 else:
-                    print(f"[{datetime.now()}] {coin}: Opening long position with cup {cup_id}...")
+                    log.info("{coin}: Opening long position with cup {cup_id}...", coin=coin, cup_id=cup_id)
                     if open_long_position(coin):
                         used[cup_id] = True
                         state[coin] = "long"
         else:
-            print(f"[{datetime.now()}] {coin}: No complete cups available for position decision.")
+            log.debug("{coin}: No complete cups available for position decision.", coin=coin)
         
-        if not complete_cups:
-            print(f"[{datetime.now()}] No complete cups for {symbol}.")
+        decision_timer.stop()
+
+        chart_timer = stage_seconds.timer(coin=coin, stage="chart")
+        # Every cup since START_DATE: the cup log (read lazily) plus the ones not logged yet
+        chart_cups = history.history(complete_cups)
+        if not len(chart_cups):
+            log.info("No complete cups for {symbol}.", symbol=symbol)
         else:
-            rows = max(1, int(np.ceil(len(complete_cups) / COLS)))
+            rows = max(1, int(np.ceil(len(chart_cups) / COLS)))
             fig, ax = plt.subplots(figsize=(COLS, rows))
             ax.set_xlim(0, COLS)
             ax.set_ylim(0, rows)
             ax.set_aspect("equal")
             ax.axis("off")
 
-            for i, cup in enumerate(complete_cups):
-                fill = cup["fill"]
-                o_price = cup["open"]
-                c_price = cup["close"]
-                date = cup["date"]
-                end_date = cup.get("end_date")
-                cup_id = cup["id"]
+            for i, (cup_id, fill, o_price, c_price, start_ms, end_ms, _) in enumerate(chart_cups.tolist()):
+                date = datetime.fromtimestamp(start_ms / 1000, tz=timezone.utc)
+                end_date = datetime.fromtimestamp(end_ms / 1000, tz=timezone.utc)
 
                 r = rows - 1 - i // COLS
                 c = i % COLS
@@ -387,47 +399,70 @@ def process_coin(coin: str, out_dir: Path):
             out_path = out_dir / f"{coin}.png"
             plt.savefig(out_path, format="png", dpi=150)
             plt.close(fig)
-            print(f"[{datetime.now()}] Saved chart for {coin} -> {out_path}")
+            log.info("Saved chart for {coin} -> {out_path}", coin=coin, out_path=out_path)
+        chart_timer.stop()
 
     except Exception:
-        print(f"[{datetime.now()}] Error processing {coin}:\n" + traceback.format_exc())
+        log.exception("Error processing {coin}:", coin=coin)
 
 
 def main():
     if not exchange:
-        print(f"[{datetime.now()}] Exchange not initialized, exiting.")
+        log.error("Exchange not initialized, exiting.")
         return
     
     out_dir = Path(__file__).resolve().parent / "outputs"
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    print(f"[{datetime.now()}] Starting bot: coins={COINS}, schedule=15m-candle-close+{SAFETY_DELAY}s")
-
-    while True:
-        start = time.time()
-        for coin in COINS:
-            process_coin(coin, out_dir)
-            time.sleep(max(exchange.rateLimit / 1000, 0.5))
-
-        elapsed = time.time() - start
-
-        # Calculate next 15-minute candle close (quarters: :00, :15, :30, :45) in UTC,
-        # then add a SAFETY_DELAY to avoid racing the candle boundary.
-        now = datetime.now(timezone.utc)
-        mins = now.minute
-        next_min = ((mins // 15) + 1) * 15 # 15 mins
-        if next_min == 60:
-            next_dt = now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
-        else:
-            next_dt = now.replace(minute=next_min, second=0, microsecond=0)
-
-        scheduled_time = next_dt + timedelta(seconds=SAFETY_DELAY)
-        to_sleep = (scheduled_time - now).total_seconds()
-        if to_sleep < 0:
-            to_sleep = 0
-
-        print(f"[{datetime.now()}] Cycle complete, sleeping {to_sleep:.1f}s until {scheduled_time.isoformat()}")
-        time.sleep(to_sleep)
+    log.info("Starting bot: coins={coins}, schedule=15m-candle-close (adaptive, max +{}s)", SAFETY_DELAY, coins=COINS)
+
+    log.level = LOG_LEVEL
+    if EVENT_LOG:
+        log.open_sink(EVENT_LOG)
+    tracer.log_path = STATS_DIR / f"traces_{Path(__file__).stem}.jsonl"
+    clock = ServerClock(exchange.fetch_time, time.time)
+    tracer.offset = lambda: clock.offset_ms
+    waiter = CandleCloseWaiter(
+        clock,
+        ccxt_closed_probe(exchange, f"{COINS[0]}/USDT", TIMEFRAME),
+        timeframe_ms(TIMEFRAME),
+        FinalizationStats(STATS_DIR / f"finalization_{Path(__file__).stem}.json"),
+        max_wait=SAFETY_DELAY,
+        sleep=time.sleep,
+    )
+
+    def wait_for_close(boundary_ms: int):
+        closed = waiter.wait(boundary_ms)
+        tracer.candle_close_ms = boundary_ms
+        stats = waiter.stats.summary()
+        log.info(
+            "Candle close {} {:.2f}s after the boundary ({polls} polls); p50={:.2f}s p90={:.2f}s over {}",
+            "confirmed" if closed["final"] else "not confirmed", closed["delay_ms"] / 1000,
+            stats.get("p50_ms", 0) / 1000, stats.get("p90_ms", 0) / 1000, stats["count"],
+            boundary_ms=boundary_ms, polls=closed["polls"],
+        )
+
+    def run_cycle():
+        with profiler.cycle():
+            cycle_timer = cycle_seconds.timer()
+            for coin in COINS:
+                process_coin(coin, out_dir)
+                time.sleep(max(exchange.rateLimit / 1000, 0.5))
+            cycle_timer.stop()
+
+    profiler.install()
+
+    # Every 15-minute candle close (quarters: :00, :15, :30, :45) in exchange time,
+    # as soon as the exchange serves the closed candle and at most SAFETY_DELAY
+    # after the boundary. The first cycle runs right away.
+    scheduler = Scheduler(clock, sleep=time.sleep)
+    tracer.candle_close_ms = waiter.next_boundary() - timeframe_ms(TIMEFRAME)
+    scheduler.add("cycle", TIMEFRAME, run_cycle, gate=wait_for_close, run_now=True)
+    if METRICS_PORT:
+        scheduler_gauges(metrics_registry, scheduler)
+        serve_metrics(metrics_registry, METRICS_PORT)
+        log.info("Metrics on http://127.0.0.1:{}/metrics", METRICS_PORT)
+    scheduler.run_forever()
 
 
 if __name__ == "__main__":
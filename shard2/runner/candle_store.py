@@ -0,0 +1,400 @@
+# =====================
+# IMPORTS
+# =====================
+import numpy as np
+import pandas as pd
+import argparse
+import os
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import urlparse
+import time
+
+# =====================
+# PARAMETERS
+# =====================
+TIMEFRAME = "15m"
+START_DATE = datetime(2026, 1, 9, tzinfo=timezone.utc)
+LIMIT = 300
+BACKFILL_LIMIT = 1000  # Binance spot klines max page size
+FETCH_WORKERS = 8
+
+STORE_DIR = Path(__file__).resolve().parent / "data" / "candles"
+COLUMNS = ["timestamp", "open", "high", "low", "close", "volume"]
+
+# =====================
+# FILE FORMAT
+# =====================
+# One .cdl file per (coin, timeframe):
+#   64-byte header: magic "CNDL", version u16, price itemsize u8 (8=float64,
+#   4=float32), count u64, capacity u64, timeframe ms i64, zero padding
+#   then six fixed-capacity columns back to back: timestamp int64 epoch-ms,
+#   open, high, low, close, volume in the price dtype.
+# Readers memmap `count` rows of each column. Appends write into the spare
+# capacity and bump `count` last; when capacity runs out the file is rewritten
+# at double size and swapped in atomically.
+MAGIC = b"CNDL"
+VERSION = 1
+HEADER = struct.Struct("<4sHB5xQQq")
+HEADER_SIZE = 64
+MIN_CAPACITY = 1024
+EXTENSION = ".cdl"
+
+
+def store_path(coin: str, timeframe: str = TIMEFRAME) -> Path:
+    return STORE_DIR / f"{coin}_{timeframe}{EXTENSION}"
+
+
+def stored_coins(timeframe: str) -> list:
+    """Every coin that has candles for this timeframe in the candle store."""
+    suffix = f"_{timeframe}"
+    return sorted(p.stem[: -len(suffix)] for p in STORE_DIR.glob(f"*{suffix}{EXTENSION}") if p.stem.endswith(suffix))
+
+
+def to_arrays(ohlcv) -> dict:
+    """Turn a ccxt-style [[ts, o, h, l, c, v], ...] list into column arrays."""
+    data = np.asarray(ohlcv, dtype=np.float64).reshape(-1, 6)
+    out = {"timestamp": data[:, 0].astype(np.int64)}
+    for i, col in enumerate(COLUMNS[1:], start=1):
+        out[col] = np.ascontiguousarray(data[:, i])
+    return out
+
+
+def _read_header(path: Path) -> dict:
+    with open(path, "rb") as f:
+        raw = f.read(HEADER.size)
+    magic, version, itemsize, count, capacity, tf_ms = HEADER.unpack(raw)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a v{VERSION} candle file")
+    return {"itemsize": itemsize, "count": count, "capacity": capacity, "timeframe_ms": tf_ms}
+
+
+def _column_layout(capacity: int, itemsize: int) -> list:
+    """(column, dtype, byte offset) for every column of a file."""
+    price = np.float32 if itemsize == 4 else np.float64
+    layout = []
+    offset = HEADER_SIZE
+    for col in COLUMNS:
+        dtype = np.dtype(np.int64 if col == "timestamp" else price)
+        layout.append((col, dtype, offset))
+        offset += capacity * dtype.itemsize
+    return layout
+
+
+def read_cdl(path) -> dict:
+    """Memory-map a .cdl file: read-only column views, no copies."""
+    path = Path(path)
+    h = _read_header(path)
+    layout = _column_layout(h["capacity"], h["itemsize"])
+    if h["count"] == 0:
+        return {col: np.zeros(0, dtype=dtype) for col, dtype, _ in layout}
+    return {
+        col: np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(h["count"],))
+        for col, dtype, offset in layout
+    }
+
+
+def write_cdl(path, candles: dict, timeframe_ms: int = 0, price_dtype=np.float64, capacity: int = None):
+    """Write a complete .cdl file (via a temp file + rename)."""
+    path = Path(path)
+    count = len(candles["timestamp"])
+    itemsize = np.dtype(price_dtype).itemsize
+    capacity = max(capacity or 0, count, MIN_CAPACITY)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, itemsize, count, capacity, timeframe_ms).ljust(HEADER_SIZE, b"\0"))
+        for col, dtype, _ in _column_layout(capacity, itemsize):
+            column = np.zeros(capacity, dtype=dtype)
+            column[:count] = candles[col]
+            f.write(column.tobytes())
+    os.replace(tmp, path)
+
+
+def append_cdl(path, candles: dict, timeframe_ms: int = 0, price_dtype=np.float64) -> int:
+    """Append rows newer than the last stored timestamp. Returns rows written."""
+    path = Path(path)
+    if not path.exists():
+        write_cdl(path, candles, timeframe_ms, price_dtype)
+        return len(candles["timestamp"])
+
+    h = _read_header(path)
+    count, capacity, itemsize = h["count"], h["capacity"], h["itemsize"]
+    existing = read_cdl(path)
+    ts = np.asarray(candles["timestamp"], dtype=np.int64)
+    start = int(np.searchsorted(ts, existing["timestamp"][-1], side="right")) if count else 0
+    n = len(ts) - start
+    if n <= 0:
+        return 0
+
+    if count + n > capacity:
+        merged = {col: np.concatenate([existing[col], np.asarray(candles[col])[start:]]) for col in COLUMNS}
+        write_cdl(path, merged, h["timeframe_ms"], existing["open"].dtype, capacity=max(capacity * 2, count + n))
+        return n
+
+    with open(path, "r+b") as f:
+        for col, dtype, offset in _column_layout(capacity, itemsize):
+            f.seek(offset + count * dtype.itemsize)
+            f.write(np.asarray(candles[col][start:], dtype=dtype).tobytes())
+        f.flush()
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, itemsize, count + n, capacity, h["timeframe_ms"]))
+    return n
+
+
+def load_csv(path) -> dict:
+    """Load an exported candles CSV (e.g. shard2/candles.csv) into column arrays."""
+    df = pd.read_csv(path, usecols=COLUMNS)
+    ts = df["timestamp"]
+    if not pd.api.types.is_numeric_dtype(ts):
+        ts = (pd.to_datetime(ts, utc=True) - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(milliseconds=1)
+    out = {"timestamp": np.asarray(ts, dtype=np.int64)}
+    for col in COLUMNS[1:]:
+        out[col] = df[col].to_numpy(dtype=np.float64)
+    return out
+
+
+def timeframe_ms(timeframe: str) -> int:
+    units = {"m": 60_000, "h": 3_600_000, "d": 86_400_000, "w": 604_800_000}
+    return int(timeframe[:-1]) * units[timeframe[-1]]
+
+
+def load_candles(coin: str, timeframe: str = TIMEFRAME) -> dict:
+    """Memory-map stored candles for a coin; empty arrays if nothing is stored yet."""
+    path = store_path(coin, timeframe)
+    if not path.exists():
+        return to_arrays([])
+    return read_cdl(path)
+
+
+def save_candles(coin: str, candles: dict, timeframe: str = TIMEFRAME) -> Path:
+    path = store_path(coin, timeframe)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    write_cdl(path, candles, timeframe_ms(timeframe))
+    return path
+
+
+def append_candles(coin: str, candles: dict, timeframe: str = TIMEFRAME) -> int:
+    path = store_path(coin, timeframe)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return append_cdl(path, candles, timeframe_ms(timeframe))
+
+
+def convert_csv(csv_path, coin: str, timeframe: str = TIMEFRAME) -> Path:
+    """Import an exported candles CSV (timestamp,open,high,low,close,volume[,date]) into the store."""
+    candles = load_csv(csv_path)
+    order = np.argsort(candles["timestamp"], kind="stable")
+    return save_candles(coin, {col: arr[order] for col, arr in candles.items()}, timeframe)
+
+
+# =====================
+# FETCHING
+# =====================
+def use_base_url(exchange, base_url: str):
+    """Point a ccxt exchange's REST endpoints at another host, keeping their paths.
+
+    e.g. use_base_url(exchange, "http://127.0.0.1:18080") for fake_binance.py.
+    """
+    base_url = base_url.rstrip("/")
+    for name, url in exchange.urls["api"].items():
+        if isinstance(url, str):
+            exchange.urls["api"][name] = base_url + urlparse(url).path
+    return exchange
+
+
+class RateBudget:
+    """Thread-safe request pacing: at most one request per `interval` seconds overall."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.next_at = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            at = max(now, self.next_at)
+            self.next_at = at + self.interval
+        if at > now:
+            time.sleep(at - now)
+
+
+def plan_windows(since: int, until: int, tf_ms: int, limit: int) -> list:
+    """Page start times covering [since, until) with `limit` candles per page."""
+    if until <= since:
+        return []
+    first = since - since % tf_ms if since % tf_ms else since
+    return list(range(first, until, tf_ms * limit))
+
+
+def find_gaps(timestamps, tf_ms: int) -> list:
+    """(first_missing, last_missing) epoch-ms ranges where candles are missing."""
+    ts = np.asarray(timestamps, dtype=np.int64)
+    if len(ts) < 2:
+        return []
+    jumps = np.flatnonzero(np.diff(ts) > tf_ms)
+    return [(int(ts[i]) + tf_ms, int(ts[i + 1]) - tf_ms) for i in jumps]
+
+
+def merge_ohlcv(*parts) -> list:
+    """Merge ccxt-style pages, sorted by timestamp, later duplicates winning."""
+    rows = {}
+    for part in parts:
+        for row in part:
+            rows[row[0]] = row
+    return [rows[ts] for ts in sorted(rows)]
+
+
+class FetchError(RuntimeError):
+    """A page could not be fetched; the candles around it would have a hole."""
+
+
+def fetch_windows(exchange, requests: list, limit: int, workers: int = FETCH_WORKERS) -> dict:
+    """Fetch (symbol, timeframe, since) pages concurrently within the exchange rate limit.
+
+    Returns {(symbol, timeframe): [ohlcv pages merged]}, or None for a key
+    when any of its pages still failed after three attempts.
+    """
+    budget = RateBudget(exchange.rateLimit / 1000)
+
+    def fetch(req):
+        symbol, timeframe, since = req
+        for attempt in range(3):
+            budget.wait()
+            try:
+                return req, exchange.fetch_ohlcv(symbol, timeframe=timeframe, since=since, limit=limit)
+            except Exception as e:
+                print(f"[{datetime.now()}] {symbol} {timeframe} page at {since} failed (attempt {attempt + 1}): {e}")
+        return req, None
+
+    pages = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for (symbol, timeframe, _), ohlcv in pool.map(fetch, requests):
+            pages.setdefault((symbol, timeframe), []).append(ohlcv)
+    return {key: None if any(part is None for part in parts) else merge_ohlcv(*parts) for key, parts in pages.items()}
+
+
+def fetch_range(exchange, symbol: str, timeframe: str, since: int, until: int = None, limit: int = LIMIT, workers: int = FETCH_WORKERS) -> list:
+    """fetch_ohlcv over [since, until) with the pages planned up front and fetched in parallel.
+
+    Raises FetchError when a page keeps failing rather than returning
+    history with a hole in it.
+    """
+    tf_ms = exchange.parse_timeframe(timeframe) * 1000
+    until = until or exchange.milliseconds()
+    requests = [(symbol, timeframe, s) for s in plan_windows(since, until, tf_ms, limit)]
+    rows = fetch_windows(exchange, requests, limit, workers).get((symbol, timeframe), [])
+    if rows is None:
+        raise FetchError(f"{symbol} {timeframe}: pages between {since} and {until} could not be fetched")
+    return rows
+
+
+def backfill(exchange, symbols: dict, timeframe: str = TIMEFRAME, start: datetime = START_DATE, workers: int = FETCH_WORKERS) -> dict:
+    """Bring many coins' stored candles up to date in one parallel pass.
+
+    `symbols` maps coin -> exchange symbol. For each coin this plans pages for
+    everything after the last stored candle (or from `start`) plus every gap
+    inside the stored history, fetches all pages for all coins through one
+    pool, then merges and deduplicates by timestamp. Only closed candles are
+    stored. A coin with a page that kept failing is left as stored. Returns
+    {coin: remaining gaps} (gaps the exchange has no data for).
+    """
+    tf_ms = exchange.parse_timeframe(timeframe) * 1000
+    now_ms = exchange.milliseconds()
+    start_ms = int(start.timestamp() * 1000)
+
+    stored = {coin: load_candles(coin, timeframe) for coin in symbols}
+    requests = []
+    for coin, symbol in symbols.items():
+        ts = stored[coin]["timestamp"]
+        since = int(ts[-1]) + tf_ms if len(ts) else start_ms
+        spans = [(since, now_ms)] + [(lo, hi + tf_ms) for lo, hi in find_gaps(ts, tf_ms)]
+        for lo, hi in spans:
+            requests.extend((symbol, timeframe, s) for s in plan_windows(lo, hi, tf_ms, BACKFILL_LIMIT))
+
+    started = time.time()
+    fetched = fetch_windows(exchange, requests, BACKFILL_LIMIT, workers)
+
+    remaining = {}
+    for coin, symbol in symbols.items():
+        old = stored[coin]
+        rows = fetched.get((symbol, timeframe), [])
+        if rows is None:
+            print(f"[{datetime.now()}] {coin}: some pages could not be fetched, store left unchanged")
+            remaining[coin] = find_gaps(old["timestamp"], tf_ms)
+            continue
+        rows = [row for row in rows if row[0] + tf_ms <= now_ms]
+        if rows:
+            new = to_arrays(rows)
+            ts = np.concatenate([old["timestamp"], new["timestamp"]])
+            # np.unique keeps the first occurrence: list fetched rows first so they win
+            order = np.concatenate([np.arange(len(old["timestamp"]), len(ts)), np.arange(len(old["timestamp"]))])
+            _, first = np.unique(ts[order], return_index=True)
+            keep = order[first]
+            merged = {col: np.concatenate([old[col], new[col]])[keep] for col in COLUMNS}
+            save_candles(coin, merged, timeframe)
+            old = merged
+        remaining[coin] = find_gaps(old["timestamp"], tf_ms)
+
+    print(f"[{datetime.now()}] Backfilled {len(symbols)} coins ({len(requests)} pages) in {time.time() - started:.1f}s")
+    return remaining
+
+
+def update_store(exchange, coin: str, symbol: str, timeframe: str = TIMEFRAME, start: datetime = START_DATE) -> dict:
+    """Fetch candles newer than the last stored one and append them to the store.
+
+    The still-open last candle is never written, so stored history only holds
+    closed candles.
+    """
+    stored = load_candles(coin, timeframe)
+    if len(stored["timestamp"]):
+        since = int(stored["timestamp"][-1]) + 1
+    else:
+        since = int(start.timestamp() * 1000)
+
+    tf_ms = exchange.parse_timeframe(timeframe) * 1000
+    now_ms = exchange.milliseconds()
+    fetched = fetch_range(exchange, symbol, timeframe, since, now_ms, BACKFILL_LIMIT)
+    fetched = [row for row in fetched if row[0] + tf_ms <= now_ms]
+    if not fetched:
+        return stored
+
+    written = append_candles(coin, to_arrays(fetched), timeframe)
+    merged = load_candles(coin, timeframe)
+    print(f"[{datetime.now()}] {coin}: stored {written} new {timeframe} candles ({len(merged['timestamp'])} total)")
+    return merged
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Candle store maintenance")
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import", help="import an exported candles CSV")
+    imp.add_argument("csv", type=Path)
+    imp.add_argument("coin")
+    imp.add_argument("--timeframe", default=TIMEFRAME)
+    fill = sub.add_parser("backfill", help="fetch missing history and gaps for coins")
+    fill.add_argument("coins", nargs="+")
+    fill.add_argument("--timeframe", default=TIMEFRAME)
+    fill.add_argument("--workers", type=int, default=FETCH_WORKERS)
+    fill.add_argument("--exchange-url", help="REST host instead of Binance, e.g. http://127.0.0.1:18080 (fake_binance.py)")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        path = convert_csv(args.csv, args.coin, args.timeframe)
+        print(f"[{datetime.now()}] {args.csv} -> {path} ({len(load_candles(args.coin, args.timeframe)['timestamp'])} candles)")
+    else:
+        import ccxt
+        exchange = ccxt.binance({"enableRateLimit": True})
+        if args.exchange_url:
+            use_base_url(exchange, args.exchange_url)
+        exchange.load_markets()
+        gaps = backfill(exchange, {coin: f"{coin}/USDT" for coin in args.coins}, args.timeframe, workers=args.workers)
+        for coin, missing in gaps.items():
+            if missing:
+                print(f"[{datetime.now()}] {coin}: {len(missing)} gaps the exchange has no candles for")
+
+
+if __name__ == "__main__":
+    main()
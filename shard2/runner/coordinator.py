@@ -0,0 +1,253 @@
+# =====================
+# IMPORTS
+# =====================
+import argparse
+import bisect
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+import requests
+
+# =====================
+# PARAMETERS
+# =====================
+PORT = 5010
+VNODES = 128               # ring points per node; more = smoother split
+HEARTBEAT_TIMEOUT = 60     # seconds without a heartbeat before a node is dropped
+UNIVERSE_REFRESH = 3600    # seconds between exchangeInfo refreshes
+
+
+def _point(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+
+
+class HashRing:
+    """Consistent hashing of symbols onto nodes.
+
+    Adding or removing a node only moves the symbols whose ring segment it
+    takes over or gives up (~1/N of them), so the other nodes keep their warm
+    candle and cup state.
+    """
+
+    def __init__(self, nodes=(), vnodes: int = VNODES):
+        self.vnodes = vnodes
+        self.points = []   # sorted ring positions
+        self.owners = {}   # ring position -> node
+        for node in nodes:
+            self.add(node)
+
+    @property
+    def nodes(self) -> list:
+        return sorted(set(self.owners.values()))
+
+    def add(self, node: str):
+        for i in range(self.vnodes):
+            p = _point(f"{node}#{i}")
+            if p not in self.owners:
+                bisect.insort(self.points, p)
+            self.owners[p] = node
+
+    def remove(self, node: str):
+        drop = [p for p, owner in self.owners.items() if owner == node]
+        for p in drop:
+            del self.owners[p]
+        self.points = [p for p in self.points if p in self.owners]
+
+    def owner(self, symbol: str):
+        if not self.points:
+            return None
+        i = bisect.bisect(self.points, _point(symbol)) % len(self.points)
+        return self.owners[self.points[i]]
+
+    def assign(self, symbols: list) -> dict:
+        out = {node: [] for node in self.nodes}
+        for symbol in symbols:
+            node = self.owner(symbol)
+            if node is not None:
+                out[node].append(symbol)
+        return out
+
+
+class LocalCoordinator:
+    """Shard membership and symbol assignment, in-process.
+
+    This is the whole coordinator; the HTTP server below only exposes it, so
+    a single machine (or a test) can use it directly. `version` changes every
+    time membership or the universe changes, and nodes re-read their
+    assignment when it does.
+    """
+
+    def __init__(self, universe=None, heartbeat_timeout: float = HEARTBEAT_TIMEOUT, clock=time.time):
+        self.universe_fn = universe if callable(universe) else (lambda: list(universe or []))
+        self.heartbeat_timeout = heartbeat_timeout
+        self.clock = clock
+        self.ring = HashRing()
+        self.seen = {}       # node -> last heartbeat
+        self.symbols = []
+        self.refreshed = 0.0
+        self.version = 0
+        self.lock = threading.Lock()
+
+    def _log_moves(self, before: dict, reason: str):
+        after = self.ring.assign(self.symbols)
+        old_owner = {s: n for n, syms in before.items() for s in syms}
+        moved = sum(1 for n, syms in after.items() for s in syms if old_owner.get(s) != n)
+        print(f"[{datetime.now()}] Rebalanced ({reason}): {len(self.ring.nodes)} nodes, {len(self.symbols)} symbols, {moved} moved, version {self.version}")
+
+    def _expire(self):
+        now = self.clock()
+        for node in [n for n, t in self.seen.items() if now - t > self.heartbeat_timeout]:
+            before = self.ring.assign(self.symbols)
+            del self.seen[node]
+            self.ring.remove(node)
+            self.version += 1
+            self._log_moves(before, f"{node} timed out")
+
+    def refresh_universe(self, force: bool = False):
+        with self.lock:
+            if not force and self.symbols and self.clock() - self.refreshed < UNIVERSE_REFRESH:
+                return
+            symbols = sorted(self.universe_fn())
+            self.refreshed = self.clock()
+            if symbols and symbols != self.symbols:
+                self.symbols = symbols
+                self.version += 1
+                print(f"[{datetime.now()}] Universe: {len(symbols)} symbols, version {self.version}")
+
+    def join(self, node: str) -> int:
+        self.refresh_universe()
+        with self.lock:
+            self._expire()
+            self.seen[node] = self.clock()
+            if node not in self.ring.nodes:
+                before = self.ring.assign(self.symbols)
+                self.ring.add(node)
+                self.version += 1
+                self._log_moves(before, f"{node} joined")
+            return self.version
+
+    def leave(self, node: str) -> int:
+        with self.lock:
+            self.seen.pop(node, None)
+            if node in self.ring.nodes:
+                before = self.ring.assign(self.symbols)
+                self.ring.remove(node)
+                self.version += 1
+                self._log_moves(before, f"{node} left")
+            return self.version
+
+    def heartbeat(self, node: str) -> int:
+        """Keep a node alive (re-joining it if it had expired); returns the current version."""
+        if node not in self.seen:
+            return self.join(node)
+        self.refresh_universe()
+        with self.lock:
+            self.seen[node] = self.clock()
+            self._expire()
+            return self.version
+
+    def assignment(self, node: str) -> dict:
+        with self.lock:
+            self._expire()
+            symbols = [s for s in self.symbols if self.ring.owner(s) == node]
+            return {"node": node, "version": self.version, "nodes": self.ring.nodes, "symbols": symbols}
+
+
+# =====================
+# HTTP
+# =====================
+def make_handler(coordinator: LocalCoordinator):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status: int, data: dict):
+            body = json.dumps(data).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            node = parse_qs(url.query).get("node", [None])[0]
+            if url.path == "/assignment" and node:
+                return self._send(200, coordinator.assignment(node))
+            if url.path == "/nodes":
+                return self._send(200, {"version": coordinator.version, "nodes": coordinator.ring.nodes})
+            self._send(404, {"error": "Not found"})
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            node = body.get("node")
+            actions = {"/join": coordinator.join, "/leave": coordinator.leave, "/heartbeat": coordinator.heartbeat}
+            if url.path not in actions or not node:
+                return self._send(400, {"error": "Invalid request"})
+            self._send(200, {"version": actions[url.path](node)})
+
+    return Handler
+
+
+def serve(coordinator: LocalCoordinator, port: int = PORT) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("0.0.0.0", port), make_handler(coordinator))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class CoordinatorClient:
+    """Same interface as LocalCoordinator, over HTTP."""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip("/")
+
+    def _post(self, path: str, node: str) -> int:
+        resp = requests.post(f"{self.base_url}{path}", json={"node": node}, timeout=5)
+        resp.raise_for_status()
+        return resp.json()["version"]
+
+    def join(self, node: str) -> int:
+        return self._post("/join", node)
+
+    def leave(self, node: str) -> int:
+        return self._post("/leave", node)
+
+    def heartbeat(self, node: str) -> int:
+        return self._post("/heartbeat", node)
+
+    def assignment(self, node: str) -> dict:
+        resp = requests.get(f"{self.base_url}/assignment", params={"node": node}, timeout=5)
+        resp.raise_for_status()
+        return resp.json()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Assign the perpetual universe to scanner nodes by consistent hashing")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--symbols", nargs="*", help="fixed universe instead of exchangeInfo")
+    args = parser.parse_args()
+
+    if args.symbols:
+        universe = args.symbols
+    else:
+        from scanner import get_active_futures_symbols
+        universe = get_active_futures_symbols
+    coordinator = LocalCoordinator(universe)
+    coordinator.refresh_universe(force=True)
+    serve(coordinator, args.port)
+    print(f"[{datetime.now()}] Coordinator listening on :{args.port}")
+    while True:
+        time.sleep(HEARTBEAT_TIMEOUT)
+        with coordinator.lock:
+            coordinator._expire()
+
+
+if __name__ == "__main__":
+    main()
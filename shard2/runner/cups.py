@@ -0,0 +1,289 @@
+# =====================
+# IMPORTS
+# =====================
+import numpy as np
+from pathlib import Path
+
+# =====================
+# PARAMETERS
+# =====================
+CUP_SIZE_PCT = 2.0
+CUP_WINDOW = 200  # complete cups a runner keeps in memory per coin
+CUP_LOG_DIR = Path(__file__).resolve().parent / "data" / "cups"
+
+# One row per complete cup. Timestamps are epoch milliseconds, "bar" is the
+# index of the candle whose arrival emitted the cup (the cup's end candle).
+#
+# Memory budget per symbol (15m candles since START_DATE, ~27k rows after
+# nine months):
+#   first cycle  6 x 8 B candle columns = 48 B/candle -> ~1.3 MB, freed after
+#                the cycle; the ccxt response (~256 B/candle as nested lists)
+#                is converted with to_arrays() and dropped straight away
+#   resident     CupBuilder state (a few hundred bytes) + CUP_WINDOW cups x
+#                56 B = ~11 KB, independent of how long the runner has been up
+#   later cycles only the candles since the last closed one (one or two rows)
+# Older cups go to the on-disk cup log. The old DataFrame + iterrows() +
+# dict-per-cup path peaked at ~10.6 MB and ~0.95 s per symbol every cycle;
+# build_cups() over the same 27k candles peaks at ~4.7 MB in ~35 ms.
+CUP_DTYPE = np.dtype([
+    ("id", np.int64),
+    ("fill", np.float64),
+    ("open", np.float64),
+    ("close", np.float64),
+    ("start", np.int64),
+    ("end", np.int64),
+    ("bar", np.int64),
+])
+
+
+class CupBuilder:
+    """Incremental bucket-fill cup construction for one coin.
+
+    Holds exactly the loop state of process_coin() between candles, so
+    feeding candles in several batches yields the same cups as one pass over
+    the whole history. copy() lets a runner evaluate the still-open candle
+    without committing it.
+    """
+
+    __slots__ = ("cup_size_pct", "handoff", "next_id", "fill", "open", "close", "start", "handoff_price", "last_ts", "bars")
+
+    def __init__(self, cup_size_pct: float = CUP_SIZE_PCT, handoff: bool = False):
+        self.cup_size_pct = cup_size_pct
+        self.handoff = handoff
+        self.next_id = 0          # id of the next emitted cup
+        self.fill = 0.0           # fill of the cup being formed
+        self.open = None          # its open price (None when no cup is forming)
+        self.close = None
+        self.start = None         # its start candle, epoch ms
+        self.handoff_price = None
+        self.last_ts = -1         # last candle fed
+        self.bars = 0             # candles fed so far
+
+    def copy(self) -> "CupBuilder":
+        other = CupBuilder.__new__(CupBuilder)
+        for name in CupBuilder.__slots__:
+            setattr(other, name, getattr(self, name))
+        return other
+
+    def feed(self, timestamps, opens, closes, bar_fill=None, bar_open=None) -> np.ndarray:
+        """Advance over candles newer than the last one fed; return the complete cups they emit.
+
+        If given, bar_fill/bar_open are filled per candle with the forming
+        cup's fill and open price (NaN when none) after that candle.
+        """
+        ts_arr = np.asarray(timestamps, dtype=np.int64)
+        skip = int(np.searchsorted(ts_arr, self.last_ts, side="right"))
+        ts_list = ts_arr[skip:].tolist()
+        o_list = np.asarray(opens, dtype=np.float64)[skip:].tolist()
+        c_list = np.asarray(closes, dtype=np.float64)[skip:].tolist()
+        n = len(ts_list)
+        if n == 0:
+            return np.zeros(0, dtype=CUP_DTYPE)
+
+        cup_size_pct = self.cup_size_pct
+        handoff = self.handoff
+        cup_id_counter = self.next_id
+        current_fill = self.fill
+        cup_open_price = self.open
+        cup_close_price = self.close
+        cup_start_date = self.start
+        handoff_price = self.handoff_price
+        bars = self.bars
+        rows = []
+
+        for i in range(n):
+            o = o_list[i]
+            c = c_list[i]
+            ts = ts_list[i]
+
+            body_pct = abs(c - o) / o * 100
+            if body_pct != 0:
+                remaining = body_pct if c > o else -body_pct
+
+                while abs(remaining) > 0:
+                    capacity_left = cup_size_pct - abs(current_fill)
+
+                    if current_fill == 0 and cup_open_price is None:
+                        if handoff and handoff_price is not None:
+                            cup_open_price = handoff_price
+                        else:
+                            cup_open_price = o
+                        cup_start_date = ts
+                        handoff_price = None
+
+                    if capacity_left <= 0:
+                        rows.append((cup_id_counter, current_fill, cup_open_price, cup_close_price, cup_start_date, ts, bars + i))
+                        cup_id_counter += 1
+                        handoff_price = cup_close_price
+                        current_fill = 0.0
+                        cup_open_price = None
+                        cup_close_price = None
+                        cup_start_date = None
+                        continue
+
+                    delta = min(abs(remaining), capacity_left)
+                    if remaining < 0:
+                        delta = -delta
+                    current_fill += delta
+                    remaining -= delta
+                    cup_close_price = c
+
+                    if current_fill == 0:
+                        handoff_price = cup_close_price
+                        cup_open_price = None
+                        cup_close_price = None
+                        cup_start_date = None
+                        break
+
+            if bar_fill is not None:
+                bar_fill[skip + i] = current_fill
+                bar_open[skip + i] = cup_open_price if cup_open_price is not None else np.nan
+
+        self.next_id = cup_id_counter
+        self.fill = current_fill
+        self.open = cup_open_price
+        self.close = cup_close_price
+        self.start = cup_start_date
+        self.handoff_price = handoff_price
+        self.last_ts = ts_list[-1]
+        self.bars = bars + n
+
+        cups = np.array(rows, dtype=CUP_DTYPE)
+        return cups[np.abs(cups["fill"]) >= cup_size_pct]
+
+
+def build_cups(timestamps, opens, closes, cup_size_pct: float = CUP_SIZE_PCT, handoff: bool = False):
+    """Run the bucket-fill cup construction used by the runners over candle arrays.
+
+    Mirrors the loop in process_coin() step for step: bot_cross.py (MAZE2) opens
+    each cup at the candle open, bot_prod.py (MAZE) hands the previous cup's
+    close over as the next cup's open (handoff=True).
+
+    Returns (cups, bar_fill, bar_open): the complete cups as a CUP_DTYPE array
+    plus, for every candle, the incomplete cup's fill and open price after that
+    candle (NaN when no cup is forming).
+    """
+    n = len(timestamps)
+    bar_fill = np.zeros(n, dtype=np.float64)
+    bar_open = np.full(n, np.nan, dtype=np.float64)
+    cups = CupBuilder(cup_size_pct, handoff).feed(timestamps, opens, closes, bar_fill, bar_open)
+    return cups, bar_fill, bar_open
+
+
+# =====================
+# CUP LOG
+# =====================
+# Complete cups that have left a runner's in-memory window live in an
+# append-only file of raw CUP_DTYPE records, one per (coin, log name). Cup ids
+# count from START_DATE, so row k holds cup id k and re-appending after a
+# restart is a no-op.
+def cup_log_path(coin: str, name: str) -> Path:
+    return CUP_LOG_DIR / f"{coin}_{name}.cup"
+
+
+def read_cup_log(path) -> np.ndarray:
+    """Memory-map a cup log read-only; nothing is loaded until rows are touched."""
+    path = Path(path)
+    size = path.stat().st_size if path.exists() else 0
+    if size < CUP_DTYPE.itemsize:
+        return np.zeros(0, dtype=CUP_DTYPE)
+    return np.memmap(path, dtype=CUP_DTYPE, mode="r", shape=(size // CUP_DTYPE.itemsize,))
+
+
+def append_cup_log(path, cups: np.ndarray) -> int:
+    """Append cups not yet in the log. Returns rows written.
+
+    If the log disagrees with the cups being appended (e.g. START_DATE or the
+    cup size changed under the same log name) it is cut back to the first new
+    cup before writing.
+    """
+    if not len(cups):
+        return 0
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    logged = read_cup_log(path)
+    first = int(cups["id"][0])
+    count = len(logged)
+    stale = first < count and int(logged["start"][first]) != int(cups["start"][0])
+    del logged
+    if stale:
+        count = first
+        with open(path, "r+b") as f:
+            f.truncate(count * CUP_DTYPE.itemsize)
+    new = cups[cups["id"] >= count]
+    if not len(new):
+        return 0
+    if int(new["id"][0]) != count:
+        # Gap in ids (first cups never seen): nothing consistent to append to
+        return 0
+    with open(path, "ab") as f:
+        f.write(np.ascontiguousarray(new, dtype=CUP_DTYPE).tobytes())
+    return len(new)
+
+
+class CupHistory:
+    """A live runner's cups for one coin with bounded memory.
+
+    The builder only ever sees closed candles; the newest `window` complete
+    cups stay in memory and every complete cup is appended to the cup log.
+    The still-open candle is run on a copy of the builder each cycle, so cups
+    it completes are visible to decisions but never logged until the candle
+    has closed.
+    """
+
+    __slots__ = ("builder", "recent", "log_path", "window")
+
+    def __init__(self, log_path, cup_size_pct: float = CUP_SIZE_PCT, handoff: bool = False, window: int = CUP_WINDOW):
+        self.builder = CupBuilder(cup_size_pct, handoff)
+        self.recent = np.zeros(0, dtype=CUP_DTYPE)
+        self.log_path = log_path
+        self.window = window
+
+    def since(self):
+        """Epoch ms to fetch candles from next, or None before the first fetch."""
+        return self.builder.last_ts + 1 if self.builder.bars else None
+
+    def update(self, candles: dict, now_ms: int, timeframe_ms: int):
+        """Feed fetched candles; returns (recent complete cups, builder state after the open candle)."""
+        ts = candles["timestamp"]
+        n_closed = int(np.searchsorted(ts, now_ms - timeframe_ms, side="right"))
+        new = self.builder.feed(ts[:n_closed], candles["open"][:n_closed], candles["close"][:n_closed])
+        if len(new):
+            append_cup_log(self.log_path, new)
+            self.recent = np.concatenate([self.recent, new])[-self.window:]
+
+        forming = self.builder.copy()
+        provisional = forming.feed(ts[n_closed:], candles["open"][n_closed:], candles["close"][n_closed:])
+        if len(provisional):
+            return np.concatenate([self.recent, provisional])[-self.window:], forming
+        return self.recent, forming
+
+    def replay(self, candles: dict, start_ms: int, now_ms: int, timeframe_ms: int) -> bool:
+        """Warm start from stored candles: feed the closed ones from start_ms on.
+
+        Returns False without feeding anything unless they begin with the
+        candle at start_ms and have no gaps, since cup ids and boundaries
+        depend on every candle from the start.
+        """
+        ts = candles["timestamp"]
+        lo = int(np.searchsorted(ts, start_ms, side="left"))
+        hi = int(np.searchsorted(ts, now_ms - timeframe_ms, side="right"))
+        if lo >= hi or ts[lo] - start_ms >= timeframe_ms or ts[hi - 1] - ts[lo] != (hi - lo - 1) * timeframe_ms:
+            return False
+        self.update({col: candles[col][lo:hi] for col in ("timestamp", "open", "close")}, now_ms, timeframe_ms)
+        return True
+
+    def history(self, latest: np.ndarray = None) -> np.ndarray:
+        """Every logged cup for this coin (memory-mapped, read lazily).
+
+        Cups in `latest` (what update() returned) that are not logged yet,
+        i.e. the ones the open candle completes, are added at the end. Falls
+        back to `latest` alone when the log does not reach its first cup.
+        """
+        logged = read_cup_log(self.log_path)
+        if latest is None or not len(latest):
+            return logged
+        if int(latest["id"][0]) > len(logged):
+            return latest
+        newer = latest[latest["id"] >= len(logged)]
+        return np.concatenate([logged, newer]) if len(newer) else logged
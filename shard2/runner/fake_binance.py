@@ -0,0 +1,493 @@
+# =====================
+# IMPORTS
+# =====================
+import numpy as np
+import argparse
+import base64
+import hashlib
+import json
+import random
+import select
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+from candle_store import load_candles, load_csv, stored_coins, timeframe_ms, START_DATE
+
+# =====================
+# PARAMETERS
+# =====================
+PORT = 18080
+BASE_TIMEFRAME = "15m"   # step of the stored series; other intervals are aggregated or interpolated from it
+SYMBOLS = 300            # synthetic markets (recorded ones count towards this)
+COINS = ["BTC", "ETH", "ZEC", "ICP", "ENA", "BAT", "VET", "HOOK"]  # listed first, then C000, C001, ...
+QUOTE = "USDT"
+SEED = 1
+LATENCY_MS = 0           # added to every REST response...
+JITTER_MS = 0            # ...plus uniform 0..JITTER_MS
+ERROR_RATE = 0.0         # share of REST requests answered with a 503
+WEIGHT_LIMIT = 2400      # request weight per minute before 429s (fapi's REQUEST_WEIGHT)
+KLINES_LIMIT = 1500      # largest page served
+STREAM_INTERVAL = 1.0    # seconds between stream updates
+EXTEND_CANDLES = 96 * 7  # synthetic series grow a week at a time
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC11B85"
+
+
+# =====================
+# MARKET DATA
+# =====================
+class Market:
+    """One symbol's candles at a fixed step, recorded or synthetic.
+
+    Synthetic series are a seeded random walk from START_DATE, extended as
+    the clock moves on. The candle containing `now` is served in progress:
+    price moves linearly from its open to its final close over the candle,
+    which is also what ticker prices and finer intervals are built from.
+    """
+
+    def __init__(self, symbol: str, step_ms: int, candles: dict = None, start_ms: int = None, seed: int = SEED):
+        self.symbol = symbol
+        self.step_ms = step_ms
+        self.lock = threading.Lock()
+        self.rng = None
+        if candles is None:
+            self.rng = np.random.default_rng([seed, zlib.crc32(symbol.encode())])
+            self.price = float(self.rng.uniform(0.05, 500))
+            self.ts = np.zeros(0, dtype=np.int64)
+            self.o = self.h = self.l = self.c = self.v = np.zeros(0)
+            self.next_ts = start_ms
+        else:
+            self.ts = np.asarray(candles["timestamp"], dtype=np.int64)
+            self.o, self.h, self.l, self.c, self.v = (np.asarray(candles[k], dtype=np.float64) for k in ("open", "high", "low", "close", "volume"))
+
+    def ensure(self, until_ms: int):
+        """Grow a synthetic series so it covers candles opening before until_ms."""
+        if self.rng is None or (len(self.ts) and self.ts[-1] + self.step_ms >= until_ms):
+            return
+        with self.lock:
+            while self.next_ts < until_ms:
+                n = max(EXTEND_CANDLES, int((until_ms - self.next_ts) // self.step_ms) + 1)
+                close = self.price * np.exp(np.cumsum(self.rng.normal(0, 0.004, n)))
+                open_ = np.r_[self.price, close[:-1]]
+                wick = 1 + np.abs(self.rng.normal(0, 0.002, n))
+                self.ts = np.r_[self.ts, self.next_ts + np.arange(n, dtype=np.int64) * self.step_ms]
+                self.o = np.r_[self.o, open_]
+                self.c = np.r_[self.c, close]
+                self.h = np.r_[self.h, np.maximum(open_, close) * wick]
+                self.l = np.r_[self.l, np.minimum(open_, close) / wick]
+                self.v = np.r_[self.v, self.rng.uniform(1e3, 1e6, n)]
+                self.price = float(close[-1])
+                self.next_ts += n * self.step_ms
+
+    def price_at(self, now_ms: int) -> float:
+        self.ensure(now_ms + 1)
+        i = int(np.searchsorted(self.ts, now_ms, side="right")) - 1
+        if i < 0:
+            return float(self.o[0]) if len(self.o) else 0.0
+        if now_ms >= self.ts[i] + self.step_ms:
+            return float(self.c[i])
+        frac = (now_ms - self.ts[i]) / self.step_ms
+        return float(self.o[i] + (self.c[i] - self.o[i]) * frac)
+
+    def _base(self, lo_ms: int, hi_ms: int, now_ms: int) -> tuple:
+        """Base candles opening in [lo_ms, hi_ms) and by now_ms, the last one cut at now_ms."""
+        self.ensure(min(hi_ms, now_ms + 1))
+        lo = int(np.searchsorted(self.ts, lo_ms, side="left"))
+        hi = int(np.searchsorted(self.ts, min(hi_ms - 1, now_ms), side="right"))
+        ts, o, h, l, c, v = (a[lo:hi].copy() for a in (self.ts, self.o, self.h, self.l, self.c, self.v))
+        if len(ts) and now_ms < ts[-1] + self.step_ms:
+            frac = (now_ms - ts[-1]) / self.step_ms
+            upper, lower = h[-1] / max(o[-1], c[-1]) - 1, min(o[-1], c[-1]) / l[-1] - 1  # wick sizes
+            c[-1] = o[-1] + (c[-1] - o[-1]) * frac
+            h[-1] = max(o[-1], c[-1]) * (1 + upper * frac)
+            l[-1] = min(o[-1], c[-1]) / (1 + lower * frac)
+            v[-1] *= frac
+        return ts, o, h, l, c, v
+
+    def klines(self, interval_ms: int, start_ms: int = None, end_ms: int = None, limit: int = 500, now_ms: int = None) -> list:
+        """Binance /klines rows: open time >= startTime, <= endTime, at most `limit`, the open one included."""
+        end_ms = now_ms if end_ms is None else min(end_ms, now_ms)
+        if start_ms is None:
+            start_ms = (end_ms // interval_ms - limit + 1) * interval_ms
+        first = -(-start_ms // interval_ms) * interval_ms
+        last = min(end_ms // interval_ms * interval_ms, first + (limit - 1) * interval_ms)
+        if last < first:
+            return []
+
+        if interval_ms >= self.step_ms:
+            ts, o, h, l, c, v = self._base(first, last + interval_ms, now_ms)
+            if not len(ts):
+                return []
+            keys = ts // interval_ms
+            starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+            ends = np.r_[starts[1:], len(ts)] - 1
+            rows = zip(
+                (keys[starts] * interval_ms).tolist(), o[starts].tolist(),
+                np.maximum.reduceat(h, starts).tolist(), np.minimum.reduceat(l, starts).tolist(),
+                c[ends].tolist(), np.add.reduceat(v, starts).tolist(),
+            )
+        else:
+            # Finer than the series: split each candle along its open -> close line
+            k = self.step_ms // interval_ms
+            ts, o, h, l, c, v = self._base(first // self.step_ms * self.step_ms, last + 1, now_ms)
+            full_c = self.c[np.searchsorted(self.ts, ts)] if len(ts) else c
+            j = np.arange(k)
+            sub_ts = (ts[:, None] + j * interval_ms).ravel()
+            sub_o = (o[:, None] + (full_c - o)[:, None] * j / k).ravel()
+            sub_c = (o[:, None] + (full_c - o)[:, None] * (j + 1) / k).ravel()
+            sub_v = np.repeat(v / k, k)
+            keep = (sub_ts >= first) & (sub_ts <= last) & (sub_ts <= now_ms)
+            sub_ts, sub_o, sub_c, sub_v = sub_ts[keep], sub_o[keep], sub_c[keep], sub_v[keep]
+            if len(sub_ts) and now_ms < sub_ts[-1] + interval_ms:
+                sub_c[-1] = self.price_at(now_ms)
+            rows = zip(sub_ts.tolist(), sub_o.tolist(), np.maximum(sub_o, sub_c).tolist(), np.minimum(sub_o, sub_c).tolist(), sub_c.tolist(), sub_v.tolist())
+
+        return [
+            [t, f"{o_:.8g}", f"{h_:.8g}", f"{l_:.8g}", f"{c_:.8g}", f"{v_:.3f}", t + interval_ms - 1, "0", 0, "0", "0", "0"]
+            for t, o_, h_, l_, c_, v_ in rows
+        ]
+
+    def ticker_24h(self, now_ms: int) -> dict:
+        ts, o, h, l, c, v = self._base(now_ms - 86_400_000, now_ms + 1, now_ms)
+        last = self.price_at(now_ms)
+        first = float(o[0]) if len(o) else last
+        return {
+            "o": f"{first:.8g}", "c": f"{last:.8g}",
+            "h": f"{float(h.max()) if len(h) else last:.8g}", "l": f"{float(l.min()) if len(l) else last:.8g}",
+            "v": f"{float(v.sum()):.3f}", "p": f"{last - first:.8g}",
+            "P": f"{(last - first) / first * 100 if first else 0:.3f}",
+        }
+
+
+# =====================
+# FAULTS AND LIMITS
+# =====================
+# Request weight per endpoint (Binance futures values; spot exchangeInfo is heavier)
+def request_weight(path: str, query: dict) -> int:
+    if path.endswith("/klines"):
+        limit = int(query.get("limit", 500))
+        return 1 if limit < 100 else 2 if limit < 500 else 5 if limit <= 1000 else 10
+    if path.endswith("/exchangeInfo"):
+        return 20 if path.startswith("/api/") else 1
+    if path.endswith("/ticker/price"):
+        return 1 if "symbol" in query else 2 if path.startswith("/fapi/") else 4
+    return 1
+
+
+class WeightWindow:
+    """Used request weight in the current minute, as reported in X-MBX-USED-WEIGHT-1M."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.minute = None
+        self.used = 0
+        self.lock = threading.Lock()
+
+    def add(self, weight: int, now_ms: int) -> tuple:
+        """Returns (used weight, ms until the window resets or None when within the limit)."""
+        with self.lock:
+            minute = now_ms // 60_000
+            if minute != self.minute:
+                self.minute, self.used = minute, 0
+            self.used += weight
+            over = self.limit and self.used > self.limit
+            return self.used, ((minute + 1) * 60_000 - now_ms) if over else None
+
+
+# =====================
+# SERVER
+# =====================
+class FakeBinance:
+    """In-memory Binance spot/futures public API: REST plus kline and ticker streams."""
+
+    def __init__(self, markets: dict, clock=time.time, latency_ms: float = LATENCY_MS, jitter_ms: float = JITTER_MS,
+                 error_rate: float = ERROR_RATE, weight_limit: int = WEIGHT_LIMIT, seed: int = SEED):
+        self.markets = markets
+        self.clock = clock
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.weights = WeightWindow(weight_limit)
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "errors": 0, "rate_limited": 0, "streams": 0, "paths": {}}
+
+    def now_ms(self) -> int:
+        return int(self.clock() * 1000)
+
+    def market(self, symbol: str):
+        return self.markets.get((symbol or "").upper())
+
+    @staticmethod
+    def symbol_info(symbol: str, futures: bool) -> dict:
+        info = {
+            "symbol": symbol,
+            "status": "TRADING",
+            "baseAsset": symbol[:-len(QUOTE)],
+            "quoteAsset": QUOTE,
+            "baseAssetPrecision": 8,
+            "quotePrecision": 8,
+            "orderTypes": ["LIMIT", "MARKET"],
+            "filters": [
+                {"filterType": "PRICE_FILTER", "minPrice": "0.00000100", "maxPrice": "1000000", "tickSize": "0.00000100"},
+                {"filterType": "LOT_SIZE", "minQty": "0.001", "maxQty": "10000000", "stepSize": "0.001"},
+            ],
+        }
+        if futures:
+            info.update({
+                "pair": symbol, "contractType": "PERPETUAL", "marginAsset": QUOTE,
+                "pricePrecision": 6, "quantityPrecision": 3, "timeInForce": ["GTC", "IOC", "FOK"],
+                "onboardDate": int(START_DATE.timestamp() * 1000), "deliveryDate": 4133404800000,
+            })
+        else:
+            info.update({
+                "quoteAssetPrecision": 8, "isSpotTradingAllowed": True, "isMarginTradingAllowed": False,
+                "permissions": ["SPOT"], "permissionSets": [["SPOT"]],
+            })
+        return info
+
+    def exchange_info(self, path: str) -> dict:
+        futures = path.startswith("/fapi/")
+        symbols = [] if path.startswith("/dapi/") else [self.symbol_info(s, futures) for s in self.markets]
+        return {
+            "timezone": "UTC",
+            "serverTime": self.now_ms(),
+            "rateLimits": [{"rateLimitType": "REQUEST_WEIGHT", "interval": "MINUTE", "intervalNum": 1, "limit": self.weights.limit}],
+            "exchangeFilters": [],
+            "assets": [],
+            "symbols": symbols,
+        }
+
+    def handle(self, path: str, query: dict) -> tuple:
+        """(status, body) for a REST GET."""
+        now = self.now_ms()
+        name = path.rsplit("/", 1)[-1] if not path.endswith("/ticker/price") else "ticker/price"
+        if name in ("ping",):
+            return 200, {}
+        if name == "time":
+            return 200, {"serverTime": now}
+        if name == "exchangeInfo":
+            return 200, self.exchange_info(path)
+        if name == "klines":
+            market = self.market(query.get("symbol"))
+            if market is None:
+                return 400, {"code": -1121, "msg": "Invalid symbol."}
+            try:
+                interval_ms = timeframe_ms(query["interval"])
+            except (KeyError, ValueError):
+                return 400, {"code": -1120, "msg": "Invalid interval."}
+            limit = min(int(query.get("limit", 500)), KLINES_LIMIT)
+            start = int(query["startTime"]) if "startTime" in query else None
+            end = int(query["endTime"]) if "endTime" in query else None
+            return 200, market.klines(interval_ms, start, end, limit, now)
+        if name == "ticker/price":
+            if "symbol" in query:
+                market = self.market(query["symbol"])
+                if market is None:
+                    return 400, {"code": -1121, "msg": "Invalid symbol."}
+                return 200, {"symbol": market.symbol, "price": f"{market.price_at(now):.8g}", "time": now}
+            names = json.loads(query["symbols"]) if "symbols" in query else list(self.markets)
+            if any(s not in self.markets for s in names):
+                return 400, {"code": -1121, "msg": "Invalid symbol."}
+            return 200, [{"symbol": s, "price": f"{self.markets[s].price_at(now):.8g}", "time": now} for s in names]
+        return 404, {"code": -5, "msg": f"Unknown endpoint {path}"}
+
+    def stream_events(self, streams: list, last_open: dict) -> list:
+        """One update per stream: the current kline (after the closed one when a candle rolled over) or a 24h ticker."""
+        now = self.now_ms()
+        events = []
+        for stream in streams:
+            symbol, _, kind = stream.partition("@")
+            market = self.market(symbol)
+            if market is None:
+                continue
+            if kind.startswith("kline_"):
+                interval = kind[len("kline_"):]
+                interval_ms = timeframe_ms(interval)
+                rows = market.klines(interval_ms, now - interval_ms, now, 2, now)
+                if not rows:
+                    continue
+                current = rows[-1]
+                previous = last_open.get(stream)
+                last_open[stream] = current[0]
+                out = [(rows[-2], True)] if previous is not None and previous != current[0] and len(rows) > 1 else []
+                out.append((current, False))
+                for row, closed in out:
+                    events.append((stream, {
+                        "e": "kline", "E": now, "s": market.symbol,
+                        "k": {
+                            "t": row[0], "T": row[6], "s": market.symbol, "i": interval,
+                            "o": row[1], "h": row[2], "l": row[3], "c": row[4], "v": row[5], "x": closed,
+                        },
+                    }))
+            elif kind in ("ticker", "miniTicker"):
+                events.append((stream, {"e": "24hrTicker" if kind == "ticker" else "24hrMiniTicker", "E": now, "s": market.symbol, **market.ticker_24h(now)}))
+        return events
+
+    def count(self, key: str, path: str = None):
+        with self.lock:
+            self.stats[key] += 1
+            if path:
+                self.stats["paths"][path] = self.stats["paths"].get(path, 0) + 1
+
+    def serve(self, port: int = PORT, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """Serve on a background thread; point clients at http://host:port."""
+        server = ThreadingHTTPServer((host, port), make_handler(self))
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+def make_handler(fake: FakeBinance):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def send_json(self, status: int, body, headers: dict = None):
+            data = json.dumps(body, separators=(",", ":")).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, str(v))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            if self.headers.get("Upgrade", "").lower() == "websocket":
+                return self.stream(url.path, query)
+            if url.path == "/fake/stats":
+                with fake.lock:
+                    return self.send_json(200, json.loads(json.dumps(fake.stats)))
+
+            fake.count("requests", url.path)
+            if fake.latency_ms or fake.jitter_ms:
+                time.sleep((fake.latency_ms + fake.random.uniform(0, fake.jitter_ms)) / 1000)
+            used, retry_ms = fake.weights.add(request_weight(url.path, query), fake.now_ms())
+            headers = {"X-MBX-USED-WEIGHT-1M": used}
+            if retry_ms is not None:
+                fake.count("rate_limited")
+                headers["Retry-After"] = max(1, -(-retry_ms // 1000))
+                return self.send_json(429, {"code": -1003, "msg": "Too many requests; current limit is %d request weight per 1 MINUTE." % fake.weights.limit}, headers)
+            if fake.error_rate and fake.random.random() < fake.error_rate:
+                fake.count("errors")
+                return self.send_json(503, {"code": -1001, "msg": "Internal error; unable to process your request. Please try again."}, headers)
+            try:
+                status, body = fake.handle(url.path, query)
+            except (ValueError, KeyError) as e:
+                status, body = 400, {"code": -1100, "msg": f"Illegal characters found in a parameter: {e}"}
+            self.send_json(status, body, headers)
+
+        def stream(self, path: str, query: dict):
+            """WebSocket /ws/<stream>[/<stream>...] (raw events) or /stream?streams=a/b (wrapped)."""
+            combined = path.startswith("/stream")
+            streams = (query.get("streams", "") if combined else path[len("/ws/"):]).split("/")
+            streams = [s for s in streams if s]
+            key = self.headers.get("Sec-WebSocket-Key", "")
+            accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+            self.send_response(101, "Switching Protocols")
+            self.send_header("Upgrade", "websocket")
+            self.send_header("Connection", "Upgrade")
+            self.send_header("Sec-WebSocket-Accept", accept)
+            self.end_headers()
+            self.wfile.flush()
+            fake.count("streams")
+
+            last_open = {}
+            try:
+                while True:
+                    for stream, event in fake.stream_events(streams, last_open):
+                        payload = {"stream": stream, "data": event} if combined else event
+                        self.wfile.write(ws_frame(json.dumps(payload, separators=(",", ":")).encode()))
+                    self.wfile.flush()
+                    readable, _, _ = select.select([self.connection], [], [], STREAM_INTERVAL)
+                    if readable:
+                        frame = self.connection.recv(2)
+                        if not frame or frame[0] & 0x0F == 0x8:  # closed, or a close frame
+                            break
+                        self.connection.recv(65536)  # ping/pong or anything else: ignored
+            except (BrokenPipeError, ConnectionResetError, OSError):
+                pass
+            self.close_connection = True
+
+    return Handler
+
+
+def ws_frame(payload: bytes) -> bytes:
+    """Unmasked server-to-client text frame."""
+    n = len(payload)
+    if n < 126:
+        header = bytes([0x81, n])
+    elif n < 65536:
+        header = bytes([0x81, 126]) + n.to_bytes(2, "big")
+    else:
+        header = bytes([0x81, 127]) + n.to_bytes(8, "big")
+    return header + payload
+
+
+# =====================
+# SETUP
+# =====================
+def build_markets(symbols: int = SYMBOLS, store_timeframe: str = None, csv: list = (), seed: int = SEED) -> dict:
+    """Recorded markets from the candle store / CSV exports, topped up with synthetic ones."""
+    step_ms = timeframe_ms(BASE_TIMEFRAME)
+    markets = {}
+    if store_timeframe:
+        for coin in stored_coins(store_timeframe):
+            candles = load_candles(coin, store_timeframe)
+            markets[coin + QUOTE] = Market(coin + QUOTE, timeframe_ms(store_timeframe), candles)
+    for spec in csv:
+        path, _, coin = spec.rpartition(":")
+        candles = load_csv(path)
+        step = int(np.median(np.diff(candles["timestamp"]))) if len(candles["timestamp"]) > 1 else step_ms
+        markets[coin.upper() + QUOTE] = Market(coin.upper() + QUOTE, step, candles)
+
+    start_ms = int(START_DATE.timestamp() * 1000)
+    names = COINS + [f"C{i:03d}" for i in range(symbols)]
+    for coin in names:
+        if len(markets) >= symbols:
+            break
+        markets.setdefault(coin + QUOTE, Market(coin + QUOTE, step_ms, start_ms=start_ms, seed=seed))
+    return markets
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for Binance's public REST API and kline/ticker streams")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--symbols", type=int, default=SYMBOLS, help="total markets; synthetic ones fill up after recorded ones")
+    parser.add_argument("--store", metavar="TIMEFRAME", help="serve every coin in the candle store for this timeframe")
+    parser.add_argument("--csv", action="append", default=[], metavar="PATH:COIN", help="serve an exported candles CSV as COIN")
+    parser.add_argument("--at", help="ISO time (UTC) the server clock starts at, e.g. inside recorded data")
+    parser.add_argument("--latency", type=float, default=LATENCY_MS, help="ms added to every REST response")
+    parser.add_argument("--jitter", type=float, default=JITTER_MS, help="extra uniform 0..N ms")
+    parser.add_argument("--error-rate", type=float, default=ERROR_RATE, help="share of REST requests failing with 503")
+    parser.add_argument("--weight-limit", type=int, default=WEIGHT_LIMIT, help="request weight per minute before 429s (0: none)")
+    parser.add_argument("--seed", type=int, default=SEED)
+    args = parser.parse_args()
+
+    clock = time.time
+    if args.at:
+        offset = datetime.fromisoformat(args.at).replace(tzinfo=timezone.utc).timestamp() - time.time()
+        clock = lambda: time.time() + offset
+
+    markets = build_markets(args.symbols, args.store, args.csv, args.seed)
+    fake = FakeBinance(markets, clock, args.latency, args.jitter, args.error_rate, args.weight_limit, args.seed)
+    fake.serve(args.port)
+    print(f"[{datetime.now()}] Fake Binance on http://127.0.0.1:{args.port} ({len(markets)} markets, latency {args.latency}+{args.jitter}ms, errors {args.error_rate:.1%}, weight limit {args.weight_limit}/min)")
+    print(f"[{datetime.now()}] Streams: ws://127.0.0.1:{args.port}/ws/<symbol>@kline_15m or /stream?streams=a/b; counters on /fake/stats")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
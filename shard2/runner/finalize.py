@@ -0,0 +1,138 @@
+# =====================
+# IMPORTS
+# =====================
+import json
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import requests
+
+from scheduler import ServerClock, parse_every
+
+# =====================
+# PARAMETERS
+# =====================
+FIRST_POLL_QUANTILE = 0.1    # first poll at this quantile of observed delays...
+FIRST_POLL_LEAD = 0.5        # ...minus this many seconds, so the estimate can also move down
+POLL_BACKOFF = [0.25, 0.25, 0.5, 0.5, 1, 1, 2, 2, 4]  # seconds between polls, last one repeats
+MAX_WAIT = 60                # give up waiting and go ahead this long after the boundary
+HISTORY = 500                # finalization delays kept for the distribution
+STATS_DIR = Path(__file__).resolve().parent / "data"
+
+
+class FinalizationStats:
+    """Recent delays (ms after the boundary, server time) until a closed candle was served."""
+
+    def __init__(self, path=None, history: int = HISTORY):
+        self.path = Path(path) if path else None
+        self.delays = deque(maxlen=history)
+        self.late = 0  # waits that hit MAX_WAIT
+        if self.path and self.path.exists():
+            try:
+                data = json.loads(self.path.read_text())
+                self.delays.extend(data.get("delays_ms", []))
+                self.late = data.get("late", 0)
+            except Exception as e:
+                print(f"[{datetime.now()}] Ignoring unreadable {self.path.name}: {e}")
+
+    def add(self, delay_ms: float, final: bool = True):
+        if final:
+            self.delays.append(round(delay_ms))
+        else:
+            self.late += 1
+        if self.path:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_text(json.dumps({"delays_ms": list(self.delays), "late": self.late, "summary": self.summary()}))
+
+    def quantile(self, q: float, default: float = 0.0) -> float:
+        return float(np.quantile(self.delays, q)) if self.delays else default
+
+    def summary(self) -> dict:
+        if not self.delays:
+            return {"count": 0, "late": self.late}
+        arr = np.asarray(self.delays, dtype=np.float64)
+        return {
+            "count": len(arr),
+            "late": self.late,
+            "min_ms": float(arr.min()),
+            "p50_ms": float(np.percentile(arr, 50)),
+            "p90_ms": float(np.percentile(arr, 90)),
+            "p99_ms": float(np.percentile(arr, 99)),
+            "max_ms": float(arr.max()),
+        }
+
+
+def ccxt_closed_probe(exchange, symbol: str, timeframe: str):
+    """probe(boundary_ms) for a ccxt exchange: True once the candle opening at the boundary is served.
+
+    Binance only starts the next kline after closing the previous one, so
+    its presence means the candle ending at the boundary is final.
+    """
+    tf_ms = exchange.parse_timeframe(timeframe) * 1000
+
+    def probe(boundary_ms: int) -> bool:
+        rows = exchange.fetch_ohlcv(symbol, timeframe=timeframe, since=boundary_ms - tf_ms, limit=2)
+        return any(row[0] >= boundary_ms for row in rows)
+
+    return probe
+
+
+def rest_closed_probe(klines_url: str, symbol: str, interval: str):
+    """Same probe over a Binance REST klines endpoint (/api/v3/klines, /fapi/v1/klines)."""
+    tf_ms = parse_every(interval)
+
+    def probe(boundary_ms: int) -> bool:
+        resp = requests.get(klines_url, params={"symbol": symbol, "interval": interval, "startTime": boundary_ms - tf_ms, "limit": 2}, timeout=5)
+        resp.raise_for_status()
+        return any(row[0] >= boundary_ms for row in resp.json())
+
+    return probe
+
+
+class CandleCloseWaiter:
+    """Sleep until the next candle boundary and return as soon as the closed candle is served.
+
+    Replaces a fixed SAFETY_DELAY: polling starts at a low quantile of the
+    delays seen so far and backs off briefly; observed delays are added to
+    the distribution.
+    """
+
+    def __init__(self, clock: ServerClock, probe, timeframe_ms: int, stats: FinalizationStats = None,
+                 max_wait: float = MAX_WAIT, sleep=time.sleep):
+        self.clock = clock
+        self.probe = probe
+        self.timeframe_ms = timeframe_ms
+        self.stats = stats or FinalizationStats()
+        self.max_wait = max_wait
+        self.sleep = sleep
+
+    def next_boundary(self) -> int:
+        return (self.clock.now_ms() // self.timeframe_ms + 1) * self.timeframe_ms
+
+    def wait(self, boundary_ms: int = None) -> dict:
+        """Block until the candle ending at `boundary_ms` (default: the next one) is final."""
+        boundary_ms = boundary_ms or self.next_boundary()
+        first_poll = max(self.stats.quantile(FIRST_POLL_QUANTILE) - FIRST_POLL_LEAD * 1000, 0)
+        self.sleep(max(boundary_ms + first_poll - self.clock.now_ms(), 0) / 1000)
+
+        polls = 0
+        final = False
+        while True:
+            polls += 1
+            # Measured at the request, not the reply: the candle was final by then
+            delay_ms = self.clock.now_ms() - boundary_ms
+            try:
+                final = self.probe(boundary_ms)
+            except Exception as e:
+                print(f"[{datetime.now()}] Candle close probe failed: {e}")
+            if final or delay_ms >= self.max_wait * 1000:
+                break
+            self.sleep(POLL_BACKOFF[min(polls - 1, len(POLL_BACKOFF) - 1)])
+
+        # A first poll that came late (e.g. after a stall) only bounds the delay from above
+        if polls > 1 or not final or delay_ms <= first_poll + POLL_BACKOFF[0] * 1000:
+            self.stats.add(delay_ms, final)
+        return {"boundary_ms": boundary_ms, "delay_ms": delay_ms, "polls": polls, "final": final}
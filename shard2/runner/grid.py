@@ -0,0 +1,135 @@
+# =====================
+# IMPORTS
+# =====================
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from itertools import product
+from pathlib import Path
+
+from backtest import backtest, STRATEGIES
+from candle_store import load_candles, stored_coins, store_path
+
+# =====================
+# PARAMETERS
+# =====================
+GRID_DIR = Path(__file__).resolve().parent / "data" / "grid"
+RESULTS_PATH = GRID_DIR / "results.jsonl"
+
+CUP_SIZES = [1.0, 1.5, 2.0, 2.5, 3.0, 4.0]
+TIMEFRAMES = ["15m"]
+
+# Per-worker cache of read-only memory-mapped candle columns
+_mapped = {}
+
+
+def _candles(coin: str, timeframe: str) -> dict:
+    # Store files are memory-mapped read-only, so workers share the page cache
+    # instead of receiving pickled candle arrays.
+    key = (coin, timeframe)
+    if key not in _mapped:
+        _mapped[key] = load_candles(coin, timeframe)
+    return _mapped[key]
+
+
+def run_job(job: tuple) -> dict:
+    coin, timeframe, cup_size, strategy = job
+    start = time.perf_counter()
+    result = backtest(_candles(coin, timeframe), strategy, cup_size, coin)
+    row = {"coin": coin, "timeframe": timeframe, "cupSize": cup_size, "strategy": strategy}
+    row.update(result["summary"])
+    row["seconds"] = time.perf_counter() - start
+    return row
+
+
+def job_key(job) -> tuple:
+    if isinstance(job, dict):
+        return (job["coin"], job["timeframe"], float(job["cupSize"]), job["strategy"])
+    return (job[0], job[1], float(job[2]), job[3])
+
+
+def load_results(path: Path = RESULTS_PATH) -> list:
+    if not path.exists():
+        return []
+    rows = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                rows.append(json.loads(line))
+    return rows
+
+
+def run_grid(coins: list, timeframes: list, cup_sizes: list, strategies: list, workers: int = None, path: Path = RESULTS_PATH) -> list:
+    """Run every grid combination not already in the results file.
+
+    Finished rows are appended to the results file as they arrive, so an
+    interrupted run picks up where it stopped.
+    """
+    pairs = [(coin, tf) for coin, tf in product(coins, timeframes) if store_path(coin, tf).exists()]
+    done = {job_key(r) for r in load_results(path)}
+    jobs = [
+        (coin, tf, float(size), strategy)
+        for (coin, tf), size, strategy in product(pairs, cup_sizes, strategies)
+        if job_key((coin, tf, size, strategy)) not in done
+    ]
+    print(f"[{datetime.now()}] Grid: {len(pairs)} coin/timeframe sets, {len(jobs)} jobs to run, {len(done)} already done")
+    if not jobs:
+        return load_results(path)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    start = time.time()
+    with open(path, "a") as out, ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = [pool.submit(run_job, job) for job in jobs]
+        for i, future in enumerate(as_completed(futures), start=1):
+            try:
+                row = future.result()
+            except Exception as e:
+                print(f"[{datetime.now()}] Grid job failed: {e}")
+                continue
+            out.write(json.dumps(row) + "\n")
+            out.flush()
+            if i % 100 == 0:
+                print(f"[{datetime.now()}] Grid: {i}/{len(jobs)} jobs ({time.time() - start:.1f}s)")
+
+    print(f"[{datetime.now()}] Grid finished {len(jobs)} jobs in {time.time() - start:.1f}s")
+    return load_results(path)
+
+
+def report(rows: list, top: int = 20, min_trades: int = 10, by: str = "totalPnl") -> list:
+    ranked = sorted((r for r in rows if r["tradeCount"] >= min_trades), key=lambda r: r[by], reverse=True)
+    print(f"{'coin':<10}{'tf':<6}{'cup':>6}{'strategy':>10}{'trades':>8}{'win%':>8}{'pnl':>10}{'fees':>9}{'maxDD':>9}")
+    for r in ranked[:top]:
+        print(
+            f"{r['coin']:<10}{r['timeframe']:<6}{r['cupSize']:>6.2f}{r['strategy']:>10}{r['tradeCount']:>8}"
+            f"{r['winRate']:>8.1f}{r['totalPnl']:>10.2f}{r['totalFees']:>9.2f}{r['maxDrawdown']:>9.2f}"
+        )
+    return ranked
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parameter grid over coins x cup sizes x timeframes")
+    parser.add_argument("coins", nargs="*", help="defaults to every coin in the candle store")
+    parser.add_argument("--timeframes", nargs="+", default=TIMEFRAMES)
+    parser.add_argument("--cup-sizes", nargs="+", type=float, default=CUP_SIZES)
+    parser.add_argument("--strategies", nargs="+", choices=sorted(STRATEGIES), default=sorted(STRATEGIES))
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--results", type=Path, default=RESULTS_PATH)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--min-trades", type=int, default=10)
+    parser.add_argument("--report-only", action="store_true")
+    args = parser.parse_args()
+
+    if args.report_only:
+        rows = load_results(args.results)
+    else:
+        coins = args.coins or sorted({c for tf in args.timeframes for c in stored_coins(tf)})
+        rows = run_grid(coins, args.timeframes, args.cup_sizes, args.strategies, args.workers, args.results)
+    report(rows, args.top, args.min_trades)
+
+
+if __name__ == "__main__":
+    main()
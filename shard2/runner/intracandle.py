@@ -0,0 +1,102 @@
+# =====================
+# IMPORTS
+# =====================
+import json
+import threading
+
+
+# =====================
+# PARAMETERS
+# =====================
+TICKER_URL = "https://api.binance.com/api/v3/ticker/price"
+TICK_INTERVAL = 1.0   # seconds between price polls (one request for all coins, weight 4)
+DEBOUNCE_TICKS = 3    # condition must hold on this many consecutive ticks...
+DEBOUNCE_MS = 2000    # ...spanning at least this long before a close fires
+
+
+class IntraCandleExit:
+    """Incomplete-cup close rule of bot_cross.py evaluated on every price tick.
+
+    At each cycle the runner arms a coin with its cup builder over closed
+    candles, the open candle's start/open and the cup that will be
+    `last_cup` at the next cycle. Each tick replays only the open candle
+    (open -> tick price) on a copy of that builder, which gives the fill and
+    cup open the next cycle would see if the candle closed at this price.
+    When the tick price itself completes a cup, that cup replaces the armed
+    `last_cup`, since the forming cup's open then belongs to the one after it.
+    A close is signalled once the condition has held for
+    DEBOUNCE_TICKS ticks over DEBOUNCE_MS, and only once per arming.
+    """
+
+    def __init__(self, timeframe_ms: int, debounce_ticks: int = DEBOUNCE_TICKS, debounce_ms: int = DEBOUNCE_MS):
+        self.timeframe_ms = timeframe_ms
+        self.debounce_ticks = debounce_ticks
+        self.debounce_ms = debounce_ms
+        self.armed = {}    # coin -> (builder, candle_ts, candle_open, last_cup, symbol)
+        self.pending = {}  # coin -> (action, first tick ms, ticks seen)
+        self.lock = threading.Lock()
+
+    def arm(self, coin: str, symbol: str, builder, candle_ts: int, candle_open: float, last_cup: dict):
+        with self.lock:
+            self.armed[coin] = (builder.copy(), candle_ts, candle_open, last_cup, symbol)
+            self.pending.pop(coin, None)
+
+    def disarm(self, coin: str):
+        with self.lock:
+            self.armed.pop(coin, None)
+            self.pending.pop(coin, None)
+
+    def symbols(self) -> dict:
+        """Exchange symbol (e.g. ZECUSDT) -> coin for every armed coin."""
+        with self.lock:
+            return {armed[4]: coin for coin, armed in self.armed.items()}
+
+    def condition(self, coin: str, price: float, state: str):
+        """The close this price would trigger right now ("CloseShort"/"CloseLong"), or None."""
+        builder, candle_ts, candle_open, last_cup, _ = self.armed[coin]
+        if state not in ("long", "short"):
+            return None
+        forming = builder.copy()
+        completed = forming.feed([candle_ts], [candle_open], [price])
+        if len(completed):
+            last_cup = {"fill": float(completed["fill"][-1]), "close": float(completed["close"][-1])}
+        if last_cup is None or forming.fill == 0 or forming.open is None:
+            return None
+        if forming.fill > 0 and state == "short" and last_cup["fill"] > 0 and forming.open < last_cup["close"]:
+            return "CloseShort"
+        if forming.fill < 0 and state == "long" and last_cup["fill"] < 0 and forming.open > last_cup["close"]:
+            return "CloseLong"
+        return None
+
+    def on_tick(self, coin: str, price: float, ts_ms: int, state: str):
+        """Feed one price; returns the close to fire once it has held long enough, else None."""
+        with self.lock:
+            if coin not in self.armed:
+                return None
+            if ts_ms >= self.armed[coin][1] + self.timeframe_ms:
+                # Candle has closed; wait for the next cycle to re-arm
+                self.pending.pop(coin, None)
+                return None
+            action = self.condition(coin, price, state)
+            first = self.pending.get(coin)
+            if action is None:
+                self.pending.pop(coin, None)
+                return None
+            if first is None or first[0] != action:
+                self.pending[coin] = (action, ts_ms, 1)
+                first = self.pending[coin]
+            else:
+                first = self.pending[coin] = (action, first[1], first[2] + 1)
+            if first[2] >= self.debounce_ticks and ts_ms - first[1] >= self.debounce_ms:
+                # Fire once; the next cycle re-arms the coin
+                del self.armed[coin]
+                self.pending.pop(coin, None)
+                return action
+            return None
+
+
+def fetch_prices(session, symbols: list, url: str = TICKER_URL) -> dict:
+    """Latest trade price for many spot symbols in one /ticker/price request."""
+    resp = session.get(url, params={"symbols": json.dumps(symbols, separators=(",", ":"))}, timeout=5)
+    resp.raise_for_status()
+    return {row["symbol"]: float(row["price"]) for row in resp.json()}
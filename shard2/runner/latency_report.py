@@ -0,0 +1,108 @@
+# =====================
+# IMPORTS
+# =====================
+import numpy as np
+import argparse
+import json
+from collections import defaultdict
+from pathlib import Path
+
+from finalize import STATS_DIR
+
+# =====================
+# PARAMETERS
+# =====================
+BOT_TRACES = str(STATS_DIR / "traces_*.jsonl")
+API_TRACES = Path(__file__).resolve().parent.parent / "api" / "trace.jsonl"
+
+# Latency segments, each measured from the order's trigger (candle close, or
+# the price tick for intra-candle closes) to the named point
+SEGMENTS = {
+    "decided": ("bot", "decided_ms"),     # decision made, order about to be built
+    "sent": ("bot", "sent_ms"),           # POST /manage leaving the bot
+    "api_received": ("api", "received"),  # trade server picked the request up
+    "api_acked": ("api", "acked"),        # trade server answered
+    "bot_acked": ("bot", "acked_ms"),     # answer back in the bot
+    "fanout_done": ("api", "fanout_done"),  # every subscriber settled
+}
+
+
+def read_jsonl(paths) -> list:
+    rows = []
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        rows.append(json.loads(line))
+                    except ValueError:
+                        continue  # partially written last line
+    return rows
+
+
+def join_traces(bot_rows: list, api_rows: list) -> list:
+    """One record per trace id: the bot's record plus the latest timestamp of each API hop."""
+    hops = defaultdict(dict)
+    for row in api_rows:
+        hop = hops[row["trace"]]
+        hop[row["hop"]] = max(hop.get(row["hop"], 0), row["ts"])
+    return [{**row, "api": hops.get(row["trace"], {})} for row in bot_rows]
+
+
+def summarize(traces: list, trigger: str = "candle") -> dict:
+    """Percentiles (ms after the trigger) per strategy table and segment."""
+    samples = defaultdict(lambda: defaultdict(list))
+    for t in traces:
+        if t.get("trigger", "candle") != trigger or t.get("trigger_ms") is None:
+            continue
+        # The trigger is exchange time, the hops are local (bot and trade server host) time
+        trigger_local = t["trigger_ms"] - t.get("clock_offset_ms", 0)
+        for segment, (side, key) in SEGMENTS.items():
+            ts = t.get(key) if side == "bot" else t["api"].get(key)
+            if ts is not None:
+                samples[t["table"]][segment].append(ts - trigger_local)
+
+    report = {}
+    for table, segments in sorted(samples.items()):
+        report[table] = {}
+        for segment in SEGMENTS:
+            if not segments.get(segment):
+                continue
+            arr = np.asarray(segments[segment], dtype=np.float64)
+            report[table][segment] = {
+                "count": int(arr.size),
+                "p50_ms": float(np.percentile(arr, 50)),
+                "p90_ms": float(np.percentile(arr, 90)),
+                "p99_ms": float(np.percentile(arr, 99)),
+                "max_ms": float(arr.max()),
+            }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end order latency from candle close to trade-server acknowledgement")
+    parser.add_argument("--bot-traces", nargs="*", help=f"runner trace logs (default {BOT_TRACES})")
+    parser.add_argument("--api-log", default=str(API_TRACES), help="trade server trace log (TRACE_LOG)")
+    parser.add_argument("--trigger", choices=("candle", "tick"), default="candle", help="orders from candle closes or intra-candle ticks")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    bot_paths = [Path(p) for p in args.bot_traces] if args.bot_traces else sorted(STATS_DIR.glob("traces_*.jsonl"))
+    api_path = Path(args.api_log)
+    traces = join_traces(read_jsonl(bot_paths), read_jsonl([api_path] if api_path.exists() else []))
+    report = summarize(traces, args.trigger)
+
+    print(f"{len(traces)} traces from {len(bot_paths)} runner log(s){'' if api_path.exists() else ', no API log'}; ms after {args.trigger} trigger")
+    for table, segments in report.items():
+        print(f"  {table}")
+        print(f"    {'segment':<14}{'count':>7}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}")
+        for segment, s in segments.items():
+            print(f"    {segment:<14}{s['count']:>7}{s['p50_ms']:>10.0f}{s['p90_ms']:>10.0f}{s['p99_ms']:>10.0f}{s['max_ms']:>10.0f}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+# =====================
+# IMPORTS
+# =====================
+import numpy as np
+import argparse
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import requests
+
+from fake_binance import COINS as NAMED_COINS
+from tracing import Tracer
+
+# =====================
+# PARAMETERS
+# =====================
+BOTS = 4                 # runner processes, one strategy table each
+COINS_PER_BOT = 20
+CYCLES = 4               # candle boundaries to simulate
+INTERVAL = 10.0          # seconds between boundaries (a compressed quarter-hour)
+WAKE_JITTER_MS = 250     # bots wake up uniformly 0..N ms after the boundary
+WORKERS_PER_BOT = 1      # 1: coins one after another, like the runners' loops
+ACTION_RATE = 0.3        # share of coin checks that end in a /manage call
+POSITION_SIZE = 100
+TIMEOUT = 5              # the runners' requests timeout
+SEED = 1
+
+
+# =====================
+# SIMULATED BOT
+# =====================
+class Bot:
+    """One runner's boundary work: two position checks per coin, then maybe a /manage action.
+
+    Actions follow the open/closed state the checks report, so the server
+    sees the same mix of opens, handoffs, closes and Extras a runner sends,
+    including the 400 for a side that is already open when checks race.
+    """
+
+    def __init__(self, table: str, coins: list, base_url: str, results, action_rate: float = ACTION_RATE,
+                 keep_alive: bool = False, trace_dir: Path = None, seed: int = SEED):
+        self.table = table
+        self.coins = coins
+        self.base_url = base_url.rstrip("/")
+        self.results = results
+        self.action_rate = action_rate
+        self.http = requests.Session() if keep_alive else requests
+        self.tracer = Tracer(table, trace_dir / f"traces_{table}.jsonl" if trace_dir else None)
+        self.random = random.Random(f"{seed}-{table}")
+
+    def call(self, route: str, boundary: float, method: str, url: str, **kwargs):
+        sent = time.time()
+        try:
+            resp = self.http.request(method, url, timeout=TIMEOUT, **kwargs)
+            status, body = resp.status_code, resp
+        except requests.RequestException as e:
+            status, body = type(e).__name__, None
+        done = time.time()
+        self.results.add(route, boundary, sent, done, status)
+        return status, body
+
+    def count(self, coin: str, side: str, boundary: float) -> int:
+        params = {"coinName": coin, "positionSide": side, "status": "open", "tableName": self.table}
+        status, resp = self.call("positioncount", boundary, "GET", f"{self.base_url}/positioncount", params=params)
+        if status != 200:
+            return 0
+        return resp.json().get("count", 0)
+
+    def pick_action(self, long_open: bool, short_open: bool):
+        if self.random.random() >= self.action_rate:
+            return None
+        if not long_open and not short_open:
+            return self.random.choice(("Long", "Short"))
+        side = "Long" if long_open else "Short"
+        return self.random.choice((f"Close{side}", "Short" if side == "Long" else "Long", "Extra"))
+
+    def coin_cycle(self, coin: str, boundary: float):
+        long_open = self.count(coin, "Long", boundary) > 0
+        short_open = self.count(coin, "Short", boundary) > 0
+        action = self.pick_action(long_open, short_open)
+        if action is None:
+            return
+        trace = self.tracer.start(coin, action)
+        status, _ = self.call(
+            f"manage:{action}", boundary, "POST", f"{self.base_url}/manage/{coin}",
+            json={"Action": action, "positionSize": POSITION_SIZE}, params={"tableName": self.table},
+            headers=trace.headers(),
+        )
+        trace.done(status)
+
+    def run_cycle(self, boundary: float, jitter_ms: float, workers: int):
+        time.sleep(max(0.0, boundary + self.random.uniform(0, jitter_ms) / 1000 - time.time()))
+        self.tracer.candle_close_ms = int(boundary * 1000)
+        if workers <= 1:
+            for coin in self.coins:
+                self.coin_cycle(coin, boundary)
+        else:
+            with ThreadPoolExecutor(workers) as pool:
+                list(pool.map(lambda coin: self.coin_cycle(coin, boundary), self.coins))
+
+
+# =====================
+# RESULTS
+# =====================
+class Results:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rows = []  # (route, boundary, sent, done, status)
+
+    def add(self, route: str, boundary: float, sent: float, done: float, status):
+        with self.lock:
+            self.rows.append((route, boundary, sent, done, status))
+
+    def summary(self) -> dict:
+        """Latency per route, and how long each boundary's herd took to drain."""
+        by_route = defaultdict(list)
+        statuses = defaultdict(lambda: defaultdict(int))
+        herds = defaultdict(list)
+        for route, boundary, sent, done, status in self.rows:
+            by_route[route].append((done - sent) * 1000)
+            statuses[route][str(status)] += 1
+            herds[boundary].append((sent, done))
+
+        routes = {}
+        for route, samples in sorted(by_route.items()):
+            arr = np.asarray(samples, dtype=np.float64)
+            routes[route] = {
+                "count": int(arr.size),
+                "p50_ms": float(np.percentile(arr, 50)),
+                "p90_ms": float(np.percentile(arr, 90)),
+                "p99_ms": float(np.percentile(arr, 99)),
+                "max_ms": float(arr.max()),
+                "status": dict(statuses[route]),
+            }
+
+        cycles = []
+        for boundary, calls in sorted(herds.items()):
+            done = np.asarray([d for _, d in calls]) - boundary
+            sent = np.asarray([s for s, _ in calls])
+            per_second = np.bincount((sent - sent.min()).astype(np.int64)) if len(sent) else np.zeros(1)
+            cycles.append({
+                "requests": len(calls),
+                "drain_ms": float(done.max() * 1000),  # boundary to the last answer
+                "p50_done_ms": float(np.percentile(done, 50) * 1000),
+                "peak_rps": int(per_second.max()),
+            })
+
+        total = len(self.rows)
+        busy = sum(c["drain_ms"] for c in cycles) / 1000
+        return {"requests": total, "throughput_rps": total / busy if busy else 0.0, "routes": routes, "cycles": cycles}
+
+
+# =====================
+# MAIN
+# =====================
+def coin_names(n: int) -> list:
+    return (NAMED_COINS + [f"C{i:03d}" for i in range(n)])[:n]
+
+
+def run_load(base_url: str, bots: int = BOTS, coins_per_bot: int = COINS_PER_BOT, cycles: int = CYCLES,
+             interval: float = INTERVAL, wake_jitter_ms: float = WAKE_JITTER_MS, workers: int = WORKERS_PER_BOT,
+             action_rate: float = ACTION_RATE, keep_alive: bool = False, trace_dir: Path = None, seed: int = SEED) -> dict:
+    """Every bot works through its coins at each boundary, all bots at once."""
+    results = Results()
+    coins = coin_names(coins_per_bot)
+    fleet = [Bot(f"load{i}", coins, base_url, results, action_rate, keep_alive, trace_dir, seed) for i in range(bots)]
+    first = time.time() + 1.0
+    for k in range(cycles):
+        boundary = first + k * interval
+        threads = [threading.Thread(target=bot.run_cycle, args=(boundary, wake_jitter_ms, workers)) for bot in fleet]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        late = time.time() - (boundary + interval)
+        if late > 0 and k + 1 < cycles:
+            print(f"[{datetime.now()}] Boundary {k + 1} still draining {late:.1f}s into the next one")
+    return results.summary()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Candle-boundary load on the trade server: N bots x M coins checking positions and posting /manage at once")
+    parser.add_argument("--base-url", help="trade server to load (default: an in-process trade_server.py stand-in)")
+    parser.add_argument("--bots", type=int, default=BOTS)
+    parser.add_argument("--coins", type=int, default=COINS_PER_BOT, help="coins per bot")
+    parser.add_argument("--cycles", type=int, default=CYCLES)
+    parser.add_argument("--interval", type=float, default=INTERVAL, help="seconds between boundaries")
+    parser.add_argument("--wake-jitter", type=float, default=WAKE_JITTER_MS, help="ms spread of bot wake-ups after a boundary")
+    parser.add_argument("--workers", type=int, default=WORKERS_PER_BOT, help="concurrent coins per bot")
+    parser.add_argument("--action-rate", type=float, default=ACTION_RATE, help="share of coin checks that post /manage")
+    parser.add_argument("--keep-alive", action="store_true", help="one pooled session per bot (runners open a connection per call)")
+    parser.add_argument("--upstream", type=float, default=0, help="stand-in only: ms per modelled Binance call")
+    parser.add_argument("--traces", help="write each bot's /manage traces here for latency_report.py")
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("--seed", type=int, default=SEED)
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        from trade_server import TradeServer, PositionStore
+        server = TradeServer(PositionStore(), upstream_ms=args.upstream, seed=args.seed)
+        base_url = f"http://127.0.0.1:{server.serve(0).server_port}"
+
+    trace_dir = Path(args.traces) if args.traces else None
+    print(f"[{datetime.now()}] {args.bots} bots x {args.coins} coins, {args.cycles} boundaries {args.interval}s apart -> {base_url}")
+    report = run_load(base_url, args.bots, args.coins, args.cycles, args.interval, args.wake_jitter, args.workers,
+                      args.action_rate, args.keep_alive, trace_dir, args.seed)
+    if server is not None:
+        report["server"] = server.stats()
+
+    print(f"{report['requests']} requests, {report['throughput_rps']:.0f}/s while draining")
+    print(f"  {'route':<18}{'count':>7}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}  status")
+    for route, r in report["routes"].items():
+        print(f"  {route:<18}{r['count']:>7}{r['p50_ms']:>9.1f}{r['p90_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['max_ms']:>9.1f}  {r['status']}")
+    print(f"  {'boundary':<18}{'requests':>9}{'drain ms':>10}{'p50 done':>10}{'peak/s':>8}")
+    for k, c in enumerate(report["cycles"], 1):
+        print(f"  {k:<18}{c['requests']:>9}{c['drain_ms']:>10.0f}{c['p50_done_ms']:>10.0f}{c['peak_rps']:>8}")
+    if server is not None:
+        print(f"  server side: peak {report['server']['peak_in_flight']} in flight; " + ", ".join(
+            f"{route} p99 {s['p99_ms']:.1f}ms" for route, s in report["server"]["routes"].items()))
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+# =====================
+# IMPORTS
+# =====================
+import bisect
+import threading
+import time
+from functools import wraps
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# =====================
+# PARAMETERS
+# =====================
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)  # seconds
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{str(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Timer:
+    """Observes the time from creation to stop() (or the end of a with block) once."""
+
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram, labels: dict):
+        self.histogram = histogram
+        self.labels = labels
+        self.started = time.perf_counter()
+
+    def stop(self) -> float:
+        elapsed = time.perf_counter() - self.started
+        if self.histogram is not None:
+            self.histogram.observe(elapsed, **self.labels)
+            self.histogram = None
+        return elapsed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, in Prometheus' layout."""
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = STAGE_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.series = {}  # label values -> [bucket counts..., sum, count]
+        self.lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels[n] for n in self.label_names)
+        i = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            row = self.series.get(key)
+            if row is None:
+                row = self.series[key] = [0] * (len(self.buckets) + 2)
+            if i < len(self.buckets):
+                row[i] += 1
+            row[-2] += value
+            row[-1] += 1
+
+    def timer(self, **labels) -> Timer:
+        return Timer(self, labels)
+
+    def timed(self, stage: str):
+        """Decorator for functions taking the coin first: times each call as `stage`."""
+        def decorate(fn):
+            @wraps(fn)
+            def wrapper(coin, *args, **kwargs):
+                with self.timer(coin=coin, stage=stage):
+                    return fn(coin, *args, **kwargs)
+            return wrapper
+        return decorate
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            series = {key: list(row) for key, row in self.series.items()}
+        for key, row in sorted(series.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets, row):
+                cumulative += n
+                le = 'le="%g"' % bound
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_labels(self.label_names, key, le)} {row[-1]}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {row[-2]:.6f}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {row[-1]}")
+        return lines
+
+
+class Registry:
+    """Histograms plus gauge callbacks, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self.histograms = []
+        self.gauges = []  # (name, help, fn returning {label tuple or (): value}, label names)
+
+    def histogram(self, name: str, help: str, labels: tuple = (), buckets: tuple = STAGE_BUCKETS) -> Histogram:
+        h = Histogram(name, help, labels, buckets)
+        self.histograms.append(h)
+        return h
+
+    def gauge(self, name: str, help: str, fn, labels: tuple = ()):
+        """Gauge read from fn() at scrape time; fn returns {label values: value}."""
+        self.gauges.append((name, help, fn, tuple(labels)))
+
+    def render(self) -> str:
+        lines = []
+        for h in self.histograms:
+            lines.extend(h.render())
+        for name, help, fn, label_names in self.gauges:
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} gauge"]
+            try:
+                values = fn()
+            except Exception:
+                continue
+            for key, value in sorted(values.items()):
+                if value is not None:
+                    lines.append(f"{name}{_labels(label_names, key)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def scheduler_gauges(registry: Registry, scheduler, prefix: str = "bot"):
+    """Expose Scheduler.metrics(): next run, lateness and misses per job."""
+    def field(name):
+        return lambda: {(job,): m[name] for job, m in scheduler.metrics()["jobs"].items()}
+
+    registry.gauge(f"{prefix}_job_next_run_ms", "Next slot of each scheduled job (exchange ms)", field("next_run_ms"), ("job",))
+    registry.gauge(f"{prefix}_job_lateness_ms", "How late the last run started after its slot", field("last_lateness_ms"), ("job",))
+    registry.gauge(f"{prefix}_job_duration_ms", "Duration of the last run", field("last_duration_ms"), ("job",))
+    registry.gauge(f"{prefix}_job_runs", "Runs so far", field("runs"), ("job",))
+    registry.gauge(f"{prefix}_job_missed", "Slots skipped after overruns or stalls", field("missed"), ("job",))
+
+
+# =====================
+# HTTP
+# =====================
+def serve(registry: Registry, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """GET /metrics on a background thread."""
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_response(404)
+                self.end_headers()
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
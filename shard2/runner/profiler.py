@@ -0,0 +1,245 @@
+# =====================
+# IMPORTS
+# =====================
+import argparse
+import cProfile
+import os
+import pstats
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+# =====================
+# PARAMETERS
+# =====================
+PROFILE_DIR = Path(__file__).resolve().parent / "profiles"  # next to outputs/
+CYCLES = 3              # cycles captured per request
+MODE = "sample"         # "sample": collapsed stacks for flamegraphs; "cprofile": deterministic .prof
+SAMPLE_INTERVAL = 0.005  # seconds between stack samples
+SIGNAL = "SIGUSR1"      # `kill -USR1 <pid>` requests a capture (POSIX only; the request file works everywhere)
+
+
+def request_path(name: str, profile_dir: Path = PROFILE_DIR) -> Path:
+    """Touching this file (optionally containing "<cycles> [sample|cprofile]") requests a capture."""
+    return Path(profile_dir) / f"{name}.request"
+
+
+def frame_label(code) -> str:
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+class Sampler(threading.Thread):
+    """Samples one thread's stack every `interval` seconds, while `sampling` is set, into collapsed-stack counts."""
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.sampling = False
+        self.running = threading.Event()
+        self.running.set()
+
+    def run(self):
+        while self.running.is_set():
+            if not self.sampling:
+                time.sleep(self.interval)
+                continue
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(frame_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+            time.sleep(self.interval)
+
+    def stop(self) -> Counter:
+        self.running.clear()
+        self.join()
+        return self.stacks
+
+
+class CycleProfiler:
+    """Profiles the next K cycles of a long-running bot on request.
+
+        with profiler.cycle():
+            ...  # one scheduler cycle
+
+    A capture is requested by `request()`, by SIGNAL once install() has run,
+    or by the request file (see request_path; `python profiler.py <bot>`),
+    checked at each cycle start. Idle, a cycle costs one flag test and one
+    stat() of the request file. Captures land in PROFILE_DIR as
+    <bot>_<time>.collapsed (flamegraph.pl / speedscope input) or .prof.
+    """
+
+    def __init__(self, name: str, profile_dir: Path = PROFILE_DIR, log=None, interval: float = SAMPLE_INTERVAL):
+        self.name = name
+        self.profile_dir = Path(profile_dir)
+        self.request_file = request_path(name, self.profile_dir)
+        self.log = log
+        self.interval = interval
+        self.pending = None   # (cycles, mode) asked for, picked up at the next cycle start
+        self.remaining = 0
+        self.mode = MODE
+        self.capture = None   # Sampler or cProfile.Profile while capturing
+        self.cycle_seconds = []
+
+    def request(self, cycles: int = CYCLES, mode: str = MODE):
+        if mode not in ("sample", "cprofile"):
+            raise ValueError(f"Unknown profile mode: {mode}")
+        self.pending = (max(1, int(cycles)), mode)
+
+    def install(self, signal_name: str = SIGNAL):
+        """Request CYCLES sampled cycles on signal_name; skipped where the platform or thread can't."""
+        signum = getattr(signal, signal_name, None)
+        if signum is None:
+            return False
+        try:
+            signal.signal(signum, lambda *_: self.request())
+        except ValueError:  # not the main thread
+            return False
+        return True
+
+    def _read_request_file(self):
+        try:
+            text = self.request_file.read_text().split()
+            self.request_file.unlink()
+        except OSError:
+            return
+        try:
+            self.request(int(text[0]) if text else CYCLES, text[1] if len(text) > 1 else MODE)
+        except ValueError as e:
+            self._log("Ignoring profile request {path}: {error}", path=self.request_file, error=e)
+
+    def _log(self, msg: str, *args, **fields):
+        if self.log is not None:
+            self.log.info(msg, *args, **fields)
+
+    # =====================
+    # CYCLES
+    # =====================
+    def cycle(self):
+        if self.pending is None and self.remaining == 0 and self.request_file.exists():
+            self._read_request_file()
+        if self.pending is not None and self.remaining == 0:
+            self._start(*self.pending)
+            self.pending = None
+        return _Cycle(self) if self.remaining else _IDLE
+
+    def _start(self, cycles: int, mode: str):
+        self.remaining = cycles
+        self.mode = mode
+        self.cycle_seconds = []
+        if mode == "cprofile":
+            self.capture = cProfile.Profile()
+        else:
+            self.capture = Sampler(threading.get_ident(), self.interval)
+            self.capture.start()
+        self._log("Profiling the next {cycles} cycle(s) ({mode})", cycles=cycles, mode=mode)
+
+    def _finish(self) -> Path:
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        stem = self.profile_dir / f"{self.name}_{datetime.now():%Y%m%d_%H%M%S}"
+        if self.mode == "cprofile":
+            path = stem.with_suffix(".prof")
+            self.capture.dump_stats(path)
+        else:
+            stacks = self.capture.stop()
+            path = stem.with_suffix(".collapsed")
+            path.write_text("".join(f"{stack} {n}\n" for stack, n in sorted(stacks.items())))
+        self.capture = None
+        self._log("Profile of {cycles} cycle(s) ({}s) -> {path}", " / ".join(f"{s:.1f}" for s in self.cycle_seconds),
+                  cycles=len(self.cycle_seconds), path=path)
+        return path
+
+
+class _Cycle:
+    __slots__ = ("profiler", "started")
+
+    def __init__(self, profiler: CycleProfiler):
+        self.profiler = profiler
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        if self.profiler.mode == "cprofile":
+            self.profiler.capture.enable()
+        else:
+            self.profiler.capture.sampling = True
+        return self
+
+    def __exit__(self, *exc):
+        p = self.profiler
+        if p.mode == "cprofile":
+            p.capture.disable()
+        else:
+            p.capture.sampling = False
+        p.cycle_seconds.append(time.perf_counter() - self.started)
+        p.remaining -= 1
+        if p.remaining == 0:
+            p._finish()
+
+
+class _Idle:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_IDLE = _Idle()
+
+
+# =====================
+# CLI
+# =====================
+def top_frames(path: Path, n: int = 25) -> list:
+    """(self samples, total samples, frame) from a .collapsed file, by self time."""
+    own, total = Counter(), Counter()
+    for line in Path(path).read_text().splitlines():
+        stack, _, count = line.rpartition(" ")
+        frames = stack.split(";")
+        own[frames[-1]] += int(count)
+        for frame in set(frames):
+            total[frame] += int(count)
+    return [(count, total[frame], frame) for frame, count in own.most_common(n)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Request a profile of a running bot's next cycles, or summarize a capture")
+    parser.add_argument("bot", nargs="?", help="runner name, e.g. bot_cross (writes its request file)")
+    parser.add_argument("--cycles", type=int, default=CYCLES)
+    parser.add_argument("--mode", choices=("sample", "cprofile"), default=MODE)
+    parser.add_argument("--pid", type=int, help=f"send {SIGNAL} to this process instead (always {CYCLES} sampled cycles)")
+    parser.add_argument("--top", metavar="FILE", help="print the hottest frames of a .collapsed or .prof capture")
+    args = parser.parse_args()
+
+    if args.top:
+        if args.top.endswith(".prof"):
+            pstats.Stats(args.top).sort_stats("cumulative").print_stats(25)
+            return
+        print(f"{'self':>7}{'total':>7}  frame")
+        for own, total, frame in top_frames(Path(args.top)):
+            print(f"{own:>7}{total:>7}  {frame}")
+        return
+    if args.pid:
+        os.kill(args.pid, getattr(signal, SIGNAL))
+        print(f"[{datetime.now()}] Sent {SIGNAL} to {args.pid}; capture will appear in {PROFILE_DIR}")
+        return
+    if not args.bot:
+        parser.error("give a bot name, --pid or --top")
+    path = request_path(args.bot)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(f"{args.cycles} {args.mode}\n")
+    print(f"[{datetime.now()}] Requested {args.cycles} {args.mode} cycle(s) from {args.bot}; capture will appear in {PROFILE_DIR}")
+
+
+if __name__ == "__main__":
+    main()
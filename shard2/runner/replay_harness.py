@@ -0,0 +1,381 @@
+# =====================
+# IMPORTS
+# =====================
+import numpy as np
+import argparse
+import importlib
+import shutil
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+from pathlib import Path
+from urllib.parse import urlparse
+
+import ccxt
+
+import cups
+import scheduler
+from backtest import _close_trade, FEE_RATE
+from candle_store import load_candles, stored_coins
+
+# =====================
+# PARAMETERS
+# =====================
+BOT_MODULE = "bot_cross"
+REPLAY_DAYS = 7
+
+# Runner functions timed per call, grouped into cycle stages
+STAGES = {
+    "check_long_position_exists": "position_sync",
+    "check_short_position_exists": "position_sync",
+    "fetch_ohlcv_all": "candle_fetch",
+    "open_long_position": "order_post",
+    "open_short_position": "order_post",
+    "close_long_position": "order_post",
+    "close_short_position": "order_post",
+    "add_extra_to_position": "order_post",
+    "process_coin": "process_coin",
+}
+
+
+class ReplayFinished(BaseException):
+    """Raised from the virtual sleep once the replay window is exhausted.
+
+    BaseException so the runners' `except Exception` blocks don't swallow it.
+    """
+
+
+class VirtualClock:
+    """Stands in for the `time` module inside a runner: sleep() just advances."""
+
+    def __init__(self, start: datetime, end: datetime):
+        self.now_ts = start.timestamp()
+        self.end_ts = end.timestamp()
+        self.slept = 0.0
+
+    def time(self) -> float:
+        return self.now_ts
+
+    def sleep(self, seconds: float):
+        self.slept += max(seconds, 0)
+        self.now_ts += max(seconds, 0)
+        if self.now_ts >= self.end_ts:
+            raise ReplayFinished()
+
+    def datetime_class(self):
+        clock = self
+
+        class VirtualDatetime(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                dt = datetime.fromtimestamp(clock.now_ts, tz=timezone.utc)
+                return dt if tz is not None else dt.replace(tzinfo=None)
+
+        return VirtualDatetime
+
+
+class FakeExchange:
+    """Minimal ccxt.binance stand-in serving candles from the store by the virtual clock.
+
+    Closed candles are returned as stored. The candle still open is returned
+    as a flat stub at its open price (no body, so no cup effect), which is
+    enough for the runner to see that the previous candle has closed.
+    """
+
+    rateLimit = 0  # local data, no pacing needed
+
+    def __init__(self, clock: VirtualClock, candles: dict, timeframe: str):
+        self.clock = clock
+        self.candles = candles
+        self.tf_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+        self.symbols = [f"{coin}/USDT" for coin in candles]
+        self.fetch_count = 0
+
+    def load_markets(self):
+        return {s: {} for s in self.symbols}
+
+    def milliseconds(self) -> int:
+        return int(self.clock.now_ts * 1000)
+
+    def fetch_time(self) -> int:
+        return self.milliseconds()
+
+    def parse_timeframe(self, timeframe: str) -> int:
+        return ccxt.Exchange.parse_timeframe(timeframe)
+
+    def fetch_ohlcv(self, symbol, timeframe=None, since=None, limit=500):
+        self.fetch_count += 1
+        c = self.candles[symbol.split("/")[0]]
+        ts = c["timestamp"]
+        lo = np.searchsorted(ts, since or 0, side="left")
+        hi = np.searchsorted(ts, self.milliseconds() - self.tf_ms, side="right")
+        rows = [
+            [int(ts[i]), c["open"][i], c["high"][i], c["low"][i], c["close"][i], c["volume"][i]]
+            for i in range(lo, min(hi, lo + limit))
+        ]
+        if hi < len(ts) and hi - lo < limit and ts[hi] <= self.milliseconds():
+            o = c["open"][hi]
+            rows.append([int(ts[hi]), o, o, o, o, 0.0])
+        return rows
+
+    def last_price(self, coin: str) -> float:
+        c = self.candles[coin]
+        i = np.searchsorted(c["timestamp"], self.milliseconds() - self.tf_ms, side="right") - 1
+        return float(c["close"][max(i, 0)])
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, data: dict):
+        self.status_code = status_code
+        self._data = data
+        self.text = str(data)
+
+    def json(self):
+        return self._data
+
+
+class FakeTradeServer:
+    """In-memory /positioncount and /manage with the trade server's semantics.
+
+    Non-hedge mode: opening a side closes the opposite side first, a second
+    open on the same side is rejected with 400, Extra adds $100 at a weighted
+    entry, and closes use the same FEE_RATE arithmetic as managePosition.js.
+    """
+
+    def __init__(self, exchange: FakeExchange):
+        self.exchange = exchange
+        self.positions = []  # open positions
+        self.trades = []     # closed positions
+        self.decisions = []
+
+    def _open(self, table, coin, side):
+        return [p for p in self.positions if p["table"] == table and p["coinName"] == coin and (side is None or p["positionSide"] == side)]
+
+    def _close(self, table, coin, side, price, now):
+        for p in self._open(table, coin, side):
+            self.positions.remove(p)
+            self.trades.append(_close_trade(p, price, now))
+
+    def get(self, url, params=None, timeout=None):
+        params = params or {}
+        if urlparse(url).path.rstrip("/") == "/positioncount":
+            count = len([
+                p for p in self._open(params.get("tableName", "positions"), params.get("coinName"), params.get("positionSide"))
+                if params.get("status", "open") == "open"
+            ])
+            return FakeResponse(200, {"count": count})
+        return FakeResponse(404, {"error": "Not found"})
+
+    def post(self, url, json=None, params=None, headers=None, timeout=None):
+        path = urlparse(url).path
+        if not path.startswith("/manage/"):
+            return FakeResponse(404, {"error": "Not found"})
+        coin = path.split("/")[-1]
+        table = (params or {}).get("tableName", "positions")
+        action = (json or {}).get("Action")
+        price = self.exchange.last_price(coin)
+        now = int(self.exchange.clock.now_ts)
+        self.decisions.append({"time": now, "coin": coin, "table": table, "action": action, "price": price})
+
+        if action in ("Long", "Short"):
+            if self._open(table, coin, action):
+                return FakeResponse(400, {"message": f"{action} position already open for this coin"})
+            self._close(table, coin, "Short" if action == "Long" else "Long", price, now)
+            self.positions.append({
+                "table": table, "coinName": coin, "positionSide": action,
+                "positionSize": (json or {}).get("positionSize", 100), "entryPrice": price, "entryTime": now,
+            })
+            return FakeResponse(200, {"message": f"{action} position opened", "entryPrice": price})
+        if action in ("CloseLong", "CloseShort"):
+            self._close(table, coin, action[5:], price, now)
+            return FakeResponse(200, {"message": f"{action[5:]} positions closed", "exitPrice": price})
+        if action == "Extra":
+            open_positions = self._open(table, coin, None)
+            if not open_positions:
+                return FakeResponse(500, {"error": "No open position found for " + coin})
+            p = open_positions[0]
+            new_size = p["positionSize"] + 100
+            p["entryPrice"] = (p["entryPrice"] * p["positionSize"] + price * 100) / new_size
+            p["positionSize"] = new_size
+            return FakeResponse(200, {"message": f"Added extra to {p['positionSide']} position", "side": p["positionSide"]})
+        return FakeResponse(400, {"error": "Invalid Action"})
+
+
+class NullPlot:
+    """Stands in for matplotlib.pyplot, its figures and axes: every call is a no-op."""
+
+    def __getattr__(self, name):
+        return self
+
+    def __call__(self, *args, **kwargs):
+        return self
+
+    def subplots(self, *args, **kwargs):
+        return self, self
+
+
+class StageTimer:
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    def wrap(self, fn, stage: str):
+        @wraps(fn)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.samples[stage].append(time.perf_counter() - start)
+        return timed
+
+    def report(self) -> dict:
+        out = {}
+        for stage, values in self.samples.items():
+            arr = np.array(values) * 1000
+            out[stage] = {
+                "count": len(arr),
+                "total_ms": float(arr.sum()),
+                "mean_ms": float(arr.mean()),
+                "p50_ms": float(np.percentile(arr, 50)),
+                "p95_ms": float(np.percentile(arr, 95)),
+                "max_ms": float(arr.max()),
+            }
+        return out
+
+
+def load_bot(module_name: str, exchange: FakeExchange):
+    """Import a runner with ccxt.binance swapped for the fake exchange."""
+    real_binance = ccxt.binance
+    ccxt.binance = lambda *args, **kwargs: exchange
+    try:
+        bot = importlib.import_module(module_name)
+    finally:
+        ccxt.binance = real_binance
+    bot.exchange = exchange
+    return bot
+
+
+def run_replay(module_name: str = BOT_MODULE, coins: list = None, start: datetime = None, days: float = REPLAY_DAYS, quiet: bool = True, charts: bool = False) -> dict:
+    """Drive a runner's real main() over stored candles on a virtual clock.
+
+    The runners' per-cycle cup charts dominate replay time and never affect
+    decisions, so they are skipped unless `charts` is set.
+    """
+    timeframe = "15m"
+    coins = coins or stored_coins(timeframe)
+    candles = {coin: load_candles(coin, timeframe) for coin in coins}
+    candles = {coin: c for coin, c in candles.items() if len(c["timestamp"])}
+    if not candles:
+        raise ValueError(f"no stored {timeframe} candles for {coins}")
+
+    if start is None:
+        last = max(int(c["timestamp"][-1]) for c in candles.values()) / 1000
+        start = datetime.fromtimestamp(last, tz=timezone.utc) - timedelta(days=days)
+    end = start + timedelta(days=days)
+
+    clock = VirtualClock(start, end)
+    exchange = FakeExchange(clock, candles, timeframe)
+    server = FakeTradeServer(exchange)
+    bot = load_bot(module_name, exchange)
+
+    timer = StageTimer()
+    bot.time = clock
+    bot.datetime = clock.datetime_class()
+    bot.requests = server
+    bot.COINS = list(candles)
+    # The tick watcher runs on real time; replays only see candle closes
+    bot.INTRA_CANDLE_EXITS = False
+    bot.METRICS_PORT = None
+    for name, stage in STAGES.items():
+        if hasattr(bot, name):
+            setattr(bot, name, timer.wrap(getattr(bot, name), stage))
+    live_plt = getattr(bot, "plt", None)
+    if live_plt is not None and not charts:
+        bot.plt = NullPlot()
+    elif live_plt is not None:
+        # bot_cross.py draws a figure every cycle without closing it; drop
+        # them between coins so long replays don't accumulate figures.
+        process_coin = bot.process_coin
+
+        def process_and_close(*args, **kwargs):
+            try:
+                return process_coin(*args, **kwargs)
+            finally:
+                bot.plt.close("all")
+
+        bot.process_coin = process_and_close
+    if hasattr(bot, "log"):
+        bot.log.clock = clock.time
+    if quiet:
+        bot.print = lambda *args, **kwargs: None
+        scheduler.print = bot.print
+        if hasattr(bot, "log"):
+            bot.log.stream = None
+
+    # Keep replayed cups and finalization delays out of the live logs
+    live_log_dir = cups.CUP_LOG_DIR
+    cups.CUP_LOG_DIR = Path(tempfile.mkdtemp(prefix="replay_cups_"))
+    if hasattr(bot, "STATS_DIR"):
+        bot.STATS_DIR = cups.CUP_LOG_DIR
+    if hasattr(bot, "log"):
+        bot.log.dump_path = cups.CUP_LOG_DIR / "events_dump.log"
+    wall = time.perf_counter()
+    try:
+        bot.main()
+    except ReplayFinished:
+        pass
+    finally:
+        shutil.rmtree(cups.CUP_LOG_DIR, ignore_errors=True)
+        cups.CUP_LOG_DIR = live_log_dir
+        vars(scheduler).pop("print", None)
+        if live_plt is not None:
+            bot.plt = live_plt
+    wall = time.perf_counter() - wall
+
+    return {
+        "bot": module_name,
+        "coins": list(candles),
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "wall_seconds": wall,
+        "virtual_seconds": clock.now_ts - start.timestamp(),
+        "fetch_calls": exchange.fetch_count,
+        "decisions": server.decisions,
+        "trades": server.trades,
+        "open_positions": server.positions,
+        "stages": timer.report(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a runner's main() on a virtual clock")
+    parser.add_argument("coins", nargs="*", help="defaults to every coin in the candle store")
+    parser.add_argument("--bot", default=BOT_MODULE, help="runner module, e.g. bot_cross or bot_prod")
+    parser.add_argument("--days", type=float, default=REPLAY_DAYS)
+    parser.add_argument("--start", help="ISO date (UTC), defaults to the last --days of stored candles")
+    parser.add_argument("--verbose", action="store_true", help="keep the runner's own output")
+    parser.add_argument("--charts", action="store_true", help="draw the runners' cup charts (slow)")
+    args = parser.parse_args()
+
+    start = datetime.fromisoformat(args.start).replace(tzinfo=timezone.utc) if args.start else None
+    result = run_replay(args.bot, args.coins, start, args.days, quiet=not args.verbose, charts=args.charts)
+
+    print(
+        f"[{datetime.now()}] {result['bot']}: {result['start']} -> {result['end']} "
+        f"({result['virtual_seconds'] / 86400:.1f} virtual days) in {result['wall_seconds']:.2f}s, "
+        f"{result['fetch_calls']} candle fetches"
+    )
+    for d in result["decisions"]:
+        when = datetime.fromtimestamp(d["time"], tz=timezone.utc).strftime("%Y-%m-%d %H:%M")
+        print(f"  {when} {d['table']:<6} {d['coin']:<6} {d['action']:<10} @ {d['price']:.5f}")
+    pnl = sum(t["pnl"] for t in result["trades"])
+    print(f"  closed trades={len(result['trades'])} pnl={pnl:.2f} open={len(result['open_positions'])} (fee rate {FEE_RATE})")
+    print(f"  {'stage':<15}{'count':>7}{'total ms':>11}{'mean':>9}{'p50':>9}{'p95':>9}{'max':>9}")
+    for stage, s in sorted(result["stages"].items()):
+        print(f"  {stage:<15}{s['count']:>7}{s['total_ms']:>11.1f}{s['mean_ms']:>9.2f}{s['p50_ms']:>9.2f}{s['p95_ms']:>9.2f}{s['max_ms']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
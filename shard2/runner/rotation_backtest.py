@@ -0,0 +1,216 @@
+# =====================
+# IMPORTS
+# =====================
+import numpy as np
+import argparse
+import time
+from datetime import datetime
+
+from backtest import FEE_RATE, POSITION_SIZE
+from candle_store import load_candles, stored_coins
+
+# =====================
+# PARAMETERS
+# =====================
+TIMEFRAME = "5m"
+CADENCE_MIN = 10  # bots/Top.py and bots/bot.py sleep 600s between scans
+
+# Rotation bots, keyed by their main trade-server table. Each main-table trade
+# is mirrored in the "<table>Rev" table with the opposite side.
+#   anchor: daily change is measured from the open of the current UTC day
+#           (1d kline with startTime=today) or the current hour (scalp.py, 1h)
+#   losers: also short the top-N losers (SetLoserCoins in Top.py)
+STRATEGIES = {
+    "Raly": {"anchor": "1d", "top_n": 5, "losers": False},   # bots/bot.py
+    "Top": {"anchor": "1d", "top_n": 1, "losers": True},     # bots/Top.py
+    "Scalp": {"anchor": "1h", "top_n": 5, "losers": False},  # bots/scalp.py
+}
+ANCHOR_MS = {"1h": 3_600_000, "1d": 86_400_000}
+
+
+def load_universe(coins: list, timeframe: str = TIMEFRAME) -> dict:
+    """Align stored candles of many coins onto one timestamp grid.
+
+    Returns {"coins", "timestamp", "open", "close"} with (time x coin) price
+    matrices; gaps before a listing are NaN, later gaps carry the last close.
+    """
+    per_coin = [load_candles(coin, timeframe) for coin in coins]
+    keep = [i for i, c in enumerate(per_coin) if len(c["timestamp"])]
+    coins = [coins[i] for i in keep]
+    per_coin = [per_coin[i] for i in keep]
+    if not per_coin:
+        return {"coins": [], "timestamp": np.zeros(0, dtype=np.int64), "open": np.zeros((0, 0)), "close": np.zeros((0, 0))}
+
+    ts = np.unique(np.concatenate([c["timestamp"] for c in per_coin]))
+    opens = np.full((len(ts), len(coins)), np.nan)
+    closes = np.full((len(ts), len(coins)), np.nan)
+    for j, c in enumerate(per_coin):
+        rows = np.searchsorted(ts, c["timestamp"])
+        opens[rows, j] = c["open"]
+        closes[rows, j] = c["close"]
+
+    # Forward-fill closes down each column (last known price)
+    idx = np.where(np.isnan(closes), 0, np.arange(len(ts))[:, None])
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    filled = closes[idx, np.arange(len(coins))]
+    return {"coins": coins, "timestamp": ts, "open": opens, "close": filled}
+
+
+def _table_trades(table: str, side: str, coins: list, rows, cols, entry, exit_price, entry_ts, exit_ts) -> list:
+    quantity = POSITION_SIZE / entry
+    gross = (exit_price - entry) * quantity if side == "Long" else (entry - exit_price) * quantity
+    fee = POSITION_SIZE * FEE_RATE * 2
+    pnl = gross - fee
+    return [
+        {
+            "table": table,
+            "coinName": coins[c],
+            "positionSide": side,
+            "positionSize": POSITION_SIZE,
+            "entryTime": int(et) // 1000,
+            "exitTime": int(xt) // 1000,
+            "entryPrice": float(e),
+            "exitPrice": float(x),
+            "grossPnl": float(g),
+            "fee": fee,
+            "pnl": float(p),
+        }
+        for c, e, x, et, xt, g, p in zip(cols.tolist(), entry.tolist(), exit_price.tolist(), entry_ts.tolist(), exit_ts.tolist(), gross.tolist(), pnl.tolist())
+    ]
+
+
+def replay(universe: dict, strategy: str = "Raly", cadence_min: int = CADENCE_MIN, top_n: int = None) -> dict:
+    """Replay a rotation bot over aligned candles.
+
+    Every cadence the coins are ranked by change since the anchor open (one
+    argpartition per rotation row, all at once), then SetCoins/SetLoserCoins
+    semantics apply: coins leaving the set are closed, new ones opened, and
+    every main-table trade is mirrored in the Rev table. Positions still held
+    at the end are closed at the last price.
+    """
+    rules = STRATEGIES[strategy]
+    top_n = top_n or rules["top_n"]
+    coins = universe["coins"]
+    ts = universe["timestamp"]
+    opens = universe["open"]
+    closes = universe["close"]
+    if len(ts) < 2 or not coins:
+        return {"trades": [], "timestamp": ts[:0], "equity": np.zeros(0), "summary": {}}
+
+    step = int(np.median(np.diff(ts)))
+    close_ts = ts + step
+    cadence_ms = cadence_min * 60_000
+    if cadence_ms % step:
+        raise ValueError(f"cadence {cadence_min}m is not a multiple of the {step // 60_000}m candles")
+
+    # Anchor open: open of the first candle opening in the current UTC day/hour
+    period = ts // ANCHOR_MS[rules["anchor"]]
+    _, first_row = np.unique(period, return_index=True)
+    anchor_row = first_row[np.searchsorted(first_row, np.arange(len(ts)), side="right") - 1]
+    anchor_open = opens[anchor_row]
+
+    rot = np.flatnonzero(close_ts % cadence_ms == 0)
+    price = closes[rot]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        change = (price - anchor_open[rot]) / anchor_open[rot] * 100
+    k = min(top_n, len(coins))
+
+    R, S = price.shape
+    held = {}
+    gain = np.where(np.isnan(change), -np.inf, change)
+    top = np.argpartition(-gain, k - 1, axis=1)[:, :k]
+    sel = np.zeros((R, S), dtype=bool)
+    np.put_along_axis(sel, top, True, axis=1)
+    sel &= np.isfinite(gain)
+    held["gainers"] = sel
+    if rules["losers"]:
+        lose = np.where(np.isnan(change), np.inf, change)
+        bottom = np.argpartition(lose, k - 1, axis=1)[:, :k]
+        sel = np.zeros((R, S), dtype=bool)
+        np.put_along_axis(sel, bottom, True, axis=1)
+        sel &= np.isfinite(lose)
+        held["losers"] = sel
+
+    trades = []
+    equity = np.zeros(R)
+    rot_ts = close_ts[rot]
+    for group, sel in held.items():
+        # Close everything after the last rotation
+        sel = np.vstack([sel, np.zeros((1, S), dtype=bool)])
+        prev = np.vstack([np.zeros((1, S), dtype=bool), sel[:-1]])
+        opened = sel & ~prev
+        closed = prev & ~sel
+        px = np.vstack([price, price[-1:]])
+        when = np.append(rot_ts, rot_ts[-1])
+
+        entry_row = np.where(opened, np.arange(R + 1)[:, None], 0)
+        np.maximum.accumulate(entry_row, axis=0, out=entry_row)
+        entry_px = px[entry_row, np.arange(S)]
+
+        main_side, rev_side = ("Long", "Short") if group == "gainers" else ("Short", "Long")
+        rows, cols = np.nonzero(closed)
+        e_rows = entry_row[rows - 1, cols]
+        for table, side in ((strategy, main_side), (f"{strategy}Rev", rev_side)):
+            trades.extend(_table_trades(
+                table, side, coins, rows, cols,
+                px[e_rows, cols], px[rows, cols], when[e_rows], when[rows],
+            ))
+
+        # Equity curve of the main table: open PnL (entry fee only, as in
+        # calculateCurrentProfit) plus realized PnL at each rotation.
+        sign = 1.0 if main_side == "Long" else -1.0
+        with np.errstate(invalid="ignore"):
+            open_pnl = np.where(sel[:-1], sign * (price - entry_px[:-1]) * POSITION_SIZE / entry_px[:-1] - POSITION_SIZE * FEE_RATE, 0.0)
+        # The final row's positions are realized by the close-everything row at the same index
+        open_pnl[-1] = 0.0
+        equity += np.nansum(open_pnl, axis=1)
+
+    realized = np.zeros(R + 1)
+    for t in trades:
+        if t["table"] == strategy:
+            realized[np.searchsorted(rot_ts, t["exitTime"] * 1000)] += t["pnl"]
+    equity += np.cumsum(realized)[:R]
+
+    return {"trades": trades, "timestamp": rot_ts, "equity": equity, "summary": summarize(trades, strategy)}
+
+
+def summarize(trades: list, strategy: str) -> dict:
+    out = {}
+    for table in (strategy, f"{strategy}Rev"):
+        pnls = np.array([t["pnl"] for t in trades if t["table"] == table])
+        out[table] = {
+            "tradeCount": int(len(pnls)),
+            "winCount": int((pnls > 0).sum()),
+            "lossCount": int((pnls < 0).sum()),
+            "totalPnl": float(pnls.sum()),
+            "winRate": float((pnls > 0).mean() * 100) if len(pnls) else 0.0,
+        }
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay the Top/Raly rotation bots over stored candles")
+    parser.add_argument("coins", nargs="*", help="defaults to every coin in the candle store")
+    parser.add_argument("--strategy", choices=sorted(STRATEGIES), default="Raly")
+    parser.add_argument("--timeframe", default=TIMEFRAME)
+    parser.add_argument("--cadence", type=int, default=CADENCE_MIN, help="minutes between rotations")
+    parser.add_argument("--top-n", type=int, default=None)
+    args = parser.parse_args()
+
+    coins = args.coins or stored_coins(args.timeframe)
+    start = time.perf_counter()
+    universe = load_universe(coins, args.timeframe)
+    loaded = time.perf_counter()
+    result = replay(universe, args.strategy, args.cadence, args.top_n)
+    done = time.perf_counter()
+
+    print(
+        f"[{datetime.now()}] {args.strategy}: {len(universe['coins'])} coins, {len(result['timestamp'])} rotations "
+        f"every {args.cadence}m (load {loaded - start:.2f}s, replay {done - loaded:.2f}s)"
+    )
+    for table, s in result["summary"].items():
+        print(f"  {table:<10} trades={s['tradeCount']} win={s['winRate']:.1f}% pnl={s['totalPnl']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,505 @@
+# =====================
+# IMPORTS
+# =====================
+import numpy as np
+import argparse
+import multiprocessing as mp
+import os
+import queue
+import socket
+import threading
+import time
+import traceback
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import requests
+
+from backtest import STRATEGIES
+from candle_store import FetchError, load_candles, append_candles, plan_windows, timeframe_ms, to_arrays
+from coordinator import HEARTBEAT_TIMEOUT
+from cups import CupHistory, cup_log_path
+from finalize import CandleCloseWaiter, FinalizationStats, rest_closed_probe, STATS_DIR
+from scheduler import Scheduler, ServerClock, http_server_time
+
+# =====================
+# PARAMETERS
+# =====================
+BASE_URL = "https://fapi.binance.com"
+TIMEFRAME = "15m"
+CUP_SIZE_PCT = 2.0
+START_DATE = datetime(2026, 1, 9, tzinfo=timezone.utc)
+SAFETY_DELAY = 20          # latest start after a candle boundary when its close is not confirmed sooner
+PROBE_SYMBOL = "BTCUSDT"   # symbol polled for the candle close
+
+API_BASE_URL = "http://localhost:5007"
+TABLE_NAME = "SCAN"
+POSITION_SIZE = 100
+
+WORKERS = os.cpu_count() or 1
+FETCH_THREADS = 4           # concurrent kline requests inside one worker
+PAGE_LIMIT = 1000           # klines per warm-up page
+STEADY_LIMIT = 99           # klines per page once warm (weight 1)
+WEIGHT_LIMIT = 2400         # Binance futures request weight per minute (per IP)
+CYCLE_TIMEOUT = 120         # seconds to wait for workers before deciding without them
+
+CUP_LOG = f"{TIMEFRAME}_{CUP_SIZE_PCT:g}_scanner"
+
+
+# =====================
+# UNIVERSE
+# =====================
+def get_active_futures_symbols(base_url: str = BASE_URL) -> list:
+    """Trading USDT perpetuals, same filter as bots/Top.py."""
+    try:
+        response = requests.get(f"{base_url}/fapi/v1/exchangeInfo", timeout=10)
+        response.raise_for_status()
+        data = response.json()
+
+        return [
+            s["symbol"]
+            for s in data["symbols"]
+            if s["contractType"] == "PERPETUAL"
+            and s["status"] == "TRADING"
+            and s["quoteAsset"] == "USDT"
+        ]
+    except Exception:
+        return []
+
+
+def coin_name(symbol: str) -> str:
+    """BTCUSDT -> BTC (the coinName used by the trade server)."""
+    return symbol[:-4] if symbol.endswith("USDT") else symbol
+
+
+def shard(symbols: list, workers: int) -> list:
+    """Round-robin split so each worker gets a similar mix of old and new listings."""
+    return [symbols[i::workers] for i in range(workers)]
+
+
+# =====================
+# WORKER
+# =====================
+def fetch_klines(session, base_url: str, symbol: str, interval: str, start_ms: int, limit: int) -> list:
+    """One /fapi/v1/klines page as ccxt-style [ts, o, h, l, c, v] rows.
+
+    Backs off when Binance reports the per-minute weight is nearly used up
+    or answers 429/418, and raises when still rate limited after three tries
+    so the symbol's history is not advanced over missing candles.
+    """
+    params = {"symbol": symbol, "interval": interval, "startTime": start_ms, "limit": limit}
+    for attempt in range(3):
+        resp = session.get(f"{base_url}/fapi/v1/klines", params=params, timeout=10)
+        if resp.status_code in (418, 429):
+            wait = float(resp.headers.get("Retry-After", 60))
+            print(f"[{datetime.now()}] {symbol}: rate limited ({resp.status_code}), waiting {wait:.0f}s")
+            time.sleep(wait)
+            continue
+        resp.raise_for_status()
+        used = int(resp.headers.get("X-MBX-USED-WEIGHT-1M", 0))
+        if used > WEIGHT_LIMIT * 0.9:
+            time.sleep(60 - time.time() % 60 + 1)
+        return [[int(k[0]), float(k[1]), float(k[2]), float(k[3]), float(k[4]), float(k[5])] for k in resp.json()]
+    raise FetchError(f"{symbol}: klines from {start_ms} still rate limited after 3 attempts")
+
+
+def scan_symbol(session, base_url: str, symbol: str, history: CupHistory, now_ms: int, tf_ms: int, start_ms: int) -> dict:
+    """Fetch the candles a symbol is missing, advance its cups and build its signal."""
+    since = history.since() or start_ms
+    if now_ms - since < tf_ms * STEADY_LIMIT:
+        # Usual cycle: the candle that just closed plus the new open one
+        rows = fetch_klines(session, base_url, symbol, TIMEFRAME, since, STEADY_LIMIT)
+    else:
+        rows = []
+        for start in plan_windows(since, now_ms, tf_ms, PAGE_LIMIT):
+            rows.extend(fetch_klines(session, base_url, symbol, TIMEFRAME, start, PAGE_LIMIT))
+
+    candles = to_arrays(rows)
+    _, keep = np.unique(candles["timestamp"], return_index=True)
+    candles = {col: arr[keep] for col, arr in candles.items()}
+    closed = candles["timestamp"] + tf_ms <= now_ms
+    if closed.any():
+        append_candles(symbol, {col: arr[closed] for col, arr in candles.items()}, TIMEFRAME)
+
+    cups, forming = history.update(candles, now_ms, tf_ms)
+    latest = cups[-1] if len(cups) else None
+    return {
+        "symbol": symbol,
+        "coin": coin_name(symbol),
+        "cup": None if latest is None else {
+            "id": int(latest["id"]), "fill": float(latest["fill"]),
+            "open": float(latest["open"]), "close": float(latest["close"]), "end": int(latest["end"]),
+        },
+        "fill": forming.fill,
+        "open": forming.open,
+    }
+
+
+def worker_main(index: int, symbols: list, commands, results, base_url: str, handoff: bool, start_ms: int):
+    """Own the candle and cup state of one shard; answer every cycle with one signal per symbol.
+
+    State is warmed from the local candle store first, so a restart only
+    fetches what was missed while the scanner was down. "add"/"remove"
+    commands change the shard in place; the other symbols stay warm.
+    """
+    tf_ms = timeframe_ms(TIMEFRAME)
+    histories = {}
+
+    def warm(symbol):
+        history = CupHistory(cup_log_path(symbol, CUP_LOG), CUP_SIZE_PCT, handoff=handoff)
+        stored = load_candles(symbol, TIMEFRAME)
+        if len(stored["timestamp"]):
+            history.update(stored, int(stored["timestamp"][-1]) + tf_ms, tf_ms)
+        histories[symbol] = history
+
+    for symbol in symbols:
+        warm(symbol)
+
+    session = requests.Session()
+    pool = ThreadPoolExecutor(max_workers=FETCH_THREADS)
+    while True:
+        command = commands.get()
+        if command[0] == "stop":
+            break
+        if command[0] == "add":
+            for symbol in command[1]:
+                warm(symbol)
+            continue
+        if command[0] == "remove":
+            for symbol in command[1]:
+                histories.pop(symbol, None)
+            continue
+        _, cycle, now_ms = command
+
+        def scan(symbol):
+            try:
+                results.put(("signal", cycle, scan_symbol(session, base_url, symbol, histories[symbol], now_ms, tf_ms, start_ms)))
+            except Exception as e:
+                results.put(("error", cycle, symbol, f"{e}"))
+
+        list(pool.map(scan, list(histories)))
+        results.put(("done", cycle, index))
+    pool.shutdown()
+
+
+# =====================
+# DECISIONS
+# =====================
+class Decider:
+    """The runners' cup rules for many coins, applied in the single order-posting process.
+
+    Same semantics as process_coin() in bot_cross.py (MAZE2) / bot_prod.py
+    (MAZE) per backtest.STRATEGIES, with `used` kept per coin.
+    """
+
+    def __init__(self, strategy: str, table: str = TABLE_NAME, api_base_url: str = API_BASE_URL):
+        self.rules = STRATEGIES[strategy]
+        self.table = table
+        self.api_base_url = api_base_url
+        self.session = requests.Session()
+        self.state = {}       # state[coin] = "long", "short" or None
+        self.used = {}        # used[coin] = set of cup ids already acted on
+        self.acted_through = {}  # acted_through[coin] = newest cup id when this node took the coin (never traded on)
+        self.last_cup = {}    # last_cup[coin] = latest complete cup of the previous cycle
+        self.close_used = set()
+
+    def _position_exists(self, coin: str, side: str) -> bool:
+        try:
+            resp = self.session.get(f"{self.api_base_url}/positioncount", params={
+                "coinName": coin, "positionSide": side, "status": "open", "tableName": self.table,
+            }, timeout=5)
+            return resp.status_code == 200 and resp.json().get("count", 0) > 0
+        except Exception as e:
+            print(f"[{datetime.now()}] Error checking {side} position for {coin}: {e}")
+            return False
+
+    def sync(self, coin: str):
+        if self._position_exists(coin, "Long"):
+            self.state[coin] = "long"
+        elif self._position_exists(coin, "Short"):
+            self.state[coin] = "short"
+        else:
+            self.state[coin] = None
+
+    def post(self, coin: str, action: str) -> bool:
+        try:
+            resp = self.session.post(
+                f"{self.api_base_url}/manage/{coin}",
+                json={"Action": action, "positionSize": POSITION_SIZE},
+                params={"tableName": self.table},
+                timeout=5,
+            )
+            if resp.status_code == 200:
+                print(f"[{datetime.now()}] ✓ {action} {coin} in {self.table}")
+                return True
+            print(f"[{datetime.now()}] ✗ {action} {coin} failed: {resp.status_code} {resp.text}")
+        except Exception as e:
+            print(f"[{datetime.now()}] Error posting {action} for {coin}: {e}")
+        # Our view of the position may be stale (closed by hand, another bot)
+        self.sync(coin)
+        return False
+
+    def seed(self, coin: str, cup: dict):
+        """Mark the cups completed so far as acted on, like acted_through in the runners.
+
+        Runs on the first signal of a coin after startup or after it was
+        handed to this node, so cups completed while the scanner was down, or
+        already decided by the previous owner, do not open positions or add
+        Extras; only cups completing from the next candle on do.
+        """
+        self.used[coin] = set()
+        self.acted_through[coin] = -1 if cup is None else cup["id"]
+        if cup is not None:
+            self.last_cup[coin] = cup
+
+    def release(self, coins):
+        """Forget coins handed to another node; they are synced and seeded again if they come back."""
+        for coin in coins:
+            self.state.pop(coin, None)
+            self.used.pop(coin, None)
+            self.acted_through.pop(coin, None)
+            self.last_cup.pop(coin, None)
+            self.close_used.discard(coin)
+
+    def on_signal(self, signal: dict):
+        coin = signal["coin"]
+        if coin not in self.state:
+            self.sync(coin)
+        if coin not in self.used:
+            self.seed(coin, signal["cup"])
+        state = self.state[coin]
+        last = self.last_cup.get(coin)
+        fill, cup_open = signal["fill"], signal["open"]
+
+        if self.rules["incomplete_close"] and fill != 0 and last is not None and cup_open is not None and coin not in self.close_used:
+            if fill > 0 and state == "short" and last["fill"] > 0 and cup_open < last["close"]:
+                if self.post(coin, "CloseShort"):
+                    self.close_used.add(coin)
+                    self.state[coin] = state = None
+            elif fill < 0 and state == "long" and last["fill"] < 0 and cup_open > last["close"]:
+                if self.post(coin, "CloseLong"):
+                    self.close_used.add(coin)
+                    self.state[coin] = state = None
+
+        cup = signal["cup"]
+        if cup is None:
+            return
+        self.close_used.discard(coin)
+        used = self.used[coin]
+        want = "short" if cup["fill"] > 0 else "long"
+        if cup["id"] <= self.acted_through[coin]:
+            pass  # decided before this node took the coin; wait for a new cup
+        elif state == want:
+            if self.rules["extra"] and cup["id"] not in used and self.post(coin, "Extra"):
+                used.add(cup["id"])
+        elif not self.rules["open_once"] or cup["id"] not in used:
+            if self.post(coin, want.capitalize()):
+                used.add(cup["id"])
+                self.state[coin] = want
+        self.last_cup[coin] = cup
+
+
+# =====================
+# COORDINATOR
+# =====================
+class WorkerPool:
+    """One scanner process per shard of a symbol list."""
+
+    def __init__(self, symbols: list, workers: int, base_url: str, handoff: bool, start_ms: int):
+        self.symbols = list(symbols)
+        self.workers = max(1, min(workers, len(symbols)))
+        ctx = mp.get_context("spawn")
+        self.results = ctx.Queue()
+        self.commands = [ctx.Queue() for _ in range(self.workers)]
+        shards = shard(self.symbols, self.workers)
+        self.owner = {symbol: i for i, shard_symbols in enumerate(shards) for symbol in shard_symbols}
+        self.procs = [
+            ctx.Process(target=worker_main, args=(i, shard_symbols, self.commands[i], self.results, base_url, handoff, start_ms), daemon=True)
+            for i, shard_symbols in enumerate(shards)
+        ]
+        for p in self.procs:
+            p.start()
+
+    def reassign(self, symbols: list):
+        """Switch to a new symbol list without restarting the workers.
+
+        Symbols that left are dropped by their worker and new ones are warmed
+        on the least loaded worker; every other symbol keeps its warm state.
+        """
+        keep = set(symbols)
+        removed = defaultdict(list)
+        for symbol in [s for s in self.owner if s not in keep]:
+            removed[self.owner.pop(symbol)].append(symbol)
+        load = [0] * self.workers
+        for i in self.owner.values():
+            load[i] += 1
+        added = defaultdict(list)
+        for symbol in [s for s in symbols if s not in self.owner]:
+            i = min(range(self.workers), key=load.__getitem__)
+            load[i] += 1
+            self.owner[symbol] = i
+            added[i].append(symbol)
+        for i, batch in removed.items():
+            self.commands[i].put(("remove", batch))
+        for i, batch in added.items():
+            self.commands[i].put(("add", batch))
+        self.symbols = list(symbols)
+
+    def cycle(self, cycle: int, now_ms: int, on_signal) -> tuple:
+        """Run one cycle on every worker, handing signals to on_signal as they stream in."""
+        for q in self.commands:
+            q.put(("cycle", cycle, now_ms))
+
+        done = signals = errors = 0
+        deadline = time.time() + CYCLE_TIMEOUT
+        while done < self.workers:
+            try:
+                message = self.results.get(timeout=1)
+            except queue.Empty:
+                if not any(p.is_alive() for p in self.procs):
+                    print(f"[{datetime.now()}] Cycle {cycle}: all workers have exited")
+                    break
+                if time.time() > deadline:
+                    print(f"[{datetime.now()}] Cycle {cycle}: {self.workers - done} workers did not finish in {CYCLE_TIMEOUT}s")
+                    break
+                continue
+            if message[1] != cycle:
+                continue  # late answer from a cycle that timed out
+            if message[0] == "signal":
+                signals += 1
+                try:
+                    on_signal(message[2])
+                except Exception:
+                    print(f"[{datetime.now()}] Error deciding {message[2]['symbol']}:\n" + traceback.format_exc())
+            elif message[0] == "error":
+                errors += 1
+                print(f"[{datetime.now()}] {message[2]}: {message[3]}")
+            else:
+                done += 1
+        return signals, errors
+
+    def stop(self):
+        for q in self.commands:
+            q.put(("stop",))
+        for p in self.procs:
+            p.join(timeout=10)
+
+
+class Membership:
+    """Keeps this node registered with a shard coordinator from a background thread."""
+
+    def __init__(self, coordinator, node: str):
+        self.coordinator = coordinator
+        self.node = node
+        self.version = coordinator.join(node)
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._beat, daemon=True)
+        self.thread.start()
+
+    def _beat(self):
+        while not self.stopped.wait(HEARTBEAT_TIMEOUT / 3):
+            try:
+                self.version = self.coordinator.heartbeat(self.node)
+            except Exception as e:
+                print(f"[{datetime.now()}] Heartbeat to coordinator failed: {e}")
+
+    def symbols(self) -> tuple:
+        assignment = self.coordinator.assignment(self.node)
+        return assignment["version"], assignment["symbols"]
+
+    def leave(self):
+        self.stopped.set()
+        try:
+            self.coordinator.leave(self.node)
+        except Exception as e:
+            print(f"[{datetime.now()}] Leaving coordinator failed: {e}")
+
+
+def run_scanner(symbols: list = None, workers: int = WORKERS, strategy: str = "MAZE2", table: str = TABLE_NAME, base_url: str = BASE_URL, cycles: int = None, coordinator=None, node: str = None):
+    """Scan the perpetual universe every candle with one process per shard.
+
+    With a coordinator (LocalCoordinator or CoordinatorClient) this node only
+    scans the symbols hashed to it, and picks up a new assignment at the next
+    cycle after another node joins or leaves.
+    """
+    tf_ms = timeframe_ms(TIMEFRAME)
+    handoff = STRATEGIES[strategy]["handoff"]
+    start_ms = int(START_DATE.timestamp() * 1000)
+
+    membership = Membership(coordinator, node or socket.gethostname()) if coordinator is not None else None
+    version = None
+    if membership is not None:
+        version, symbols = membership.symbols()
+    else:
+        symbols = symbols or get_active_futures_symbols(base_url)
+    if not symbols and membership is None:
+        print(f"[{datetime.now()}] No symbols to scan, exiting.")
+        return
+
+    pool = WorkerPool(symbols, workers, base_url, handoff, start_ms) if symbols else None
+    decider = Decider(strategy, table)
+    print(f"[{datetime.now()}] Scanner: {len(symbols)} symbols on {pool.workers if pool else 0} workers, strategy={strategy}, table={table}")
+
+    clock = ServerClock(http_server_time(f"{base_url}/fapi/v1/time"))
+    waiter = CandleCloseWaiter(
+        clock,
+        rest_closed_probe(f"{base_url}/fapi/v1/klines", PROBE_SYMBOL, TIMEFRAME),
+        tf_ms,
+        FinalizationStats(STATS_DIR / "finalization_scanner.json"),
+        max_wait=SAFETY_DELAY,
+    )
+    cycle = 0
+
+    def run_cycle():
+        nonlocal cycle, version, symbols, pool
+        if membership is not None and membership.version != version:
+            version, assigned = membership.symbols()
+            if assigned != symbols:
+                print(f"[{datetime.now()}] Assignment v{version}: {len(assigned)} symbols (+{len(set(assigned) - set(symbols))} -{len(set(symbols) - set(assigned))})")
+                decider.release({coin_name(s) for s in set(symbols) - set(assigned)})
+                symbols = assigned
+                if pool is not None:
+                    pool.reassign(symbols)
+                elif symbols:
+                    pool = WorkerPool(symbols, workers, base_url, handoff, start_ms)
+
+        cycle += 1
+        started = time.time()
+        signals = errors = 0
+        if pool is not None:
+            signals, errors = pool.cycle(cycle, clock.now_ms(), decider.on_signal)
+        print(f"[{datetime.now()}] Cycle {cycle}: {signals} symbols evaluated, {errors} errors in {time.time() - started:.2f}s")
+
+    scheduler = Scheduler(clock)
+    scheduler.add("scan", TIMEFRAME, run_cycle, gate=waiter.wait, run_now=True)
+    try:
+        scheduler.run_forever(until=lambda: cycles is not None and cycle >= cycles)
+    finally:
+        if pool is not None:
+            pool.stop()
+        if membership is not None:
+            membership.leave()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cup signal over every trading USDT perpetual, sharded across processes")
+    parser.add_argument("symbols", nargs="*", help="defaults to every trading USDT perpetual")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--strategy", choices=sorted(STRATEGIES), default="MAZE2")
+    parser.add_argument("--table", default=TABLE_NAME)
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--cycles", type=int, default=None, help="stop after this many cycles")
+    parser.add_argument("--coordinator", help="shard coordinator URL, e.g. http://host:5010")
+    parser.add_argument("--node", help="this node's name on the coordinator (default: hostname)")
+    args = parser.parse_args()
+
+    coordinator = None
+    if args.coordinator:
+        from coordinator import CoordinatorClient
+        coordinator = CoordinatorClient(args.coordinator)
+    run_scanner(args.symbols, args.workers, args.strategy, args.table, args.base_url, args.cycles, coordinator, args.node)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# =====================
+# IMPORTS
+# =====================
+import json
+import threading
+import time
+import uuid
+from pathlib import Path
+
+# =====================
+# PARAMETERS
+# =====================
+TRACE_HEADER = "X-Trace-Id"
+CANDLE_CLOSE_HEADER = "X-Candle-Close"
+
+
+class Trace:
+    """One decision on its way to /manage; headers() marks the send, done() the acknowledgement."""
+
+    __slots__ = ("tracer", "id", "coin", "action", "trigger", "trigger_ms", "decided_ms", "sent_ms")
+
+    def __init__(self, tracer, coin: str, action: str, trigger: str, trigger_ms: int):
+        self.tracer = tracer
+        self.id = f"{tracer.table}-{coin}-{uuid.uuid4().hex[:12]}"
+        self.coin = coin
+        self.action = action
+        self.trigger = trigger
+        self.trigger_ms = trigger_ms
+        self.decided_ms = tracer.now_ms()
+        self.sent_ms = None
+
+    def headers(self) -> dict:
+        self.sent_ms = self.tracer.now_ms()
+        headers = {TRACE_HEADER: self.id}
+        if self.trigger_ms is not None:
+            headers[CANDLE_CLOSE_HEADER] = str(self.trigger_ms)
+        return headers
+
+    def done(self, status):
+        self.tracer.write({
+            "trace": self.id,
+            "table": self.tracer.table,
+            "coin": self.coin,
+            "action": self.action,
+            "trigger": self.trigger,
+            "trigger_ms": self.trigger_ms,
+            "decided_ms": self.decided_ms,
+            "sent_ms": self.sent_ms,
+            "acked_ms": self.tracer.now_ms(),
+            "clock_offset_ms": self.tracer.offset_ms(),
+            "status": status,
+        })
+
+
+class Tracer:
+    """Trace ids for a runner's orders, logged as JSON lines next to its other data.
+
+    `candle_close_ms` is the boundary the current cycle is acting on; orders
+    triggered by a live price instead pass their tick time. Both are exchange
+    time while hops are stamped on the local clock, so each record carries
+    `offset` (exchange minus local ms, e.g. ServerClock.offset_ms) for the
+    report to put the trigger on the local clock.
+    """
+
+    def __init__(self, table: str, log_path=None, clock=time.time, offset=None):
+        self.table = table
+        self.log_path = Path(log_path) if log_path else None
+        self.clock = clock
+        self.offset = offset
+        self.candle_close_ms = None
+        self.lock = threading.Lock()
+
+    def now_ms(self) -> int:
+        return int(self.clock() * 1000)
+
+    def offset_ms(self) -> float:
+        return float(self.offset()) if self.offset is not None else 0.0
+
+    def start(self, coin: str, action: str, tick_ms: int = None) -> Trace:
+        if tick_ms is not None:
+            return Trace(self, coin, action, "tick", tick_ms)
+        return Trace(self, coin, action, "candle", self.candle_close_ms)
+
+    def write(self, record: dict):
+        if self.log_path is None:
+            return
+        with self.lock:
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.log_path, "a") as f:
+                f.write(json.dumps(record) + "\n")
@@ -0,0 +1,412 @@
+# =====================
+# IMPORTS
+# =====================
+import numpy as np
+import argparse
+import json
+import random
+import re
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, unquote
+
+from backtest import _close_trade, FEE_RATE, EXTRA_SIZE
+from candle_store import timeframe_ms, START_DATE
+from fake_binance import Market, BASE_TIMEFRAME, QUOTE, SEED
+from tracing import TRACE_HEADER, CANDLE_CLOSE_HEADER
+
+# =====================
+# PARAMETERS
+# =====================
+PORT = 5007              # the trade server's port, so runners need no change
+MAX_PAGE = 5000          # /gettrades page limit, as in routes/getTrades.js
+DB_PATH = ":memory:"     # or a file to keep positions between runs
+UPSTREAM_MS = 0          # per Binance call the real server makes (price fetch, candle fetch per closed position)
+UPSTREAM_JITTER_MS = 0   # ...plus uniform 0..UPSTREAM_JITTER_MS
+DEFAULT_TABLE = "positions"
+TABLE_RE = re.compile(r"^[A-Za-z0-9_]+$")  # same check as managePosition.js
+
+# Columns of api/utils/mockServer.db plus the entry/exit and change times the Mongo documents carry
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS "{table}" (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    entryTime INTEGER NOT NULL,
+    exitTime INTEGER DEFAULT 0,
+    coinName TEXT NOT NULL,
+    positionSide TEXT NOT NULL CHECK(positionSide IN ('Long', 'Short')),
+    positionSize REAL NOT NULL,
+    entryPrice REAL NOT NULL,
+    exitPrice REAL,
+    status TEXT DEFAULT 'open' CHECK(status IN ('open', 'close')),
+    grossPnl REAL,
+    fee REAL DEFAULT 0,
+    pnl REAL,
+    updatedAt INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS "{table}_open" ON "{table}" (coinName, status, positionSide, entryTime DESC);
+CREATE INDEX IF NOT EXISTS "{table}_updated" ON "{table}" (updatedAt, id);
+"""
+
+
+# =====================
+# STORE
+# =====================
+class PositionStore:
+    """Strategy tables in SQLite, one table per tableName, created on first use."""
+
+    def __init__(self, path: str = DB_PATH):
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.row_factory = sqlite3.Row
+        self.lock = threading.Lock()
+        self.tables = set()
+
+    def _table(self, table: str) -> str:
+        if table not in self.tables:
+            self.db.executescript(SCHEMA.format(table=table))
+            self.tables.add(table)
+        return table
+
+    def count(self, table: str, coin: str, side: str = None, status: str = "open") -> int:
+        query, args = "coinName = ? AND status = ?", [coin, status]
+        if side:
+            query, args = query + " AND positionSide = ?", args + [side]
+        with self.lock:
+            return self.db.execute(f'SELECT COUNT(*) FROM "{self._table(table)}" WHERE {query}', args).fetchone()[0]
+
+    def open_positions(self, table: str, coin: str, side: str = None) -> list:
+        query, args = "coinName = ? AND status = 'open'", [coin]
+        if side:
+            query, args = query + " AND positionSide = ?", args + [side]
+        with self.lock:
+            return [dict(r) for r in self.db.execute(f'SELECT * FROM "{self._table(table)}" WHERE {query} ORDER BY id', args)]
+
+    def insert(self, table: str, coin: str, side: str, size: float, price: float, now: int) -> int:
+        with self.lock:
+            cur = self.db.execute(
+                f'INSERT INTO "{self._table(table)}" (entryTime, coinName, positionSide, positionSize, entryPrice, updatedAt) VALUES (?, ?, ?, ?, ?, ?)',
+                (now, coin, side, size, price, _now_ms()),
+            )
+            return cur.lastrowid
+
+    def close(self, table: str, trade: dict):
+        with self.lock:
+            self.db.execute(
+                f'UPDATE "{self._table(table)}" SET exitTime = ?, exitPrice = ?, status = \'close\', grossPnl = ?, fee = ?, pnl = ?, updatedAt = ? WHERE id = ?',
+                (trade["exitTime"], trade["exitPrice"], trade["grossPnl"], trade["fee"], trade["pnl"], _now_ms(), trade["id"]),
+            )
+
+    def resize(self, table: str, position_id: int, size: float, entry_price: float):
+        with self.lock:
+            self.db.execute(
+                f'UPDATE "{self._table(table)}" SET positionSize = ?, entryPrice = ?, updatedAt = ? WHERE id = ?',
+                (size, entry_price, _now_ms(), position_id),
+            )
+
+    def trades(self, table: str, coin: str = None, status: str = None, since: int = None, after: tuple = None,
+               limit: int = None) -> list:
+        """/gettrades: newest entry first, or oldest change first with `since`; `after` is the last row's cursor."""
+        key = "updatedAt" if since is not None else "entryTime"
+        order = "ASC" if since is not None else "DESC"
+        where, args = [], []
+        if coin:
+            where, args = where + ["coinName = ?"], args + [coin]
+        if status:
+            where, args = where + ["status = ?"], args + [status]
+        if since is not None:
+            where, args = where + ["updatedAt > ?"], args + [since]
+        if after is not None:
+            op = ">" if since is not None else "<"
+            where, args = where + [f"({key} {op} ? OR ({key} = ? AND id {op} ?))"], args + [after[0], after[0], after[1]]
+        query = f'SELECT * FROM "{{}}" {"WHERE " + " AND ".join(where) if where else ""} ORDER BY {key} {order}, id {order}'
+        if limit:
+            query, args = query + " LIMIT ?", args + [limit]
+        with self.lock:
+            rows = self.db.execute(query.format(self._table(table)), args)
+            return [{**dict(r), "_id": str(r["id"])} for r in rows]
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+# =====================
+# SERVER
+# =====================
+class TradeServer:
+    """Stand-in for api/index.js's Python-facing endpoints: /positioncount,
+    /getPositionCount, /manage and /gettrades, with the routes' semantics.
+
+    Prices come from fake_binance's synthetic markets. The real server's
+    Binance round trips (one price fetch per order, one candle fetch per
+    closed position) are modelled as `upstream_ms` sleeps taken outside the
+    store lock, so concurrent requests overlap the way Node's awaits do.
+    Subscriber fanout is not modelled.
+    """
+
+    def __init__(self, store: PositionStore, clock=time.time, upstream_ms: float = UPSTREAM_MS,
+                 upstream_jitter_ms: float = UPSTREAM_JITTER_MS, trace_log=None, seed: int = SEED):
+        self.store = store
+        self.clock = clock
+        self.upstream_ms = upstream_ms
+        self.upstream_jitter_ms = upstream_jitter_ms
+        self.trace_log = open(trace_log, "a", buffering=1) if trace_log else None
+        self.random = random.Random(seed)
+        self.seed = seed
+        self.markets = {}
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.service_ms = defaultdict(list)  # route -> handling times
+
+    def upstream(self):
+        if self.upstream_ms or self.upstream_jitter_ms:
+            time.sleep((self.upstream_ms + self.random.uniform(0, self.upstream_jitter_ms)) / 1000)
+
+    def price(self, coin: str) -> float:
+        symbol = coin.upper() + QUOTE
+        with self.lock:
+            market = self.markets.get(symbol)
+            if market is None:
+                market = self.markets[symbol] = Market(symbol, timeframe_ms(BASE_TIMEFRAME), start_ms=int(START_DATE.timestamp() * 1000), seed=self.seed)
+        self.upstream()
+        return market.price_at(int(self.clock() * 1000))
+
+    def trace(self, trace_id: str, hop: str, **extra):
+        """Same line format as api/utils/trace.js, so latency_report.py can read it."""
+        if trace_id and self.trace_log:
+            line = json.dumps({"trace": trace_id, "hop": hop, "ts": int(time.time() * 1000), **extra})
+            with self.lock:
+                self.trace_log.write(line + "\n")
+
+    # =====================
+    # ROUTES
+    # =====================
+    def position_count(self, coin: str, table: str, side: str = None, status: str = "open") -> tuple:
+        if side and side not in ("Long", "Short"):
+            return 400, {"error": 'Invalid side. Must be "Long" or "Short"'}
+        count = self.store.count(table, coin, side, status)
+        return 200, {"message": "Position count retrieved successfully", "coinName": coin, "tableName": table,
+                     "status": status, "side": side or "all", "count": count}
+
+    def close_side(self, table: str, coin: str, side: str) -> list:
+        positions = self.store.open_positions(table, coin, side)
+        if not positions:
+            return []
+        price = self.price(coin)
+        now = int(self.clock())
+        closed = []
+        for p in positions:
+            self.upstream()  # fetchHistoricalCandles for the min/max profit
+            trade = _close_trade(p, price, now)
+            self.store.close(table, trade)
+            closed.append({"id": p["id"], "entryPrice": p["entryPrice"], "exitPrice": price, "pnl": trade["pnl"]})
+        return closed
+
+    def manage(self, coin: str, table: str, body: dict, hedge: bool = False) -> tuple:
+        action = body.get("Action")
+        size = body.get("positionSize")
+        if action == "Extra":
+            positions = self.store.open_positions(table, coin)
+            if not positions:
+                return 500, {"error": "No open position found for " + coin}
+            p = positions[0]
+            price = self.price(coin)
+            new_size = p["positionSize"] + EXTRA_SIZE
+            new_entry = (p["entryPrice"] * p["positionSize"] + price * EXTRA_SIZE) / new_size
+            self.store.resize(table, p["id"], new_size, new_entry)
+            return 200, {"message": f"Added extra to {p['positionSide']} position", "side": p["positionSide"],
+                         "positionSize": new_size, "entryPrice": new_entry}
+
+        if action in ("Long", "Short"):
+            if self.store.count(table, coin, action) > 0:
+                return 400, {"message": f"{action} position already open for this coin"}
+            if not hedge:
+                self.close_side(table, coin, "Short" if action == "Long" else "Long")
+            price = self.price(coin)
+            position_id = self.store.insert(table, coin, action, size, price, int(self.clock()))
+            return 200, {"message": f"{action} position opened hedge mode : {str(hedge).lower()}", "coinName": coin,
+                         "entryPrice": price, "positionSize": size, "status": "open", "id": position_id}
+
+        if action in ("CloseLong", "CloseShort"):
+            side = action[5:]
+            closed = self.close_side(table, coin, side)
+            if not closed:
+                return 200, {"message": f"No open {side} positions found"}
+            return 200, {"message": f"{side} positions closed", "coinName": coin, "exitPrice": closed[0]["exitPrice"],
+                         "positionsClosed": len(closed), "closedPositions": closed}
+
+        return 400, {"error": "Invalid Action"}
+
+    def handle(self, method: str, path: str, query: dict, body: dict, headers) -> tuple:
+        table = query.get("tableName") or DEFAULT_TABLE
+        if not TABLE_RE.match(table):
+            table = DEFAULT_TABLE
+        if method == "GET" and path == "/positioncount":
+            return self.position_count(normalize_coin(query.get("coinName")), table, query.get("positionSide"), query.get("status", "open"))
+        if method == "GET" and path.startswith("/getPositionCount/"):
+            parts = path.split("/")
+            if len(parts) == 4 and TABLE_RE.match(unquote(parts[3])):
+                return self.position_count(normalize_coin(unquote(parts[2])), unquote(parts[3]), query.get("side"))
+        if method == "POST" and path.startswith("/manage/"):
+            coin = normalize_coin(unquote(path[len("/manage/"):]))
+            trace_id = headers.get(TRACE_HEADER)
+            self.trace(trace_id, "received", table=table, coin=coin, action=body.get("Action"),
+                       candleClose=int(headers.get(CANDLE_CLOSE_HEADER) or 0) or None)
+            status, result = self.manage(coin, table, body, query.get("hedge") == "true")
+            self.trace(trace_id, "acked", status=status)
+            return status, result
+        if method == "GET" and path in ("/gettrades", "/gettrade"):
+            return self.get_trades(table, query)
+        return 404, {"error": "Not found"}
+
+    def get_trades(self, table: str, query: dict) -> tuple:
+        """routes/getTrades.js: the whole table, or pages with limit / after / since."""
+        coin = query.get("coinName") or query.get("coinname")
+        status = (query.get("status") or "all").lower()
+        status = "close" if status == "closed" else status
+        args = (table, normalize_coin(coin) if coin else None, None if status == "all" else status)
+        if not any(k in query for k in ("limit", "after", "since", "fields")):
+            trades = self.store.trades(*args)
+            return 200, {"message": "Trades retrieved successfully", "count": len(trades), "trades": trades}
+
+        try:
+            since = int(query["since"]) if "since" in query else None
+            after = tuple(int(float(v)) for v in query["after"].split(",")) if "after" in query else None
+        except ValueError:
+            return 400, {"error": 'Invalid cursor, expected "<number>,<id>"'}
+        page = min(max(int(query.get("limit") or MAX_PAGE), 1), MAX_PAGE)
+        trades = self.store.trades(*args, since=since, after=after, limit=page)
+        key = "updatedAt" if since is not None else "entryTime"
+        if query.get("fields"):
+            keep = {"_id", key} | {f.strip() for f in query["fields"].split(",")}
+            trades = [{k: v for k, v in t.items() if k in keep} for t in trades]
+        result = {"message": "Trades retrieved successfully", "count": len(trades), "trades": trades,
+                  "next": f"{trades[-1][key]},{trades[-1]['_id']}" if len(trades) == page else None}
+        if since is not None:
+            result["until"] = trades[-1]["updatedAt"] if trades else since
+        return 200, result
+
+    def record(self, route: str, ms: float):
+        with self.lock:
+            self.service_ms[route].append(ms)
+
+    def stats(self) -> dict:
+        with self.lock:
+            routes = {}
+            for route, samples in sorted(self.service_ms.items()):
+                arr = np.asarray(samples, dtype=np.float64)
+                routes[route] = {
+                    "count": int(arr.size),
+                    "p50_ms": float(np.percentile(arr, 50)),
+                    "p99_ms": float(np.percentile(arr, 99)),
+                    "max_ms": float(arr.max()),
+                }
+            return {"peak_in_flight": self.peak_in_flight, "routes": routes}
+
+    def reset_stats(self):
+        with self.lock:
+            self.service_ms.clear()
+            self.peak_in_flight = self.in_flight
+
+    def serve(self, port: int = PORT, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """Serve on a background thread; port 0 picks a free one (server.server_port)."""
+        server = ThreadingHTTPServer((host, port), make_handler(self))
+        server.daemon_threads = True
+        server.request_queue_size = 1024  # a quarter-hour herd opens hundreds of connections at once
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+def normalize_coin(coin) -> str:
+    """Coin names are stored upper-case (api/utils/positions.js normalizeCoin)."""
+    return (coin or "").strip().upper()
+
+
+def route_name(method: str, path: str, body: dict) -> str:
+    if path.startswith("/manage/"):
+        return f"manage:{body.get('Action')}"
+    if path.startswith("/getPositionCount/"):
+        return "getPositionCount"
+    return path.strip("/") or "/"
+
+
+def make_handler(server: TradeServer):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def send_json(self, status: int, body):
+            data = json.dumps(body, separators=(",", ":")).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def dispatch(self, method: str):
+            start = time.perf_counter()
+            url = urlparse(self.path)
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b""
+            if url.path == "/fake/stats":
+                if method == "POST":
+                    server.reset_stats()
+                return self.send_json(200, server.stats())
+            try:
+                body = json.loads(raw) if raw else {}
+            except ValueError:
+                return self.send_json(400, {"error": "Invalid JSON body"})
+
+            with server.lock:
+                server.in_flight += 1
+                server.peak_in_flight = max(server.peak_in_flight, server.in_flight)
+            try:
+                status, result = server.handle(method, url.path, query, body, self.headers)
+            except Exception as e:
+                status, result = 500, {"error": str(e)}
+            finally:
+                with server.lock:
+                    server.in_flight -= 1
+            self.send_json(status, result)
+            server.record(route_name(method, url.path, body), (time.perf_counter() - start) * 1000)
+
+        def do_GET(self):
+            self.dispatch("GET")
+
+        def do_POST(self):
+            self.dispatch("POST")
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the trade server's /positioncount and /manage endpoints")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--db", default=DB_PATH, help="SQLite file for the strategy tables (default in memory)")
+    parser.add_argument("--upstream", type=float, default=UPSTREAM_MS, help="ms per Binance call the real server would make")
+    parser.add_argument("--upstream-jitter", type=float, default=UPSTREAM_JITTER_MS, help="extra uniform 0..N ms")
+    parser.add_argument("--trace-log", help="write X-Trace-Id hops here (api/utils/trace.js format)")
+    parser.add_argument("--seed", type=int, default=SEED)
+    args = parser.parse_args()
+
+    server = TradeServer(PositionStore(args.db), upstream_ms=args.upstream, upstream_jitter_ms=args.upstream_jitter,
+                         trace_log=args.trace_log, seed=args.seed)
+    server.serve(args.port)
+    print(f"[{datetime.now()}] Trade server stand-in on http://127.0.0.1:{args.port} (db {args.db}, upstream {args.upstream}+{args.upstream_jitter}ms, fee rate {FEE_RATE})")
+    print(f"[{datetime.now()}] Server-side timings on /fake/stats (POST to reset)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
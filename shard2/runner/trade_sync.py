@@ -0,0 +1,94 @@
+# =====================
+# IMPORTS
+# =====================
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+
+import requests
+
+# =====================
+# PARAMETERS
+# =====================
+API_BASE_URL = "http://localhost:5007"
+SYNC_DIR = Path(__file__).resolve().parent / "data" / "trades"  # <table>.json per strategy table
+PAGE = 1000
+OVERLAP_MS = 5000  # re-read changes this far before the last one seen: same-ms and slightly out-of-order writes
+TIMEOUT = 30
+
+
+def sync_path(table: str, sync_dir: Path = SYNC_DIR) -> Path:
+    return Path(sync_dir) / f"{table}.json"
+
+
+def load_state(table: str, sync_dir: Path = SYNC_DIR) -> dict:
+    path = sync_path(table, sync_dir)
+    if not path.exists():
+        return {"table": table, "until": 0, "trades": {}}
+    return json.loads(path.read_text())
+
+
+def save_state(state: dict, sync_dir: Path = SYNC_DIR):
+    path = sync_path(state["table"], sync_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(state, separators=(",", ":")))
+    os.replace(tmp, path)
+
+
+def load_trades(table: str, sync_dir: Path = SYNC_DIR) -> list:
+    """The local copy of a table, newest entry first like /gettrades."""
+    trades = list(load_state(table, sync_dir)["trades"].values())
+    return sorted(trades, key=lambda t: (t.get("entryTime") or 0, t["_id"]), reverse=True)
+
+
+def sync_table(table: str, base_url: str = API_BASE_URL, sync_dir: Path = SYNC_DIR, full: bool = False,
+               page: int = PAGE, http=requests) -> dict:
+    """Bring data/trades/<table>.json up to date with /gettrades?since=.
+
+    Only trades inserted or changed since the last sync are fetched, page by
+    page. Deleted trades (DeleteById / BulkDelete) are not reported by the
+    server; `full` starts over from an empty copy.
+    """
+    state = {"table": table, "until": 0, "trades": {}} if full else load_state(table, sync_dir)
+    since = max(0, state["until"] - OVERLAP_MS) if state["until"] else 0
+    params = {"tableName": table, "since": since, "limit": page}
+    fetched = pages = 0
+    started = time.perf_counter()
+    while True:
+        resp = http.get(f"{base_url.rstrip('/')}/gettrades", params=params, timeout=TIMEOUT)
+        resp.raise_for_status()
+        body = resp.json()
+        for trade in body["trades"]:
+            state["trades"][trade["_id"]] = trade
+        fetched += len(body["trades"])
+        pages += 1
+        state["until"] = max(state["until"], body.get("until") or 0)
+        if not body.get("next"):
+            break
+        params["after"] = body["next"]
+
+    save_state(state, sync_dir)
+    return {"table": table, "fetched": fetched, "pages": pages, "total": len(state["trades"]),
+            "since": since, "until": state["until"], "seconds": time.perf_counter() - started}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep a local copy of trade-server tables, fetching only new or changed trades")
+    parser.add_argument("tables", nargs="+", help="strategy tables, e.g. MAZE MAZE2")
+    parser.add_argument("--base-url", default=API_BASE_URL)
+    parser.add_argument("--dir", default=str(SYNC_DIR), help="where <table>.json copies live")
+    parser.add_argument("--full", action="store_true", help="drop the local copy and fetch everything")
+    parser.add_argument("--page", type=int, default=PAGE)
+    args = parser.parse_args()
+
+    for table in args.tables:
+        r = sync_table(table, args.base_url, Path(args.dir), args.full, args.page)
+        print(f"[{datetime.now()}] {table}: {r['fetched']} new/changed in {r['pages']} page(s), {r['total']} trades locally ({r['seconds']:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
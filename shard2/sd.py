@@ -1,127 +1,232 @@
 import ccxt
-from datetime import datetime
+import argparse
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
 import pandas as pd
-import matplotlib.pyplot as plt
 import numpy as np
 
-# ======================
-# Initialize exchange
-# ======================
-exchange = ccxt.binance({
-    'enableRateLimit': True,
-    'options': {'defaultType': 'spot'}
-})
+sys.path.insert(0, str(Path(__file__).resolve().parent / "runner"))
+from candle_store import load_candles, update_store, timeframe_ms, use_base_url
+from finalize import CandleCloseWaiter, FinalizationStats, ccxt_closed_probe
+from scheduler import Scheduler, ServerClock
 
 # ======================
 # Parameters
 # ======================
-symbol = 'ZEC/USDT'
-timeframe = '1h'
-since = exchange.parse8601('2026-01-01T00:00:00Z')
-
-print(f"Fetching {symbol} candles from January 1st, 2026...")
-all_candles = []
-
-# ======================
-# Fetch OHLCV data
-# ======================
-while True:
-    candles = exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=1000)
-    if not candles:
-        break
-
-    all_candles.extend(candles)
-    since = candles[-1][0] + 1
-
-    if since > exchange.milliseconds():
-        break
-
-# ======================
-# Create DataFrame
-# ======================
-df = pd.DataFrame(
-    all_candles,
-    columns=['timestamp', 'open', 'high', 'low', 'close', 'volume']
-)
-
-df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-df['date'] = df['timestamp'].dt.date
-
-# ======================
-# Candle size %
-# ======================
-df['size_pct'] = ((df['close'] - df['open']) / df['open']) * 100
-
-df['green_size'] = df['size_pct'].where(df['close'] >= df['open'], 0)
-df['red_size'] = df['size_pct'].where(df['close'] < df['open'], 0)
-
-# ======================
-# Daily aggregation
-# ======================
-daily = df.groupby('date').agg({
-    'green_size': 'sum',
-    'red_size': 'sum',
-    'open': 'first',
-    'close': 'last'
-}).reset_index()
-
-# ======================
-# Cumulative sums
-# ======================
-daily['cum_green'] = daily['green_size'].cumsum()
-daily['cum_red'] = daily['red_size'].cumsum().abs()
-daily['G_R_ratio'] = daily['cum_green'] / daily['cum_red'].replace(0, np.nan)
-
-# ======================
-# Colors
-# ======================
-# Price bar color: green if close >= open
-daily['price_color'] = np.where(daily['close'] >= daily['open'], 'green', 'red')
+SYMBOLS = ['ZEC/USDT']
+TIMEFRAME = '1h'
+START_DATE = datetime(2026, 1, 1, tzinfo=timezone.utc)
+OUTPUT_PATH = Path(__file__).resolve().parent / 'daily_gr_ratio.npz'
+
+DAY_MS = 86_400_000
+COLUMNS = ['green_size', 'red_size', 'open', 'close', 'cum_green', 'cum_red', 'G_R_ratio']
+
+
+# ======================
+# Stored result
+# ======================
+def load_daily(path=OUTPUT_PATH) -> pd.DataFrame:
+    """Load the stored daily G:R table (one row per symbol and UTC day)."""
+    if not Path(path).exists():
+        return pd.DataFrame(columns=['symbol', 'day'] + COLUMNS)
+    with np.load(path, allow_pickle=False) as z:
+        names = z['symbols']
+        df = pd.DataFrame({col: z[col] for col in COLUMNS})
+        df.insert(0, 'day', z['day'].astype(np.int64))
+        df.insert(0, 'symbol', names[z['symbol_idx']])
+    return df
+
+
+def save_daily(daily: pd.DataFrame, path=OUTPUT_PATH):
+    """Write the daily table as typed numpy columns (symbols stored once)."""
+    names, idx = np.unique(daily['symbol'].to_numpy(dtype=str), return_inverse=True)
+    arrays = {col: daily[col].to_numpy(dtype=np.float64) for col in COLUMNS}
+    np.savez_compressed(
+        path,
+        symbols=names,
+        symbol_idx=idx.astype(np.int16),
+        day=daily['day'].to_numpy(dtype=np.int32),
+        **arrays,
+    )
+
+
+def import_csv(csv_path, symbol: str) -> pd.DataFrame:
+    """Convert an old daily_gr_ratio.csv export (one symbol) into the daily table."""
+    df = pd.read_csv(csv_path)
+    days = (pd.to_datetime(df['date'], utc=True) - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(days=1)
+    daily = df[COLUMNS].astype(np.float64)
+    daily.insert(0, 'day', days.astype(np.int64))
+    daily.insert(0, 'symbol', symbol)
+    return daily
+
+
+# ======================
+# G:R aggregation
+# ======================
+def daily_sizes(candles_by_symbol: dict, from_day: dict = None) -> pd.DataFrame:
+    """Per symbol and UTC day: summed green/red candle size % plus day open/close.
+
+    All symbols go through one groupby. `from_day` limits each symbol to
+    candles from that day on (days since epoch).
+    """
+    from_day = from_day or {}
+    frames = []
+    for symbol, c in candles_by_symbol.items():
+        ts = c['timestamp']
+        lo = np.searchsorted(ts, from_day[symbol] * DAY_MS) if symbol in from_day else 0
+        if lo >= len(ts):
+            continue
+        frames.append(pd.DataFrame({
+            'symbol': symbol,
+            'day': ts[lo:] // DAY_MS,
+            'open': c['open'][lo:],
+            'close': c['close'][lo:],
+        }))
+    if not frames:
+        return pd.DataFrame(columns=['symbol', 'day', 'green_size', 'red_size', 'open', 'close'])
+
+    df = pd.concat(frames, ignore_index=True)
+    size_pct = (df['close'] - df['open']) / df['open'] * 100
+    green = df['close'] >= df['open']
+    df['green_size'] = size_pct.where(green, 0.0)
+    df['red_size'] = size_pct.where(~green, 0.0)
+
+    return df.groupby(['symbol', 'day'], sort=True).agg(
+        green_size=('green_size', 'sum'),
+        red_size=('red_size', 'sum'),
+        open=('open', 'first'),
+        close=('close', 'last'),
+    ).reset_index()
+
+
+def update_daily(candles_by_symbol: dict, stored: pd.DataFrame) -> pd.DataFrame:
+    """Recompute only each symbol's last stored day onward and extend the cumulative sums.
+
+    The last stored day is redone because it may have been written while
+    still in progress.
+    """
+    last_day = stored.groupby('symbol')['day'].max().to_dict() if len(stored) else {}
+    fresh = daily_sizes(candles_by_symbol, last_day)
+    # Only symbols recomputed here lose their stored last day; the rest are kept as stored
+    redone = stored['symbol'].isin(set(fresh['symbol'])) & (stored['day'] >= stored['symbol'].map(last_day)) if len(stored) else None
+    keep = stored[~redone] if len(stored) else stored
+    base = keep.groupby('symbol')[['cum_green', 'cum_red']].last() if len(keep) else None
+
+    if len(fresh):
+        fresh['cum_green'] = fresh.groupby('symbol')['green_size'].cumsum()
+        fresh['cum_red'] = -fresh.groupby('symbol')['red_size'].cumsum()
+        if base is not None:
+            offset = base.reindex(fresh['symbol']).fillna(0.0).to_numpy()
+            fresh['cum_green'] += offset[:, 0]
+            fresh['cum_red'] += offset[:, 1]
+        fresh['G_R_ratio'] = fresh['cum_green'] / fresh['cum_red'].replace(0, np.nan)
+
+    parts = [p for p in (keep, fresh) if len(p)]
+    if not parts:
+        return stored
+    return pd.concat(parts, ignore_index=True).sort_values(['symbol', 'day'], kind='stable').reset_index(drop=True)
 
-# G:R bar color: green if rising vs previous day
-daily['gr_change'] = daily['G_R_ratio'].diff()
-daily['gr_color'] = np.where(daily['gr_change'] >= 0, 'green', 'red')
 
 # ======================
 # Plot
 # ======================
-fig, (ax1, ax2) = plt.subplots(
-    2, 1,
-    figsize=(14, 8),
-    sharex=True,
-    gridspec_kw={'height_ratios': [2, 1]}
-)
-
-# ---- Price bar chart ----
-ax1.bar(
-    daily['date'],
-    daily['close'],
-    color=daily['price_color'],
-    width=0.8
-)
-
-ax1.set_title(f"{symbol} Price & Cumulative G:R Ratio")
-ax1.set_ylabel("Price (USDT)")
-ax1.grid(True)
-
-# ---- G:R ratio bar chart ----
-ax2.bar(
-    daily['date'],
-    daily['G_R_ratio'],
-    color=daily['gr_color'],
-    width=0.8
-)
-
-ax2.axhline(1, linestyle='--', color='gray', alpha=0.6)
-ax2.set_ylabel("G:R Ratio")
-ax2.set_xlabel("Date")
-ax2.grid(True)
-
-plt.tight_layout()
-plt.show()
-
-# ======================
-# Save output
-# ======================
-daily.to_csv('daily_gr_ratio.csv', index=False)
-print("Saved daily G:R ratio to 'daily_gr_ratio.csv'")
+def plot_symbol(daily: pd.DataFrame, symbol: str, out_path):
+    import matplotlib
+    matplotlib.use('Agg')  # Non-interactive backend, no display
+    import matplotlib.pyplot as plt
+
+    d = daily[daily['symbol'] == symbol]
+    dates = pd.to_datetime(d['day'] * DAY_MS, unit='ms')
+    # Price bar color: green if close >= open; G:R bar color: green if rising vs previous day
+    price_color = np.where(d['close'] >= d['open'], 'green', 'red')
+    gr_color = np.where(d['G_R_ratio'].diff().fillna(-1) >= 0, 'green', 'red')
+
+    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(14, 8), sharex=True, gridspec_kw={'height_ratios': [2, 1]})
+    ax1.bar(dates, d['close'], color=price_color, width=0.8)
+    ax1.set_title(f"{symbol} Price & Cumulative G:R Ratio")
+    ax1.set_ylabel("Price (USDT)")
+    ax1.grid(True)
+
+    ax2.bar(dates, d['G_R_ratio'], color=gr_color, width=0.8)
+    ax2.axhline(1, linestyle='--', color='gray', alpha=0.6)
+    ax2.set_ylabel("G:R Ratio")
+    ax2.set_xlabel("Date")
+    ax2.grid(True)
+
+    plt.tight_layout()
+    plt.savefig(out_path)
+    plt.close(fig)
+
+
+def update(symbols: list, exchange=None, plot: bool = False):
+    """Bring the candle store and the daily table up to date and report the latest ratio."""
+    candles = {}
+    for symbol in symbols:
+        coin = symbol.split('/')[0]
+        if exchange is not None:
+            candles[symbol] = update_store(exchange, coin, symbol, TIMEFRAME, START_DATE)
+        else:
+            candles[symbol] = load_candles(coin, TIMEFRAME)
+
+    stored = load_daily()
+    daily = update_daily(candles, stored)
+    save_daily(daily)
+    print(f"Saved daily G:R ratio for {len(symbols)} symbols to '{OUTPUT_PATH.name}' ({len(daily)} rows)")
+
+    for symbol in symbols:
+        last = daily[daily['symbol'] == symbol].tail(1)
+        if len(last):
+            print(f"{symbol}: G:R = {last['G_R_ratio'].iloc[0]:.2f} (green {last['cum_green'].iloc[0]:.2f}%, red {last['cum_red'].iloc[0]:.2f}%)")
+        if plot:
+            out = OUTPUT_PATH.parent / f"gr_ratio_{symbol.replace('/', '')}.png"
+            plot_symbol(daily, symbol, out)
+            print(f"Saved chart to '{out.name}'")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Daily cumulative G:R ratio for many symbols")
+    parser.add_argument('symbols', nargs='*', default=SYMBOLS)
+    parser.add_argument('--no-fetch', action='store_true', help="only use candles already in the store")
+    parser.add_argument('--plot', action='store_true', help="save a price/G:R chart per symbol")
+    parser.add_argument('--loop', action='store_true', help=f"keep running and update at every {TIMEFRAME} candle close")
+    parser.add_argument('--exchange-url', help="REST host instead of Binance, e.g. http://127.0.0.1:18080 (fake_binance.py)")
+    parser.add_argument('--import-csv', type=Path, help="merge an old daily_gr_ratio.csv for the (single) symbol and exit")
+    args = parser.parse_args()
+
+    if args.import_csv:
+        stored = load_daily()
+        imported = import_csv(args.import_csv, args.symbols[0])
+        if len(stored):
+            stored = stored[stored['symbol'] != args.symbols[0]]
+        daily = pd.concat([p for p in (stored, imported) if len(p)], ignore_index=True)
+        save_daily(daily.sort_values(['symbol', 'day'], kind='stable').reset_index(drop=True))
+        print(f"Imported {len(imported)} days of {args.symbols[0]} from '{args.import_csv}' into '{OUTPUT_PATH.name}'")
+        return
+
+    exchange = None
+    if not args.no_fetch:
+        exchange = ccxt.binance({
+            'enableRateLimit': True,
+            'options': {'defaultType': 'spot'}
+        })
+        if args.exchange_url:
+            use_base_url(exchange, args.exchange_url)
+        exchange.load_markets()
+
+    if not args.loop:
+        update(args.symbols, exchange, args.plot)
+        return
+    if exchange is None:
+        parser.error("--loop needs fetching (drop --no-fetch)")
+
+    # Recompute at every TIMEFRAME candle close, once the exchange serves the closed candle
+    clock = ServerClock(exchange.fetch_time)
+    waiter = CandleCloseWaiter(clock, ccxt_closed_probe(exchange, args.symbols[0], TIMEFRAME), timeframe_ms(TIMEFRAME), FinalizationStats())
+    scheduler = Scheduler(clock)
+    scheduler.add('sd', TIMEFRAME, lambda: update(args.symbols, exchange, args.plot), gate=waiter.wait, run_now=True)
+    scheduler.run_forever()
+
+
+if __name__ == '__main__':
+    main()